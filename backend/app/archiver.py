@@ -0,0 +1,218 @@
+# backend/app/archiver.py
+"""
+Retention for matches and notifications.
+
+Rows past their retention age are moved, not deleted, into archive tables
+with the same columns and ids (models.MatchArchive, MatchMemberArchive,
+NotificationArchive):
+
+  * matches older than ARCHIVE_MATCHES_AFTER_DAYS, with their match_members
+  * notifications older than ARCHIVE_NOTIFICATIONS_AFTER_DAYS; unread ones
+    are taken off the users' unread counters
+  * notifications about products that no longer exist are deleted
+
+Each batch of ARCHIVE_BATCH_SIZE rows is copied with INSERT ... SELECT and
+deleted in the same short transaction, then the archiver pauses for
+ARCHIVE_BATCH_PAUSE_SECONDS so request traffic isn't starved. Batches are
+claimed with FOR UPDATE SKIP LOCKED on Postgres and BEGIN IMMEDIATE in
+SQLite mode, so every worker can run the archiver. A background thread does
+a pass every ARCHIVE_INTERVAL_HOURS. Archived rows stay readable with
+?include_archived=true on /matches/my and /matches/notifications/my.
+
+    python -m app.archiver                  # one pass now
+    python -m app.archiver --dry-run        # only count what would move
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import DateTime, and_, delete, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import (
+    ARCHIVE_BATCH_PAUSE_SECONDS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL_HOURS,
+    ARCHIVE_MATCHES_AFTER_DAYS, ARCHIVE_NOTIFICATIONS_AFTER_DAYS,
+)
+from app.database import SessionLocal, begin_immediate
+from app.notifications import adjust_unread_many
+
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+def _as_stored(column, moment: datetime) -> datetime:
+    """
+    `moment` in the form `column` stores it. DateTime(timezone=True) columns
+    take an aware value. Plain DateTime columns (matches.timestamp,
+    archived_at) hold naive UTC, and Postgres would read an aware value
+    against them in the session time zone.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)  # naive means UTC here
+    moment = moment.astimezone(timezone.utc)
+    return moment if column.type.timezone else moment.replace(tzinfo=None)
+
+
+def _move(db: Session, hot, archive, ids: List[int], now: datetime) -> None:
+    """Copy rows `ids` of a hot table into its archive and delete them (caller commits)."""
+    hot_table, archive_table = hot.__table__, archive.__table__
+    columns = [c.name for c in hot_table.columns]
+    archived_at = _as_stored(archive_table.c.archived_at, now)
+    db.execute(
+        insert(archive_table).from_select(
+            columns + ["archived_at"],
+            select(*(hot_table.c[name] for name in columns), literal(archived_at, DateTime))
+            .where(hot_table.c.id.in_(ids)),
+        )
+    )
+    db.execute(delete(hot_table).where(hot_table.c.id.in_(ids)))
+
+
+def _claim(db: Session, column, condition, batch_size: int) -> List[int]:
+    """Ids of the next batch, locked against other archivers."""
+    begin_immediate(db)
+    return db.scalars(
+        select(column).where(condition).order_by(column).limit(batch_size).with_for_update(skip_locked=True)
+    ).all()
+
+
+def _in_batches(db: Session, step: Callable[[List[int]], None], column, condition,
+                batch_size: int, should_stop: Callable[[], bool]) -> int:
+    done = 0
+    while not should_stop():
+        ids = _claim(db, column, condition, batch_size)
+        if ids:
+            step(ids)
+        db.commit()
+        done += len(ids)
+        if len(ids) < batch_size:
+            break
+        time.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+    return done
+
+
+def _discount_unread(db: Session, model, ids: List[int]) -> None:
+    rows = db.query(model.user_id).filter(model.id.in_(ids), model.is_read.isnot(True)).all()
+    adjust_unread_many(db, {user_id: -count for user_id, count in Counter(r.user_id for r in rows).items()})
+
+
+# ============================================================
+# PASSES
+# ============================================================
+def archive_matches(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE,
+                    should_stop: Callable[[], bool] = lambda: False) -> int:
+    def step(ids: List[int]) -> None:
+        now = datetime.now(timezone.utc)
+        member_ids = db.scalars(select(models.MatchMember.id).where(models.MatchMember.match_id.in_(ids))).all()
+        if member_ids:
+            _move(db, models.MatchMember, models.MatchMemberArchive, member_ids, now)
+        _move(db, models.Match, models.MatchArchive, ids, now)
+
+    older = models.Match.date_matched < _as_stored(models.Match.date_matched, cutoff)
+    return _in_batches(db, step, models.Match.id, older, batch_size, should_stop)
+
+
+def archive_notifications(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE,
+                          should_stop: Callable[[], bool] = lambda: False) -> int:
+    def step(ids: List[int]) -> None:
+        _discount_unread(db, models.Notification, ids)
+        _move(db, models.Notification, models.NotificationArchive, ids, datetime.now(timezone.utc))
+
+    older = models.Notification.date_created < _as_stored(models.Notification.date_created, cutoff)
+    return _in_batches(db, step, models.Notification.id, older, batch_size, should_stop)
+
+
+def _orphaned_notifications():
+    return and_(
+        models.Notification.product_id.isnot(None),
+        ~exists().where(models.Product.id == models.Notification.product_id),
+    )
+
+
+def prune_orphaned_notifications(db: Session, batch_size: int = ARCHIVE_BATCH_SIZE,
+                                 should_stop: Callable[[], bool] = lambda: False) -> int:
+    """Delete notifications whose product is gone (left over from before products cascaded)."""
+    def step(ids: List[int]) -> None:
+        _discount_unread(db, models.Notification, ids)
+        db.execute(delete(models.Notification.__table__).where(models.Notification.__table__.c.id.in_(ids)))
+
+    return _in_batches(db, step, models.Notification.id, _orphaned_notifications(), batch_size, should_stop)
+
+
+def run_retention(db: Session, dry_run: bool = False,
+                  should_stop: Callable[[], bool] = lambda: False) -> Dict[str, int]:
+    """One full pass; returns how many rows each step moved (or would move)."""
+    now = datetime.now(timezone.utc)
+    match_cutoff = now - timedelta(days=ARCHIVE_MATCHES_AFTER_DAYS)
+    notification_cutoff = now - timedelta(days=ARCHIVE_NOTIFICATIONS_AFTER_DAYS)
+    if dry_run:
+        count = lambda model, condition: db.query(func.count(model.id)).filter(condition).scalar()
+        return {
+            "matches": count(
+                models.Match, models.Match.date_matched < _as_stored(models.Match.date_matched, match_cutoff)
+            ),
+            "notifications_pruned": count(models.Notification, _orphaned_notifications()),
+            "notifications": count(
+                models.Notification,
+                models.Notification.date_created < _as_stored(models.Notification.date_created, notification_cutoff),
+            ),
+        }
+    return {
+        "matches": archive_matches(db, match_cutoff, should_stop=should_stop),
+        # Before archiving, so orphans don't end up in the archive
+        "notifications_pruned": prune_orphaned_notifications(db, should_stop=should_stop),
+        "notifications": archive_notifications(db, notification_cutoff, should_stop=should_stop),
+    }
+
+
+# ============================================================
+# BACKGROUND WORKER
+# ============================================================
+def _run_worker() -> None:
+    delay = min(ARCHIVE_INTERVAL_HOURS * 3600, 300)  # first pass soon after startup
+    while not _stop.wait(timeout=delay):
+        delay = ARCHIVE_INTERVAL_HOURS * 3600
+        db = SessionLocal()
+        try:
+            moved = run_retention(db, should_stop=_stop.is_set)
+            if any(moved.values()):
+                print(f"🗄️ Retention pass: {moved}")
+        except Exception as e:
+            print(f"⚠️ Archiver error: {e}")
+        finally:
+            db.close()
+
+
+def start_archiver() -> None:
+    """Run retention passes in a background thread (unless ARCHIVE_INTERVAL_HOURS is 0)."""
+    global _worker
+    if ARCHIVE_INTERVAL_HOURS <= 0 or (_worker is not None and _worker.is_alive()):
+        return
+    _stop.clear()
+    _worker = threading.Thread(target=_run_worker, name="archiver", daemon=True)
+    _worker.start()
+
+
+def stop_archiver() -> None:
+    """Stop after the current batch."""
+    _stop.set()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move old matches and notifications to the archive tables.")
+    parser.add_argument("--dry-run", action="store_true", help="count rows without moving them")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        result = run_retention(session, dry_run=args.dry_run)
+    finally:
+        session.close()
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"✅ {verb}: {result['matches']} match(es), {result['notifications']} notification(s); "
+          f"{'would prune' if args.dry_run else 'pruned'} {result['notifications_pruned']} orphaned notification(s).")
@@ -1,15 +1,28 @@
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt, ExpiredSignatureError
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request, APIRouter
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
+from typing import NamedTuple, Optional
+import hashlib
+import hmac
+import logging
 import os
+import time
+import uuid
 
-from app import models
-from app.database import get_db
+from app import models, passwords
+from app.cache import TTLCache
+from app.config import (
+    USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS, TOKEN_CACHE_MAX_ENTRIES, REFRESH_REUSE_GRACE_SECONDS,
+)
+from app.database import begin_immediate, get_db
+from app.revocation import revocations
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------
 # Load environment variables
@@ -26,19 +39,29 @@ REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 # ---------------------------------------------------------
 # Password hashing setup
 # ---------------------------------------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = HTTPBearer(auto_error=False)
 
 # ---------------------------------------------------------
-# Password Utilities
+# Password Utilities (bcrypt runs on the app.passwords process pool)
 # ---------------------------------------------------------
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash plain password"""
-    return pwd_context.hash(password)
+    return await passwords.hash_password_async(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify plain password against hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)
+
+async def verify_and_rehash_password(db: AsyncSession, user: models.User, plain_password: str) -> bool:
+    """Verify a login and upgrade the stored hash if BCRYPT_ROUNDS has changed"""
+    stored_hash = user.hashed_password
+    # End the lookup transaction first; bcrypt is slow
+    await db.commit()
+    valid, new_hash = await passwords.verify_and_update_async(plain_password, stored_hash)
+    if valid and new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return valid
 
 # ---------------------------------------------------------
 # Token Creation Utilities
@@ -50,20 +73,45 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
-    """Generate a long-lived refresh token"""
+def create_refresh_token(data: dict, expires_delta: timedelta | None = None, family: str | None = None) -> str:
+    """
+    Generate a long-lived refresh token with its own id (jti). Tokens rotated
+    from the same login share a family id (fam), so they can be revoked together.
+    """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "fam": family or uuid.uuid4().hex})
     return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
 
 # ---------------------------------------------------------
 # Token Verification
 # ---------------------------------------------------------
-def verify_token(token: str, key: str, error_message: str):
-    """Decode and verify token validity"""
+# Keyed by an HMAC of the token under the verifying key, so a token checked
+# against one key is never served from the cache for another, and raw
+# tokens are not kept in memory. Entries expire with the token's `exp`, but
+# live no longer than an access token does. Refresh tokens aren't cached:
+# each is checked once per refresh, and a cached copy would outlive
+# rotation for days.
+token_cache = TTLCache("tokens", maxsize=TOKEN_CACHE_MAX_ENTRIES, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _token_digest(token: str, key: str) -> bytes:
+    return hmac.new(key.encode(), token.encode(), hashlib.sha256).digest()
+
+
+def verify_token(token: str, key: str, error_message: str, cache: bool = True):
+    """Decode and verify token validity (cached until the token expires, when `cache`)"""
+    digest = _token_digest(token, key) if cache else None
+    payload = token_cache.get(digest) if cache else None
+    if payload is not None:
+        return dict(payload)
     try:
         payload = jwt.decode(token, key, algorithms=[ALGORITHM])
+        exp = payload.get("exp")
+        if cache and isinstance(exp, (int, float)):
+            remaining = min(exp - time.time(), token_cache.ttl)
+            if remaining > 0:
+                token_cache.set(digest, dict(payload), ttl=remaining)
         return payload
     except ExpiredSignatureError:
         raise HTTPException(
@@ -78,14 +126,51 @@ def verify_token(token: str, key: str, error_message: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+# ---------------------------------------------------------
+# Authenticated User Cache
+# ---------------------------------------------------------
+class UserSnapshot(NamedTuple):
+    """Detached, read-only copy of a user row (safe to share across requests)."""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    provider: str
+    full_name: Optional[str]
+    phone: Optional[str]
+    address: Optional[str]
+    date_created: Optional[datetime]
+    date_updated: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "UserSnapshot":
+        return cls(*(getattr(user, field) for field in cls._fields))
+
+
+# Keyed by user id. Short TTL: other worker processes only see a change once it expires.
+user_cache = TTLCache("users", maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Call after changing a user's account so the next request reloads it."""
+    user_cache.invalidate(user_id)
+
+
 # ---------------------------------------------------------
 # Retrieve Current User
 # ---------------------------------------------------------
 def get_current_user(
+    request: Request = None,
     token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
     db: Session = Depends(get_db),
-):
-    """Decode JWT and return the corresponding user"""
+) -> UserSnapshot:
+    """
+    Decode JWT and return a snapshot of the corresponding user.
+
+    Served from the user cache when possible, so requests that only need
+    `current_user.id` never touch the database. Load the ORM row yourself
+    to modify the account.
+    """
     if token is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -100,55 +185,146 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
-    if not user:
+    if request is not None:
+        request.state.user_id = int(user_id)  # read-your-writes routing (app/db_routing.py)
+
+    user = user_cache.get(int(user_id))
+    if user is not None:
+        return user
+
+    # An account update that commits while this loads must not be overwritten by the older copy
+    version = user_cache.version()
+    db_user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    if not db_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
+    user = UserSnapshot.from_user(db_user)
+    user_cache.set(user.id, user, version=version)
+    # The session lives until the response is sent; don't keep the lookup
+    # transaction open for the whole request
+    db.commit()
     return user
 
 # ---------------------------------------------------------
-# Refresh Token Flow
+# Refresh Token Flow (rotation + revocation)
 # ---------------------------------------------------------
-def refresh_access_token(refresh_token: str):
-    """Validate refresh token and issue a new access token"""
-    payload = verify_token(refresh_token, REFRESH_SECRET_KEY, "Invalid or expired refresh token.")
-    user_id = payload.get("sub")
+def _refresh_claims(db: Session, refresh_token: str) -> dict:
+    payload = verify_token(refresh_token, REFRESH_SECRET_KEY, "Invalid or expired refresh token.", cache=False)
+    if not payload.get("sub") or not payload.get("jti") or not payload.get("fam"):
+        # Also rejects refresh tokens issued before rotation existed
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token. Please log in again.")
+    if revocations.is_revoked(db, payload["fam"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked. Please log in again.")
+    return payload
+
+
+def _revoke_family(db: Session, payload: dict, reason: str) -> None:
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    revocations.revoke(db, payload["fam"], int(payload["sub"]), reason, expires_at)
+
+
+def _successor_jti(jti: str) -> str:
+    return hmac.new(REFRESH_SECRET_KEY.encode(), jti.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _successor_refresh_token(payload: dict, rotated_at: datetime) -> str:
+    """
+    The refresh token issued when `payload`'s token was rotated at
+    `rotated_at`. Its id and expiry are derived from the parent's, so the
+    same token can be handed out again during the reuse grace window.
+    """
+    expire = rotated_at.replace(tzinfo=timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    claims = {"sub": payload["sub"], "exp": int(expire.timestamp()), "jti": _successor_jti(payload["jti"]), "fam": payload["fam"]}
+    return jwt.encode(claims, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
+
+
+def _reissued_successor(db: Session, payload: dict) -> Optional[str]:
+    """The successor of a token rotated within the grace window, unless that one has been used too."""
+    rotated = db.query(models.RevokedToken).filter(
+        models.RevokedToken.jti == payload["jti"], models.RevokedToken.reason == "rotated"
+    ).first()
+    if rotated is None or datetime.utcnow() - rotated.revoked_at > timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS):
+        return None
+    if revocations.is_revoked(db, _successor_jti(payload["jti"])):
+        return None
+    return _successor_refresh_token(payload, rotated.revoked_at)
 
-    if not user_id:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token payload")
 
-    new_access_token = create_access_token({"sub": user_id})
-    return {"access_token": new_access_token, "token_type": "bearer"}
+def refresh_access_token(db: Session, refresh_token: str):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    Each refresh token works once. Used again within
+    REFRESH_REUSE_GRACE_SECONDS (concurrent refreshes from two tabs, a retry
+    after a lost response) it returns the successor already issued. Any
+    other reuse (a copy stolen before the owner rotated it, or one that was
+    logged out) revokes its whole family, which signs out every session
+    that descends from the same login.
+    """
+    begin_immediate(db)  # the revocation check and insert must not interleave with another writer
+    payload = _refresh_claims(db, refresh_token)
+    user_id = payload["sub"]
+
+    rotated_at = datetime.utcnow().replace(microsecond=0)
+    expires_at = datetime.utcfromtimestamp(payload["exp"])
+    if revocations.revoke(db, payload["jti"], int(user_id), "rotated", expires_at, revoked_at=rotated_at):
+        successor = _successor_refresh_token(payload, rotated_at)
+    else:
+        successor = _reissued_successor(db, payload)
+        if successor is None:
+            _revoke_family(db, payload, "reuse")
+            logger.warning("Refresh token reuse detected for user %s; revoked its token family", user_id)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked. Please log in again.")
+
+    return {
+        "access_token": create_access_token({"sub": user_id}),
+        "refresh_token": successor,
+        "token_type": "bearer",
+    }
+
+
+def revoke_refresh_token(db: Session, refresh_token: str) -> None:
+    """Log out: revoke the refresh token and every token rotated from the same login."""
+    begin_immediate(db)
+    payload = _refresh_claims(db, refresh_token)
+    revocations.revoke(db, payload["jti"], int(payload["sub"]), "logout", datetime.utcfromtimestamp(payload["exp"]))
+    _revoke_family(db, payload, "logout")
 
 
 # ==================================================================
 # 🔐 GOOGLE OAUTH2 INTEGRATION (ADDED SECTION)
 # ==================================================================
-from authlib.integrations.starlette_client import OAuth
-from starlette.config import Config
-
 oauth_router = APIRouter(prefix="/auth", tags=["OAuth"])
 
-# Initialize Authlib
-config = Config(".env")
-oauth = OAuth(config)
+_oauth = None
 
-oauth.register(
-    name='google',
-    client_id=os.getenv("GOOGLE_CLIENT_ID"),
-    client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'},
-)
+
+def get_oauth():
+    """Authlib client, set up on first use (authlib is slow to import)."""
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+        from starlette.config import Config
+
+        oauth = OAuth(Config(".env"))
+        oauth.register(
+            name='google',
+            client_id=os.getenv("GOOGLE_CLIENT_ID"),
+            client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={'scope': 'openid email profile'},
+        )
+        _oauth = oauth
+    return _oauth
 
 @oauth_router.get("/google")
 async def login_via_google(request: Request):
     redirect_uri = request.url_for("google_callback")
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    return await get_oauth().google.authorize_redirect(request, redirect_uri)
 
 @oauth_router.get("/google/callback")
 async def google_callback(request: Request, db: Session = Depends(get_db)):
-    token = await oauth.google.authorize_access_token(request)
+    token = await get_oauth().google.authorize_access_token(request)
     user_info = token.get('userinfo')
 
     if not user_info:
@@ -1,10 +1,116 @@
 # backend/app/config.py
 import os
+import tempfile
 
 # Default to local storage; switch to "cloudinary" later
 UPLOAD_MODE = os.getenv("UPLOAD_MODE", "local")  # "local" or "cloudinary"
 
+# Local-mode media storage. UPLOAD_DIR also holds in-flight (staged) uploads,
+# whichever backend ends up storing the finished files.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads"))
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")  # "local" (sharded UPLOAD_DIR) or "s3"
+
+# S3-compatible object storage (AWS S3, MinIO, or scripts/fake_s3.py)
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://127.0.0.1:9000 for MinIO
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+S3_KEY_PREFIX = os.getenv("S3_KEY_PREFIX", "uploads/")
+# Public base for object URLs (bucket website/CDN); presigned URLs are used when blank
+S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL", "")
+
 # Cloudinary credentials (leave blank for now)
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME", "")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY", "")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET", "")
+# Override the upload API host (e.g. http://127.0.0.1:8090 for scripts/fake_cloudinary.py)
+CLOUDINARY_UPLOAD_PREFIX = os.getenv("CLOUDINARY_UPLOAD_PREFIX", "")
+
+# Remote (cloudinary) upload concurrency, retries and overall deadline
+REMOTE_UPLOAD_WORKERS = int(os.getenv("REMOTE_UPLOAD_WORKERS", "4"))
+REMOTE_UPLOAD_RETRIES = int(os.getenv("REMOTE_UPLOAD_RETRIES", "3"))
+REMOTE_UPLOAD_BACKOFF_SECONDS = float(os.getenv("REMOTE_UPLOAD_BACKOFF_SECONDS", "0.5"))
+REMOTE_UPLOAD_DEADLINE_SECONDS = float(os.getenv("REMOTE_UPLOAD_DEADLINE_SECONDS", "120"))
+
+# Upload limits (bytes). Enforced while the body is being streamed to disk.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))                 # 1 MB
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(200 * 1024 * 1024)))    # 200 MB
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(300 * 1024 * 1024)))  # 300 MB
+
+# Responsive image derivatives (local uploads only)
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in os.getenv("IMAGE_DERIVATIVE_WIDTHS", "320,640,1280").split(",") if w]
+IMAGE_DERIVATIVE_FORMATS = [f for f in os.getenv("IMAGE_DERIVATIVE_FORMATS", "webp,avif").split(",") if f]
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", "2"))
+
+# Video posters/metadata via local ffmpeg + ffprobe (skipped when missing)
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+VIDEO_META_WORKERS = int(os.getenv("VIDEO_META_WORKERS", "1"))
+VIDEO_POSTER_OFFSET_SECONDS = float(os.getenv("VIDEO_POSTER_OFFSET_SECONDS", "1.0"))
+VIDEO_POSTER_MAX_WIDTH = int(os.getenv("VIDEO_POSTER_MAX_WIDTH", "1280"))
+VIDEO_TOOL_TIMEOUT_SECONDS = float(os.getenv("VIDEO_TOOL_TIMEOUT_SECONDS", "60"))
+
+# Media serving: hand /uploads responses to nginx (X-Accel-Redirect) for zero-copy sendfile.
+# Set to the internal nginx location that aliases the uploads directory, e.g. "/_protected_uploads".
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+
+# Resumable (chunked) video uploads
+RESUMABLE_UPLOAD_TTL_HOURS = int(os.getenv("RESUMABLE_UPLOAD_TTL_HOURS", "24"))
+RESUMABLE_MAX_CHUNK_BYTES = int(os.getenv("RESUMABLE_MAX_CHUNK_BYTES", str(16 * 1024 * 1024)))  # 16 MB
+
+# Deferred media deletion and orphan collection (local uploads only)
+MEDIA_DELETION_BATCH_SIZE = int(os.getenv("MEDIA_DELETION_BATCH_SIZE", "100"))
+MEDIA_DELETION_INTERVAL_SECONDS = float(os.getenv("MEDIA_DELETION_INTERVAL_SECONDS", "30"))
+MEDIA_DELETION_MAX_ATTEMPTS = int(os.getenv("MEDIA_DELETION_MAX_ATTEMPTS", "5"))
+MEDIA_GC_GRACE_HOURS = float(os.getenv("MEDIA_GC_GRACE_HOURS", "24"))
+
+# Authenticated-user snapshot cache (per process)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# Verified JWT cache (per process): decoded claims are kept until the token's exp
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "20000"))
+
+# /internal/metrics is off (404) unless this is set; requests must send it in the X-Metrics-Token header
+INTERNAL_METRICS_TOKEN = os.getenv("INTERNAL_METRICS_TOKEN", "")
+
+# Password hashing (bcrypt on a process pool; see app/passwords.py)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+
+# Refresh-token revocation filter (see app/revocation.py)
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_FP_RATE = float(os.getenv("REVOCATION_FILTER_FP_RATE", "0.001"))
+# How often each process pulls revocations made by other processes
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# A rotated refresh token used again this soon (two tabs, a retried request) gets
+# the same successor back instead of revoking its family as stolen
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "20"))
+
+# Read replicas (DATABASE_REPLICA_URLS in .env; see app/db_routing.py)
+REPLICA_COOLDOWN_SECONDS = float(os.getenv("REPLICA_COOLDOWN_SECONDS", "30"))
+REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "0"))  # Postgres only; 0 = don't check
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+# Realtime push (/realtime/ws and /realtime/events; see app/realtime.py)
+REALTIME_BACKEND = os.getenv("REALTIME_BACKEND", "local")  # "local", "unix" (workers on one host) or "postgres"
+REALTIME_SOCKET_DIR = os.getenv("REALTIME_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "makeitwhole-realtime"))
+REALTIME_PG_CHANNEL = os.getenv("REALTIME_PG_CHANNEL", "makeitwhole_events")
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "25"))
+# Events buffered per connection; a client that falls further behind gets a "resync" event
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+REALTIME_SEND_TIMEOUT_SECONDS = float(os.getenv("REALTIME_SEND_TIMEOUT_SECONDS", "10"))
+
+# Notifications with the same subject (e.g. new matches for one item) are combined
+# into a single unread digest row for this long; 0 = only within one write
+NOTIFICATION_DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "900"))
+
+# Retention (see app/archiver.py): cold rows move to *_archive tables in batches
+ARCHIVE_MATCHES_AFTER_DAYS = float(os.getenv("ARCHIVE_MATCHES_AFTER_DAYS", "365"))
+ARCHIVE_NOTIFICATIONS_AFTER_DAYS = float(os.getenv("ARCHIVE_NOTIFICATIONS_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", "0.2"))  # let other writers in
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "6"))  # 0 = no background archiver
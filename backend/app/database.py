@@ -3,16 +3,14 @@ import os
 import pathlib
 import urllib.parse
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-# Optional: import psycopg2 only when we need to create a postgres DB
-try:
-    import psycopg2
-    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-except Exception:
-    psycopg2 = None  # not required for sqlite or when psycopg2 not installed
+from app.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, register_engine
 
 # Load environment variables from backend/.env
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
@@ -33,7 +31,11 @@ def create_database_if_not_exists():
         # Not postgres — nothing to do
         return
 
-    if psycopg2 is None:
+    # Optional: psycopg2 is only needed to create a postgres DB
+    try:
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+    except ImportError:
         raise RuntimeError(
             "psycopg2 is required to auto-create a Postgres database. "
             "Install it or create the database manually."
@@ -78,9 +80,6 @@ def create_database_if_not_exists():
         print("   Make sure Postgres is running and DATABASE_URL is correct.")
         raise
 
-# Try to create DB if postgres
-create_database_if_not_exists()
-
 # Rebuild a safe SQLAlchemy URL: keep the original scheme, but ensure password is quoted
 # If the .env already contains a properly formatted URL this will be equivalent
 username = parsed.username or ""
@@ -99,19 +98,196 @@ else:
     # For sqlite, raw_url is usually fine (e.g. sqlite:///./file.db)
     sqlalchemy_url = raw_url
 
+# Connection pool settings (.env). pre-ping tests each connection on checkout
+# so a restarted Postgres doesn't hand out dead connections; recycle
+# replaces connections before server/proxy idle timeouts close them.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 disables
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+def _pool_options(url: str, poolclass) -> dict:
+    if make_url(url).get_backend_name() == "sqlite" and make_url(url).database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite keeps its single shared connection
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# ============================================================
+# SQLITE MODE (single-node deployments)
+# ============================================================
+# WAL lets readers run alongside the writer. busy_timeout makes writers
+# queue instead of failing with "database is locked". A transaction that
+# hasn't asked for a lock mode only opens at its first write (like the stock
+# driver) and then with BEGIN IMMEDIATE. Its earlier reads hold no snapshot,
+# so a write committed by someone else in between can't fail it, and the
+# write lock is waited for. A read-then-write that must see an unchanged
+# row calls begin_immediate() to take the lock before its first read; a
+# transaction that needs one consistent snapshot for several reads can ask
+# for execution_options(sqlite_begin="DEFERRED").
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() in ("1", "true", "yes")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # durable in WAL except on power loss
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB (64 MiB)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+# Statements that need the write lock. SAVEPOINT is included because, outside
+# a transaction, SQLite would treat it as its own BEGIN and RELEASE would commit.
+_SQLITE_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "SAVEPOINT", "CREATE", "DROP", "ALTER")
+
+
+def configure_sqlite(target_engine) -> None:
+    """Apply the SQLite pragmas and explicit BEGIN handling to a (sync or async) engine."""
+    sync_engine = getattr(target_engine, "sync_engine", target_engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy issue BEGIN itself (the driver's implicit BEGIN ignores
+        # the lock mode and breaks SAVEPOINT handling)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in (
+            f"journal_mode={SQLITE_JOURNAL_MODE}",
+            f"synchronous={SQLITE_SYNCHRONOUS}",
+            f"mmap_size={SQLITE_MMAP_SIZE}",
+            f"cache_size={SQLITE_CACHE_SIZE}",
+            f"busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+            "foreign_keys=ON",
+        ):
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        mode = conn.get_execution_options().get("sqlite_begin")
+        conn.info["sqlite_begin_on_write"] = mode is None
+        if mode is not None:
+            conn.exec_driver_sql(f"BEGIN {mode}")
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("sqlite_begin_on_write") and statement.lstrip()[:9].upper().startswith(_SQLITE_WRITES):
+            conn.info["sqlite_begin_on_write"] = False
+            cursor.execute("BEGIN IMMEDIATE")
+
+    @event.listens_for(sync_engine, "commit")
+    @event.listens_for(sync_engine, "rollback")
+    def _on_end(conn):
+        conn.info["sqlite_begin_on_write"] = False
+
+
+def _is_tuned_sqlite(url: str) -> bool:
+    return SQLITE_TUNING and make_url(url).get_backend_name() == "sqlite"
+
+
+def begin_immediate(db) -> None:
+    """
+    Start `db`'s next transaction with BEGIN IMMEDIATE under SQLite mode
+    (takes the write lock before the first read). A no-op on other
+    databases. The session must not have a transaction open: commit or roll
+    back first, so no half-finished work is committed on the caller's behalf.
+    """
+    if db.in_transaction():
+        raise RuntimeError("begin_immediate() called with a transaction already open; commit or roll back first")
+    db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+
 # Create SQLAlchemy engine
-engine = create_engine(sqlalchemy_url, echo=False)
+engine = create_engine(sqlalchemy_url, echo=False, **_pool_options(sqlalchemy_url, InstrumentedQueuePool))
+if _is_tuned_sqlite(sqlalchemy_url):
+    configure_sqlite(engine)
+register_engine("primary", engine)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replicas (comma-separated URLs); see app/db_routing.py
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+replica_engines = []
+for _i, _url in enumerate(DATABASE_REPLICA_URLS):
+    _replica = create_engine(_url, echo=False, **_pool_options(_url, InstrumentedQueuePool))
+    if _is_tuned_sqlite(_url):
+        configure_sqlite(_replica)
+    register_engine(f"replica_{_i}", _replica)
+    replica_engines.append(_replica)
+
 # Base class
 Base = declarative_base()
 
+# Run init_database() when the app starts (see app.main). Importing this
+# module never touches the database; with this off, run `python init_db.py`
+# (or the Alembic migrations) as a deploy step instead.
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+
+def init_database() -> None:
+    """Create the Postgres database if it's missing, then any missing tables."""
+    from app import models  # noqa: F401  (registers the tables on Base)
+
+    create_database_if_not_exists()
+    print("🔄 Checking database and creating tables if needed...")
+    Base.metadata.create_all(bind=engine)
+    print("✅ Database tables are ready!")
+
 # FastAPI DB dependency
-def get_db():
+def get_db(request: Request = None):
     db = SessionLocal()
+    # Lets a commit pin this user's reads to the primary (read-your-writes)
+    db.info["request_state"] = request.state if request is not None else None
     try:
         yield db
     finally:
         db.close()
+
+
+# ============================================================
+# ASYNC ENGINE (for async def route handlers)
+# ============================================================
+# Same database through an asyncio driver, so awaiting a query yields the
+# event loop instead of blocking it. Requires asyncpg (Postgres) or
+# aiosqlite (SQLite).
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "postgres": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def _async_url(url: str):
+    parsed_url = make_url(url)
+    backend = parsed_url.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise RuntimeError(f"No async driver configured for database backend '{backend}'")
+    return parsed_url.set(drivername=f"{'postgresql' if driver == 'asyncpg' else backend}+{driver}")
+
+
+try:
+    async_engine = create_async_engine(
+        _async_url(sqlalchemy_url), echo=False, **_pool_options(sqlalchemy_url, InstrumentedAsyncQueuePool)
+    )
+    if _is_tuned_sqlite(sqlalchemy_url):
+        configure_sqlite(async_engine)
+    register_engine("primary_async", async_engine)
+    # expire_on_commit=False: attributes stay loaded after commit, since an
+    # implicit lazy refresh is not possible outside an await
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+except Exception as e:
+    print(f"⚠️ Async database engine unavailable ({e}); install asyncpg/aiosqlite")
+    async_engine = None
+    AsyncSessionLocal = None
+
+
+# FastAPI async DB dependency
+async def get_async_db(request: Request = None):
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database driver not installed: pip install asyncpg aiosqlite")
+    async with AsyncSessionLocal() as db:
+        db.info["request_state"] = request.state if request is not None else None
+        yield db
@@ -0,0 +1,232 @@
+# backend/app/db_routing.py
+"""
+Read-replica routing.
+
+With DATABASE_REPLICA_URLS set, read-only endpoints take their session from
+get_read_db(). That session sends queries to a replica, picked round-robin
+among the healthy ones. Writes, and any query after a write in the same
+session, go to the primary. A user who just committed a change reads from
+the primary for REPLICA_STICKY_SECONDS, so their next page load sees it
+even if the replicas lag. Stickiness is per process, so keep it longer
+than typical replica lag.
+
+Replicas are health-checked in the background (SELECT 1, plus replay lag
+on Postgres when REPLICA_MAX_LAG_SECONDS is set). A replica that fails a
+check or drops a connection sits out REPLICA_COOLDOWN_SECONDS. With no
+healthy replica, reads fall back to the primary. Without replicas
+configured, get_read_db() is just the primary.
+
+Try it locally with two SQLite files (scripts/sqlite_replica.py keeps the
+copy in sync with a configurable lag):
+
+    python scripts/sqlite_replica.py --primary primary.db --replica replica.db --lag 2
+    DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URLS=sqlite:///replica.db uvicorn app.main:app
+"""
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import engine as primary_engine, replica_engines
+from app.cache import TTLCache
+from app.config import (
+    REPLICA_COOLDOWN_SECONDS, REPLICA_HEALTH_INTERVAL_SECONDS, REPLICA_MAX_LAG_SECONDS,
+    REPLICA_STICKY_SECONDS, USER_CACHE_MAX_ENTRIES,
+)
+
+# Users who committed a write recently: their reads go to the primary
+recent_writers = TTLCache("replica_sticky", maxsize=USER_CACHE_MAX_ENTRIES, ttl=REPLICA_STICKY_SECONDS)
+
+
+# ============================================================
+# REPLICA SET (round-robin + health)
+# ============================================================
+class ReplicaSet:
+    def __init__(self, engines: List[Engine], cooldown: float):
+        self.engines = engines
+        self.cooldown = cooldown
+        self._rr = itertools.count()
+        self._down_until: Dict[int, float] = {}
+        self._routed = [0] * len(engines)
+        self.primary_fallbacks = 0
+        self._checker: Optional[threading.Thread] = None
+        self._checker_lock = threading.Lock()
+        for index, replica in enumerate(engines):
+            event.listen(replica, "handle_error", self._on_error_for(index))
+
+    def _on_error_for(self, index: int):
+        def on_error(context):
+            # Failed connect or dropped connection: stop routing here for a while
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(index, str(context.original_exception))
+        return on_error
+
+    def mark_down(self, index: int, reason: str) -> None:
+        if self.is_up(index):
+            print(f"⚠️ Read replica {index} unavailable ({reason}); using others for {self.cooldown:.0f}s")
+        self._down_until[index] = time.monotonic() + self.cooldown
+
+    def is_up(self, index: int) -> bool:
+        return self._down_until.get(index, 0) <= time.monotonic()
+
+    def choose(self) -> Optional[Engine]:
+        """Next healthy replica, or None to use the primary."""
+        if not self.engines:
+            return None
+        self._ensure_checker()
+        start = next(self._rr)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self.is_up(index):
+                self._routed[index] += 1
+                return self.engines[index]
+        self.primary_fallbacks += 1
+        return None
+
+    # ------------------------------------------------------------
+    def check(self, index: int) -> None:
+        replica = self.engines[index]
+        try:
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                if REPLICA_MAX_LAG_SECONDS > 0 and replica.dialect.name == "postgresql":
+                    lag = conn.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar()
+                    if lag > REPLICA_MAX_LAG_SECONDS:
+                        self.mark_down(index, f"replication lag {lag:.1f}s")
+                        return
+        except Exception as e:
+            self.mark_down(index, str(e))
+            return
+        if not self.is_up(index):
+            print(f"✅ Read replica {index} is back")
+            self._down_until.pop(index, None)
+
+    def _run_checker(self) -> None:
+        while True:
+            for index in range(len(self.engines)):
+                self.check(index)
+            time.sleep(REPLICA_HEALTH_INTERVAL_SECONDS)
+
+    def _ensure_checker(self) -> None:
+        if self._checker is not None and self._checker.is_alive():
+            return
+        with self._checker_lock:
+            if self._checker is None or not self._checker.is_alive():
+                self._checker = threading.Thread(target=self._run_checker, name="replica-health", daemon=True)
+                self._checker.start()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "replicas": [
+                {
+                    "url": replica.url.render_as_string(hide_password=True),
+                    "healthy": self.is_up(index),
+                    "down_for_seconds": round(max(0.0, self._down_until.get(index, 0) - now), 1),
+                    "reads_routed": self._routed[index],
+                }
+                for index, replica in enumerate(self.engines)
+            ],
+            "primary_fallbacks": self.primary_fallbacks,
+        }
+
+
+replicas = ReplicaSet(replica_engines, REPLICA_COOLDOWN_SECONDS)
+
+
+# ============================================================
+# ROUTING SESSION
+# ============================================================
+class RoutingSession(Session):
+    """
+    Reads go to one replica (chosen on first use, kept for the session).
+    Flushes and DML statements go to the primary, and so does everything
+    after them, so a session never reads older data than it wrote.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._use_primary = False
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._use_primary or self._flushing or getattr(clause, "is_dml", False):
+            self._use_primary = True
+            return primary_engine
+        if self._replica is None:
+            user_id = self.info.get("user_id")
+            if user_id is not None and recent_writers.get(user_id):
+                self._use_primary = True
+                return primary_engine
+            self._replica = replicas.choose() or primary_engine
+        return self._replica
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
+def _request_user_id(request: Optional[Request]) -> Optional[int]:
+    from app.auth import SECRET_KEY, verify_token
+
+    header = request.headers.get("authorization", "") if request is not None else ""
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        sub = verify_token(token, SECRET_KEY, "Invalid or expired access token.").get("sub")
+        return int(sub) if sub else None
+    except (HTTPException, ValueError):
+        return None
+
+
+def get_read_db(request: Request = None):
+    """DB dependency for read-only endpoints (replica when available)."""
+    db = ReadSessionLocal()
+    if replicas.engines:
+        db.info["user_id"] = _request_user_id(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ============================================================
+# READ-YOUR-WRITES
+# ============================================================
+def note_write(user_id: int) -> None:
+    """Route this user's reads to the primary for REPLICA_STICKY_SECONDS."""
+    recent_writers.set(user_id, True)
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    # Bulk UPDATE/DELETE statements don't go through a flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_write(session):
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _stick_to_primary(session):
+    if not session.info.pop("wrote", False) or not replicas.engines:
+        return
+    state = session.info.get("request_state")
+    user_id = getattr(state, "user_id", None) if state is not None else None
+    if user_id is not None:
+        note_write(user_id)
@@ -0,0 +1,204 @@
+# backend/app/derivatives.py
+"""
+Responsive image derivatives.
+
+After a local image upload, a small worker pool writes resized WebP/AVIF
+copies into the same storage backend as the original (EXIF stripped,
+orientation applied) and records them in `media_variants`. List endpoints
+look the variants up in one query and expose them as srcset strings, so
+grid views no longer download the full-size originals.
+
+Backfill existing product images with:
+
+    python -m app.derivatives
+"""
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import UPLOAD_DIR, IMAGE_DERIVATIVE_WIDTHS, IMAGE_DERIVATIVE_FORMATS, IMAGE_DERIVATIVE_WORKERS
+from app.database import SessionLocal
+from app.storage import get_storage
+
+# Optional: Pillow is only needed when derivatives are generated
+try:
+    from PIL import Image, ImageOps, features
+except Exception:
+    Image = None
+
+FORMAT_MIME = {"webp": "image/webp", "avif": "image/avif"}
+_SAVE_OPTIONS = {"webp": {"quality": 80, "method": 4}, "avif": {"quality": 60, "speed": 6}}
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=IMAGE_DERIVATIVE_WORKERS, thread_name_prefix="image-derivatives"
+        )
+    return _executor
+
+
+def _enabled_formats() -> List[str]:
+    return [f for f in IMAGE_DERIVATIVE_FORMATS if f in FORMAT_MIME and features.check(f)]
+
+
+def variant_filename(filename: str, width: int, fmt: str) -> str:
+    return f"{filename}.w{width}.{fmt}"
+
+
+# ============================================================
+# GENERATION (runs on the worker pool)
+# ============================================================
+def _write_variant(storage, image, fmt: str, out_name: str) -> None:
+    tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+    try:
+        image.save(tmp_path, format=fmt.upper(), **_SAVE_OPTIONS[fmt])
+        storage.put(tmp_path, out_name)
+    finally:
+        # Gone after a successful put; left behind when encoding or the upload fails
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def generate_derivatives(source_rel: str) -> List[models.MediaVariant]:
+    """Write every configured size/format for one /uploads/<file> image and record it."""
+    storage = get_storage()
+    filename = source_rel.split("/uploads/")[-1]
+
+    with storage.fetch(filename) as src_path, Image.open(src_path) as opened:
+        # Bake in the EXIF orientation; the encoders below never copy EXIF over.
+        img = ImageOps.exif_transpose(opened)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        orig_w, orig_h = img.size
+
+        widths = sorted({min(w, orig_w) for w in IMAGE_DERIVATIVE_WIDTHS})
+        formats = _enabled_formats()
+        variants: List[models.MediaVariant] = []
+        for width in widths:
+            # Variant names are served as immutable, so a file that exists is
+            # kept (e.g. from an earlier run), never rewritten in place.
+            missing = [fmt for fmt in formats if not storage.exists(variant_filename(filename, width, fmt))]
+            if missing:
+                height = max(1, round(orig_h * width / orig_w))
+                resized = img if width == orig_w else img.resize((width, height), Image.LANCZOS)
+                for fmt in missing:
+                    _write_variant(storage, resized, fmt, variant_filename(filename, width, fmt))
+            for fmt in formats:
+                variants.append(models.MediaVariant(
+                    source_path=source_rel, path=f"/uploads/{variant_filename(filename, width, fmt)}",
+                    width=width, format=fmt,
+                ))
+
+    db = SessionLocal()
+    try:
+        db.query(models.MediaVariant).filter(models.MediaVariant.source_path == source_rel).delete()
+        db.add_all(variants)
+        db.commit()
+    finally:
+        db.close()
+    return variants
+
+
+def _has_variants(source_rel: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(models.MediaVariant.id).filter(models.MediaVariant.source_path == source_rel).first() is not None
+    finally:
+        db.close()
+
+
+def _generate_safely(source_rel: str) -> None:
+    try:
+        # Deduplicated uploads point at a blob that may already be processed
+        if _has_variants(source_rel):
+            return
+        generate_derivatives(source_rel)
+    except Exception as e:
+        print(f"⚠️ Derivative generation failed for {source_rel}: {e}")
+
+
+def schedule_derivatives(source_rels: Iterable[str]) -> None:
+    """Queue derivative generation for freshly saved local images (non-blocking)."""
+    if Image is None:
+        return
+    for rel in source_rels:
+        if rel and rel.startswith("/uploads/"):
+            _get_executor().submit(_generate_safely, rel)
+
+
+# ============================================================
+# LOOKUP / CLEANUP
+# ============================================================
+def load_variants(db: Session, source_rels: Iterable[str]) -> Dict[str, List[models.MediaVariant]]:
+    """Fetch variants for many source images in a single query."""
+    rels = [r for r in set(source_rels) if r]
+    if not rels:
+        return {}
+    grouped: Dict[str, List[models.MediaVariant]] = {}
+    rows = db.query(models.MediaVariant).filter(models.MediaVariant.source_path.in_(rels)).all()
+    for v in rows:
+        grouped.setdefault(v.source_path, []).append(v)
+    return grouped
+
+
+def build_srcsets(variants: List[models.MediaVariant], absolute) -> Dict[str, str]:
+    """Map MIME type -> srcset string, e.g. {"image/webp": "https://.../a.w320.webp 320w, ..."}."""
+    srcsets: Dict[str, str] = {}
+    for fmt, mime in FORMAT_MIME.items():
+        of_fmt = sorted((v for v in variants if v.format == fmt), key=lambda v: v.width)
+        if of_fmt:
+            srcsets[mime] = ", ".join(f"{absolute(v.path)} {v.width}w" for v in of_fmt)
+    return srcsets
+
+
+def delete_derivatives(db: Session, source_rel: str) -> None:
+    """Remove the variant files and rows for an image that is being deleted."""
+    storage = get_storage()
+    variants = db.query(models.MediaVariant).filter(models.MediaVariant.source_path == source_rel).all()
+    for v in variants:
+        try:
+            storage.delete(v.path.split("/uploads/")[-1])
+        except Exception:
+            pass
+        db.delete(v)
+
+
+# ============================================================
+# BACKFILL
+# ============================================================
+def backfill() -> None:
+    db = SessionLocal()
+    try:
+        rels = set()
+        for (image_url,) in db.query(models.Product.image_url).filter(models.Product.image_url.isnot(None)):
+            try:
+                urls = json.loads(image_url)
+            except Exception:
+                urls = [image_url]
+            rels.update(u for u in (urls if isinstance(urls, list) else [urls]) if u.startswith("/uploads/"))
+        done = {r for (r,) in db.query(models.MediaVariant.source_path).distinct()}
+    finally:
+        db.close()
+
+    todo = sorted(rels - done)
+    print(f"🖼️ Generating derivatives for {len(todo)} image(s)...")
+    for rel in todo:
+        _generate_safely(rel)
+    print("✅ Done!")
+
+
+if __name__ == "__main__":
+    if Image is None:
+        raise SystemExit("Pillow is required: pip install Pillow")
+    backfill()
@@ -1,22 +1,71 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import os
 
-from app.database import Base, engine
-from app import models
+from app.database import DB_INIT_ON_STARTUP, SessionLocal, async_engine, init_database
+from app import models, passwords
 from app.routes import users, products
 from app import routes_auth
-from app.routes import match
+from app.routes import match, messages
+from app.routes import internal
+from app.routes import realtime as realtime_routes
+from app.config import UPLOAD_DIR, STORAGE_BACKEND, S3_BUCKET
+from app.static_media import MediaStaticFiles, RemoteMediaRedirect
+from app.media import UploadSizeLimit
+from app.revocation import revocations
+from app.realtime import hub
+from app.archiver import start_archiver, stop_archiver
+from app.media_gc import start_deletion_worker, stop_deletion_worker
 
 
-# ✅ Initialize FastAPI
-app = FastAPI(title="MakeItWhole API", version="1.0")
+# ✅ Load the refresh-token revocation filter
+def load_revocations():
+    db = SessionLocal()
+    try:
+        count = revocations.rebuild(db)
+    finally:
+        db.close()
+    print(f"🚫 Loaded {count} revoked refresh token id(s)")
+
 
-# ✅ Initialize database
-print("🔄 Checking database and creating tables if needed...")
-Base.metadata.create_all(bind=engine)
-print("✅ Database tables are ready!")
+# ✅ Startup / shutdown. Importing this module does no I/O; everything that
+# touches the database happens here, when a server actually starts.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upload directory (shared with the upload pipeline via app.config)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    if STORAGE_BACKEND == "s3":
+        print(f"📂 Serving uploads from bucket: {S3_BUCKET}")
+    else:
+        print(f"📂 Serving uploads from: {UPLOAD_DIR}")
+    if DB_INIT_ON_STARTUP:
+        await run_in_threadpool(init_database)
+    try:
+        await run_in_threadpool(load_revocations)
+    except Exception as e:
+        # Not fatal: the filter is rebuilt on the first refresh-token check
+        print(f"⚠️ Could not load revoked refresh tokens yet: {e}")
+    # Push channel for notifications and matches
+    await hub.start()
+    # Background retention: moves old matches/notifications to archive tables
+    start_archiver()
+    # Deferred media deletion: drains what earlier processes left queued
+    start_deletion_worker()
+    yield
+    stop_deletion_worker()
+    stop_archiver()
+    await hub.stop()
+    # Stop the password hashing worker processes with the app
+    passwords.shutdown()
+    # Close the async engine's connections (aiosqlite keeps a thread per connection)
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+# ✅ Initialize FastAPI
+app = FastAPI(title="MakeItWhole API", version="1.0", lifespan=lifespan)
 
 # ✅ CORS setup
 app.add_middleware(
@@ -33,24 +82,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ✅ Correct upload directory
-# 👇 This time we go directly into backend/app/uploads
-BACKEND_ROOT = os.path.dirname(os.path.abspath(__file__))  # backend/app
-UPLOAD_DIR = os.path.join(BACKEND_ROOT, "uploads")  # ✅ correct path
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-print(f"📂 Serving uploads from: {UPLOAD_DIR}")
+# ✅ Cap multipart bodies while they stream in, before the form is parsed
+app.add_middleware(UploadSizeLimit)
 
-# ✅ Serve uploaded files
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# ✅ Serve uploaded files (long-lived caching, ETags, byte ranges). The
+# directory is created by lifespan, so it isn't checked at import.
+if STORAGE_BACKEND == "s3":
+    app.mount("/uploads", RemoteMediaRedirect(), name="uploads")
+else:
+    app.mount("/uploads", MediaStaticFiles(directory=UPLOAD_DIR, check_dir=False), name="uploads")
 
 # ✅ Include routers
 app.include_router(routes_auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(products.router, prefix="/products", tags=["Products"])
 app.include_router(match.router, prefix="/matches", tags=["Matches"])
+app.include_router(messages.router, prefix="/conversations", tags=["Messages"])
+app.include_router(internal.router, prefix="/internal", tags=["Internal"])
+app.include_router(realtime_routes.router, prefix="/realtime", tags=["Realtime"])
 
 # ✅ Root route
 @app.get("/")
 def root():
     return {"message": "Welcome to MakeItWhole API 🚀"}
+
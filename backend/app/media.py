@@ -0,0 +1,412 @@
+# backend/app/media.py
+"""
+Streaming upload pipeline and content-addressed media storage.
+
+Uploaded files are read in chunks, written to a temporary file through the
+thread pool (so the event loop never blocks on disk I/O) and atomically
+renamed into place once complete. Size limits are enforced while streaming,
+and the MIME type is sniffed from the first chunk instead of trusting the
+client-supplied content type. UploadSizeLimit caps multipart request bodies
+on the raw stream, before the form (and its spooled files) is parsed.
+
+Files are stored by SHA-256 (`/uploads/<sha256><ext>`, placed by the
+configured backend in app.storage), so identical uploads share one blob.
+`media_blobs.ref_count` counts the product references to each blob; a blob
+is only removed once its last reference is gone. Removal itself is deferred to the `media_deletions` queue (see app.media_gc).
+"""
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app import models
+from app.config import UPLOAD_DIR, UPLOAD_CHUNK_SIZE, MAX_UPLOAD_FILE_BYTES, MAX_UPLOAD_REQUEST_BYTES
+from app.derivatives import delete_derivatives
+from app.storage import get_storage
+from app.video_meta import delete_video_metadata
+
+
+# ============================================================
+# MIME SNIFFING
+# ============================================================
+_ISO_BMFF_IMAGE_BRANDS = {
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heif",
+}
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """Guess a MIME type from the leading bytes of a file (None if unknown)."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in _ISO_BMFF_IMAGE_BRANDS:
+            return _ISO_BMFF_IMAGE_BRANDS[brand]
+        if brand == b"qt  ":
+            return "video/quicktime"
+        return "video/mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+    return None
+
+
+def _check_kind(mime: Optional[str], kind: Optional[str], filename: str) -> None:
+    """Reject files whose sniffed type does not match the expected media kind."""
+    if kind is None:
+        return
+    if mime is None or not mime.startswith(f"{kind}/"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"'{filename}' is not a supported {kind} file",
+        )
+
+
+# ============================================================
+# REQUEST BUDGET
+# ============================================================
+class UploadBudget:
+    """Tracks the bytes written across all files of a single request."""
+
+    def __init__(self, limit: int = MAX_UPLOAD_REQUEST_BYTES):
+        self.limit = limit
+        self.used = 0
+
+    def consume(self, n: int) -> None:
+        self.used += n
+        if self.used > self.limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Total upload size exceeds {self.limit // (1024 * 1024)} MB",
+            )
+
+
+# Multipart framing and the form's text fields, on top of the file bytes
+_FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware that caps multipart request bodies while they arrive.
+
+    The form is parsed, and its files spooled to disk, before a handler
+    (and its UploadBudget) sees any of it. A declared Content-Length over
+    the limit is refused before the body is read; otherwise the received
+    bytes are counted, which covers chunked bodies and wrong lengths.
+    """
+
+    def __init__(self, app, limit: int = MAX_UPLOAD_REQUEST_BYTES + _FORM_OVERHEAD_BYTES):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers") or []) if scope["type"] == "http" else {}
+        if not headers.get(b"content-type", b"").startswith(b"multipart/"):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Total upload size exceeds {(self.limit - _FORM_OVERHEAD_BYTES) // (1024 * 1024)} MB"
+        declared = headers.get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > self.limit:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, counted_receive, send)
+
+
+# ============================================================
+# STREAMING WRITE
+# ============================================================
+def _close_file(fh) -> None:
+    fh.flush()
+    os.fsync(fh.fileno())
+    fh.close()
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class StagedUpload(NamedTuple):
+    """A fully received upload sitting in a temp file, not yet stored."""
+    tmp_path: str
+    sha256: str
+    size: int
+    mime: Optional[str]
+    original_name: str
+
+
+def discard_staged(staged_files: Iterable[StagedUpload]) -> None:
+    """Remove the temp files of staged uploads that won't be stored."""
+    for staged in staged_files:
+        _discard(staged.tmp_path)
+
+
+async def stage_upload(
+    upload_file: UploadFile,
+    kind: Optional[str] = None,
+    budget: Optional[UploadBudget] = None,
+    staging_dir: str = UPLOAD_DIR,
+) -> StagedUpload:
+    """
+    Stream an UploadFile into a temp file in staging_dir, hashing as it goes.
+
+    Raises 413 as soon as a per-file or per-request limit is crossed and 415
+    if the content is not of the expected kind ("image" or "video"); the
+    partial file is removed.
+    """
+    display_name = upload_file.filename or "file"
+    tmp_path = os.path.join(staging_dir, f".{uuid.uuid4().hex}.part")
+
+    fh = await run_in_threadpool(open, tmp_path, "wb")
+    digest = hashlib.sha256()
+    written = 0
+    mime: Optional[str] = None
+    try:
+        while True:
+            chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if written == 0:
+                mime = sniff_mime(chunk)
+                _check_kind(mime, kind, display_name)
+
+            written += len(chunk)
+            if written > MAX_UPLOAD_FILE_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"'{display_name}' exceeds {MAX_UPLOAD_FILE_BYTES // (1024 * 1024)} MB",
+                )
+            if budget is not None:
+                budget.consume(len(chunk))
+
+            digest.update(chunk)
+            await run_in_threadpool(fh.write, chunk)
+
+        if written == 0:
+            raise HTTPException(status_code=400, detail=f"'{display_name}' is empty")
+
+        await run_in_threadpool(_close_file, fh)
+    except BaseException:
+        if not fh.closed:
+            await run_in_threadpool(fh.close)
+        await run_in_threadpool(_discard, tmp_path)
+        raise
+
+    return StagedUpload(tmp_path, digest.hexdigest(), written, mime, display_name)
+
+
+# ============================================================
+# CONTENT-ADDRESSED STORAGE
+# ============================================================
+_MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/heic": ".heic",
+    "image/heif": ".heif",
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/webm": ".webm",
+}
+_CONTENT_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,10})?$")
+
+
+def content_filename(sha256: str, mime: Optional[str], original_name: str) -> str:
+    ext = _MIME_EXTENSIONS.get(mime or "")
+    if ext is None:
+        suffix = os.path.splitext(original_name)[1].lower()
+        ext = suffix if re.fullmatch(r"\.[a-z0-9]{1,10}", suffix) else ""
+    return f"{sha256}{ext}"
+
+
+def is_content_addressed(rel: str) -> bool:
+    return bool(rel) and rel.startswith("/uploads/") and bool(_CONTENT_NAME.match(rel.split("/uploads/")[-1]))
+
+
+def staged_path(staged: StagedUpload) -> str:
+    """The /uploads/<file> content address a staged upload will be stored under."""
+    return f"/uploads/{content_filename(staged.sha256, staged.mime, staged.original_name)}"
+
+
+async def place_staged(staged: StagedUpload) -> str:
+    """
+    Move a staged upload to its content address; returns /uploads/<file>.
+
+    Take the blob reference (acquire_blob) first. Its write waits for a
+    deletion pass that holds the blob row, and such a pass removes the file
+    before it commits, so once the reference is held the file is either
+    safe from deletion or already gone and written afresh here.
+    """
+    rel = staged_path(staged)
+    await run_in_threadpool(get_storage().put, staged.tmp_path, rel.split("/uploads/")[-1])
+    return rel
+
+
+async def store_staged(db: Session, staged: StagedUpload) -> str:
+    """Take a reference on a staged upload's blob, then move it to its content address."""
+    acquire_blob(db, staged.sha256, staged_path(staged), staged.size, staged.mime)
+    return await place_staged(staged)
+
+
+async def store_staged_async(db: AsyncSession, staged: StagedUpload) -> str:
+    """store_staged() for handlers on the async engine."""
+    await db.run_sync(acquire_blob, staged.sha256, staged_path(staged), staged.size, staged.mime)
+    return await place_staged(staged)
+
+
+def acquire_blob(db: Session, sha256: str, rel: str, size: int, mime: Optional[str]) -> None:
+    """Add one reference to a blob (committed with the caller's transaction)."""
+    bumped = db.execute(
+        update(models.MediaBlob)
+        .where(models.MediaBlob.sha256 == sha256)
+        .values(ref_count=models.MediaBlob.ref_count + 1)
+    ).rowcount
+    if bumped:
+        return
+    try:
+        with db.begin_nested():
+            db.add(models.MediaBlob(sha256=sha256, path=rel, size=size, mime=mime, ref_count=1))
+    except IntegrityError:
+        # Another request stored the same content first
+        db.execute(
+            update(models.MediaBlob)
+            .where(models.MediaBlob.sha256 == sha256)
+            .values(ref_count=models.MediaBlob.ref_count + 1)
+        )
+
+
+def release_media(db: Session, rel: Optional[str]) -> Optional[str]:
+    """
+    Drop one reference to a local upload.
+
+    Returns the relative path if the file may now be removed (last reference
+    gone, or a legacy file with no blob row); pass it to enqueue_deletions().
+    """
+    if not rel or not rel.startswith("/uploads/"):
+        return None
+    if not is_content_addressed(rel):
+        return rel
+    db.execute(
+        update(models.MediaBlob)
+        .where(models.MediaBlob.path == rel)
+        .values(ref_count=models.MediaBlob.ref_count - 1)
+    )
+    remaining = db.query(models.MediaBlob.ref_count).filter(models.MediaBlob.path == rel).scalar()
+    return rel if remaining is None or remaining <= 0 else None
+
+
+def enqueue_deletions(db: Session, rels: Iterable[Optional[str]]) -> None:
+    """
+    Queue files returned by release_media() for the deletion worker.
+
+    The rows are committed with the caller's transaction, so a file is only
+    removed once the reference change that released it is durable.
+    """
+    now = datetime.utcnow()
+    for rel in sorted({r for r in rels if r}):
+        db.add(models.MediaDeletion(path=rel, not_before=now))
+
+
+# ============================================================
+# LEGACY DEDUPLICATION
+# ============================================================
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_existing(db: Session) -> None:
+    """
+    Convert timestamp-named uploads referenced by products into content-addressed
+    blobs, rewriting product URLs and reference counts. Unreferenced legacy
+    files are left for the orphan collector.
+    """
+    storage = get_storage()
+    moved: dict = {}
+
+    def convert(rel: Optional[str]) -> Optional[str]:
+        if not rel or not rel.startswith("/uploads/") or is_content_addressed(rel):
+            return rel
+        name = rel.split("/uploads/")[-1]
+        if rel not in moved:
+            if not storage.exists(name):
+                return rel
+            with storage.fetch(name) as src:
+                with open(src, "rb") as fh:
+                    mime = sniff_mime(fh.read(64))
+                sha256 = _hash_file(src)
+                filename = content_filename(sha256, mime, name)
+                size = os.path.getsize(src)
+                storage.put(src, filename)
+            delete_derivatives(db, rel)
+            delete_video_metadata(db, rel)
+            moved[rel] = (f"/uploads/{filename}", sha256, size, mime)
+        new_rel, sha256, size, mime = moved[rel]
+        acquire_blob(db, sha256, new_rel, size, mime)
+        return new_rel
+
+    for product in db.query(models.Product).all():
+        if product.image_url:
+            try:
+                imgs = json.loads(product.image_url)
+                imgs = imgs if isinstance(imgs, list) else [imgs]
+            except Exception:
+                imgs = [product.image_url]
+            product.image_url = json.dumps([convert(u) for u in imgs])
+        product.video_url = convert(product.video_url)
+    db.commit()
+
+    for rel in moved:
+        storage.delete(rel.split("/uploads/")[-1])
+    print(f"✅ Converted {len(moved)} legacy upload(s) into {len({m[0] for m in moved.values()})} blob(s).")
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        dedupe_existing(session)
+    finally:
+        session.close()
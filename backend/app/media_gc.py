@@ -0,0 +1,315 @@
+# backend/app/media_gc.py
+"""
+Deferred media deletion and orphaned-upload collection.
+
+Request handlers never touch the filesystem when media is removed: they
+queue the released paths in `media_deletions` (see media.enqueue_deletions)
+and wake a background worker, which drains the queue in batches. Failed
+removals are retried with backoff. The worker starts with the app
+(start_deletion_worker in main.lifespan) and also drains every
+MEDIA_DELETION_INTERVAL_SECONDS, so entries left by a previous process and
+retries that come due are handled without a new request.
+
+The garbage collector covers what the queue never sees. Files in the
+storage backend and the local scratch space that were left behind by failed
+or interrupted requests are compared in bulk against every database
+reference, and unreferenced files older than a grace period are removed:
+
+    python -m app.media_gc                  # collect orphans older than MEDIA_GC_GRACE_HOURS
+    python -m app.media_gc --dry-run        # only list them
+    python -m app.media_gc --grace-hours 1
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import (
+    UPLOAD_DIR, MEDIA_DELETION_BATCH_SIZE, MEDIA_DELETION_INTERVAL_SECONDS,
+    MEDIA_DELETION_MAX_ATTEMPTS, MEDIA_GC_GRACE_HOURS,
+)
+from app.database import SessionLocal, begin_immediate
+from app.media import is_content_addressed
+from app.resumable import purge_expired_sessions, session_dir
+from app.storage import get_storage
+
+_wake = threading.Event()
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def _filename(rel: str) -> str:
+    return rel.split("/uploads/")[-1]
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _stale_entries(directory: str, cutoff: float, keep=lambda name: False) -> List[str]:
+    stale: List[str] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and not keep(entry.name) and entry.stat().st_mtime < cutoff:
+                stale.append(entry.name)
+    return stale
+
+
+def _dependents(db: Session, source_rels: Iterable[str]) -> List[Tuple[str, str, object]]:
+    """(source path, derived file path, row) for image variants and video posters."""
+    rels = list(source_rels)
+    if not rels:
+        return []
+    rows: List[Tuple[str, str, object]] = [
+        (v.source_path, v.path, v)
+        for v in db.query(models.MediaVariant).filter(models.MediaVariant.source_path.in_(rels))
+    ]
+    rows += [
+        (m.source_path, m.poster_path, m)
+        for m in db.query(models.VideoMetadata).filter(models.VideoMetadata.source_path.in_(rels))
+    ]
+    return rows
+
+
+# ============================================================
+# DELETION QUEUE
+# ============================================================
+def process_deletions(db: Session, batch_size: int = MEDIA_DELETION_BATCH_SIZE) -> int:
+    """
+    Remove one batch of due queue entries; returns how many were handled.
+
+    Content-addressed blobs are re-checked first, so a blob that was
+    uploaded again after it was queued keeps its file. The blob rows stay
+    locked (SQLite: the write lock from BEGIN IMMEDIATE) until the files are
+    gone, so an upload of the same content waits in acquire_blob() and
+    places its file afterwards.
+    """
+    storage = get_storage()
+    now = datetime.utcnow()
+    begin_immediate(db)
+    jobs = (
+        db.query(models.MediaDeletion)
+        .filter(models.MediaDeletion.not_before <= now)
+        .order_by(models.MediaDeletion.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not jobs:
+        return 0
+
+    paths = {job.path for job in jobs}
+    blob_paths = [p for p in paths if is_content_addressed(p)]
+    live: Set[str] = set()
+    if blob_paths:
+        db.query(models.MediaBlob).filter(
+            models.MediaBlob.path.in_(blob_paths), models.MediaBlob.ref_count <= 0
+        ).delete(synchronize_session=False)
+        live = {
+            p for (p,) in db.query(models.MediaBlob.path).filter(models.MediaBlob.path.in_(blob_paths))
+        }
+
+    doomed = paths - live
+    dependents = _dependents(db, doomed)
+    failed: Dict[str, str] = {}
+    for rel in doomed:
+        try:
+            storage.delete(_filename(rel))
+        except Exception as e:
+            failed[rel] = str(e)
+    for source_path, path, row in dependents:
+        if source_path in failed:
+            continue
+        try:
+            storage.delete(_filename(path))
+        except Exception:
+            pass
+        db.delete(row)
+
+    for job in jobs:
+        error = failed.get(job.path)
+        if error is None:
+            db.delete(job)
+            continue
+        job.attempts += 1
+        job.last_error = error
+        if job.attempts >= MEDIA_DELETION_MAX_ATTEMPTS:
+            print(f"❌ Giving up on deleting {job.path}: {error}")
+            db.delete(job)
+        else:
+            job.not_before = now + timedelta(seconds=MEDIA_DELETION_INTERVAL_SECONDS * (2 ** job.attempts))
+    db.commit()
+    return len(jobs)
+
+
+def drain_deletions() -> int:
+    """Process due queue entries until none are left; returns the total handled."""
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            handled = process_deletions(db)
+            total += handled
+            if handled < MEDIA_DELETION_BATCH_SIZE:
+                return total
+    finally:
+        db.close()
+
+
+def _run_worker() -> None:
+    while not _stop.is_set():
+        _wake.wait(timeout=MEDIA_DELETION_INTERVAL_SECONDS)
+        _wake.clear()
+        if _stop.is_set():
+            return
+        try:
+            drain_deletions()
+        except Exception as e:
+            print(f"⚠️ Media deletion worker error: {e}")
+
+
+def start_deletion_worker() -> None:
+    """Start the deletion worker if needed and have it drain the queue now (non-blocking)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _stop.clear()
+            _worker = threading.Thread(
+                target=_run_worker, name="media-deletions", daemon=True
+            )
+            _worker.start()
+    _wake.set()
+
+
+def wake_deletion_worker() -> None:
+    """Called after committing queued deletions: drain them now."""
+    start_deletion_worker()
+
+
+def stop_deletion_worker() -> None:
+    """Stop after the current batch."""
+    _stop.set()
+    _wake.set()
+
+
+# ============================================================
+# ORPHAN COLLECTION
+# ============================================================
+def _referenced_filenames(db: Session) -> Set[str]:
+    """Every upload filename the database still points at, gathered in bulk."""
+    referenced: Set[str] = set()
+
+    def add(url: Optional[str]) -> None:
+        if url and "/uploads/" in url:
+            referenced.add(_filename(url))
+
+    rows = db.query(models.Product.image_url, models.Product.video_url).yield_per(1000)
+    for image_url, video_url in rows:
+        add(video_url)
+        if not image_url:
+            continue
+        try:
+            urls = json.loads(image_url)
+        except Exception:
+            urls = [image_url]
+        for url in urls if isinstance(urls, list) else [urls]:
+            add(url)
+
+    # Zero-count blobs are not references; their files are fair game.
+    for (path,) in db.query(models.MediaBlob.path).filter(models.MediaBlob.ref_count > 0).yield_per(1000):
+        add(path)
+    for (path,) in db.query(models.MediaVariant.path).yield_per(1000):
+        add(path)
+    for (path,) in db.query(models.VideoMetadata.poster_path).yield_per(1000):
+        add(path)
+    # Queued paths belong to the deletion worker.
+    for (path,) in db.query(models.MediaDeletion.path).yield_per(1000):
+        add(path)
+    return referenced
+
+
+def collect_orphans(
+    db: Session,
+    grace_hours: float = MEDIA_GC_GRACE_HOURS,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Remove unreferenced files older than `grace_hours` from upload storage,
+    plus abandoned staging and resumable-upload scratch files; returns their
+    names.
+
+    The grace period protects files from requests that are still in flight
+    (staged but not yet committed).
+    """
+    cutoff = time.time() - grace_hours * 3600
+    if not dry_run:
+        purge_expired_sessions(db)
+
+    storage = get_storage()
+    referenced = _referenced_filenames(db)
+    orphans = [
+        f.name for f in storage.iter_files() if f.name not in referenced and f.mtime < cutoff
+    ]
+    # Staged uploads interrupted before they were stored
+    stale_staged = _stale_entries(UPLOAD_DIR, cutoff, keep=lambda name: not name.startswith("."))
+    open_sessions = {f"{sid}.part" for (sid,) in db.query(models.UploadSession.id)}
+    stale_parts = _stale_entries(session_dir(), cutoff, keep=open_sessions.__contains__)
+
+    if dry_run:
+        return orphans + stale_staged + stale_parts
+
+    orphan_rels = [f"/uploads/{name}" for name in orphans]
+    blob_rels = [rel for rel in orphan_rels if is_content_addressed(rel)]
+    # Files are removed before the blob rows are released (as in process_deletions)
+    db.commit()
+    begin_immediate(db)
+    if blob_rels:
+        db.query(models.MediaBlob).filter(
+            models.MediaBlob.path.in_(blob_rels), models.MediaBlob.ref_count <= 0
+        ).delete(synchronize_session=False)
+        # A blob that was re-acquired meanwhile keeps its file
+        revived = {_filename(p) for (p,) in db.query(models.MediaBlob.path).filter(models.MediaBlob.path.in_(blob_rels))}
+        orphans = [name for name in orphans if name not in revived]
+        orphan_rels = [f"/uploads/{name}" for name in orphans]
+    derived_files: List[str] = []
+    for _, path, row in _dependents(db, orphan_rels):
+        derived_files.append(_filename(path))
+        db.delete(row)
+    for name in orphans + derived_files:
+        storage.delete(name)
+    db.commit()
+
+    for name in stale_staged:
+        _remove_file(os.path.join(UPLOAD_DIR, name))
+    for name in stale_parts:
+        _remove_file(os.path.join(session_dir(), name))
+    return orphans + stale_staged + stale_parts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Remove orphaned uploads and drain the deletion queue.")
+    parser.add_argument("--grace-hours", type=float, default=MEDIA_GC_GRACE_HOURS)
+    parser.add_argument("--dry-run", action="store_true", help="list orphans without removing them")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        print(f"🗑️ Processed {drain_deletions()} queued deletion(s).")
+    session = SessionLocal()
+    try:
+        removed = collect_orphans(session, args.grace_hours, args.dry_run)
+    finally:
+        session.close()
+    verb = "Would remove" if args.dry_run else "Removed"
+    for name in removed:
+        print(f"  {name}")
+    print(f"✅ {verb} {len(removed)} orphaned file(s).")
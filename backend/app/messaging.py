@@ -0,0 +1,214 @@
+# backend/app/messaging.py
+"""
+In-app messaging between the users of a match.
+
+A conversation belongs to one match (created on first use) and has one
+participant row per user, taken from match_members. Every request path is
+a fixed number of indexed statements, however long the history or many
+the conversations:
+
+  * post_message()  INSERT the message, move the conversation's
+                    last_message_*, +1 on the other participants' unread
+                    counters (one UPDATE), push to all participants on commit
+  * mark_read()     one UPDATE that sets the reader's last_read_message_id
+                    and recounts their unread messages after it, from the
+                    (conversation_id, id) index
+  * history_page()  keyset scan on (conversation_id, id), newest first
+                    (?before=) or catching up from a known id (?after=)
+
+Writes take the SQLite write lock up front (begin_immediate) because they
+read before they write; post_message() does its reads first, so the lock
+is held only for its three writes. Helpers take a sync Session; async handlers call
+them through AsyncSession.run_sync.
+"""
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from app.database import begin_immediate
+from app.realtime import publish_after_commit
+
+
+def message_event(message: models.Message) -> dict:
+    return {
+        "type": "message",
+        "message": {
+            "id": message.id,
+            "conversation_id": message.conversation_id,
+            "sender_id": message.sender_id,
+            "body": message.body,
+            "created_at": message.created_at.isoformat(),
+        },
+    }
+
+
+def _participant_ids(db: Session, conversation_id: int) -> List[int]:
+    return list(db.scalars(
+        select(models.ConversationParticipant.user_id)
+        .where(models.ConversationParticipant.conversation_id == conversation_id)
+    ))
+
+
+def require_participant(db: Session, conversation_id: int, user_id: int) -> models.ConversationParticipant:
+    participant = db.get(models.ConversationParticipant, (conversation_id, user_id))
+    if participant is None:
+        # Same answer whether the conversation exists or not
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return participant
+
+
+# ============================================================
+# CONVERSATIONS
+# ============================================================
+def get_or_create_conversation(db: Session, match_id: int, user_id: int) -> models.Conversation:
+    """The match's conversation, created with the match's users on first use."""
+    member_ids = list(db.scalars(
+        select(models.MatchMember.user_id).where(models.MatchMember.match_id == match_id)
+    ))
+    if user_id not in member_ids:
+        raise HTTPException(status_code=404, detail="Match not found")
+    if len(member_ids) < 2:
+        raise HTTPException(status_code=400, detail="Both items in this match are yours")
+
+    conversation = db.query(models.Conversation).filter(models.Conversation.match_id == match_id).first()
+    if conversation is not None:
+        return conversation
+    try:
+        with db.begin_nested():
+            conversation = models.Conversation(match_id=match_id)
+            db.add(conversation)
+            db.flush()
+            db.add_all([
+                models.ConversationParticipant(conversation_id=conversation.id, user_id=member_id)
+                for member_id in member_ids
+            ])
+    except IntegrityError:
+        # The other user opened it at the same time
+        conversation = db.query(models.Conversation).filter(models.Conversation.match_id == match_id).one()
+    return conversation
+
+
+def list_conversations(
+    db: Session, user_id: int, skip: int, limit: int
+) -> List[Tuple[models.Conversation, models.ConversationParticipant]]:
+    """The user's conversations, most recently active first."""
+    rows = db.query(models.Conversation, models.ConversationParticipant).join(
+        models.ConversationParticipant,
+        models.ConversationParticipant.conversation_id == models.Conversation.id,
+    ).options(
+        selectinload(models.Conversation.participants),
+        selectinload(models.Conversation.last_message),
+    ).filter(
+        models.ConversationParticipant.user_id == user_id
+    ).order_by(
+        func.coalesce(models.Conversation.last_message_at, models.Conversation.created_at).desc(),
+        models.Conversation.id.desc(),
+    ).offset(skip).limit(limit).all()
+    return [(conversation, participant) for conversation, participant in rows]
+
+
+def total_unread(db: Session, user_id: int) -> int:
+    total = db.query(func.sum(models.ConversationParticipant.unread_count)).filter(
+        models.ConversationParticipant.user_id == user_id
+    ).scalar()
+    return int(total or 0)
+
+
+# ============================================================
+# MESSAGES
+# ============================================================
+def post_message(db: Session, conversation_id: int, sender_id: int, body: str) -> models.Message:
+    # Participants don't change once the conversation exists, so they are
+    # read before taking the write lock, which then covers only the writes
+    participant_ids = _participant_ids(db, conversation_id)
+    if sender_id not in participant_ids:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    db.commit()  # end the read-only transaction
+    begin_immediate(db)
+
+    message = models.Message(conversation_id=conversation_id, sender_id=sender_id, body=body)
+    db.add(message)
+    db.flush()
+    db.execute(
+        update(models.Conversation)
+        .where(models.Conversation.id == conversation_id)
+        .values(last_message_id=message.id, last_message_at=message.created_at)
+    )
+    db.execute(
+        update(models.ConversationParticipant)
+        .where(
+            models.ConversationParticipant.conversation_id == conversation_id,
+            models.ConversationParticipant.user_id != sender_id,
+        )
+        .values(unread_count=models.ConversationParticipant.unread_count + 1)
+    )
+    event = message_event(message)
+    for user_id in participant_ids:
+        publish_after_commit(db, user_id, event)
+    return message
+
+
+def mark_read(db: Session, conversation_id: int, user_id: int, up_to: Optional[int] = None) -> int:
+    """Mark the conversation read up to a message (default: the newest); returns what's left unread."""
+    begin_immediate(db)
+    participant = require_participant(db, conversation_id, user_id)
+    last_message_id = db.query(models.Conversation.last_message_id).filter(
+        models.Conversation.id == conversation_id
+    ).scalar()
+    if up_to is None:
+        if last_message_id is None:
+            return 0  # no messages yet
+        up_to = last_message_id
+    else:
+        # The marker must be a message of this conversation: one past the
+        # newest would hold every later read behind it
+        in_conversation = db.query(models.Message.id).filter(
+            models.Message.id == up_to, models.Message.conversation_id == conversation_id
+        ).first()
+        if in_conversation is None:
+            raise HTTPException(status_code=400, detail="up_to is not a message in this conversation")
+        up_to = min(up_to, last_message_id)
+
+    Participant = models.ConversationParticipant
+    still_unread = select(func.count(models.Message.id)).where(
+        models.Message.conversation_id == conversation_id,
+        models.Message.id > up_to,
+        or_(models.Message.sender_id.is_(None), models.Message.sender_id != user_id),
+    ).scalar_subquery()
+    db.execute(
+        update(Participant)
+        .where(
+            Participant.conversation_id == conversation_id,
+            Participant.user_id == user_id,
+            or_(Participant.last_read_message_id.is_(None), Participant.last_read_message_id < up_to),
+        )
+        .values(last_read_message_id=up_to, unread_count=still_unread)
+        .execution_options(synchronize_session=False)
+    )
+    db.refresh(participant)
+    return participant.unread_count
+
+
+def history_page(
+    db: Session, conversation_id: int, limit: int,
+    before: Optional[int] = None, after: Optional[int] = None,
+) -> Tuple[List[models.Message], Optional[int]]:
+    """
+    One page of a conversation. Newest first, older than `before` when
+    given; or, with `after`, oldest first from just after that id (to catch
+    up after a reconnect). Returns the page and the cursor for the next one.
+    """
+    query = db.query(models.Message).filter(models.Message.conversation_id == conversation_id)
+    if after is not None:
+        rows = query.filter(models.Message.id > after).order_by(models.Message.id).limit(limit + 1).all()
+    else:
+        if before is not None:
+            query = query.filter(models.Message.id < before)
+        rows = query.order_by(models.Message.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
@@ -1,8 +1,9 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, ForeignKey, Float,
-    DateTime, Boolean, func
+    Column, Integer, BigInteger, String, Text, ForeignKey, Float,
+    DateTime, Boolean, Index, UniqueConstraint, func
 )
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from .database import Base
 
 
@@ -71,23 +72,279 @@ class Match(Base):
     id = Column(Integer, primary_key=True, index=True)
     product_a_id = Column(Integer, ForeignKey("products.id"))
     product_b_id = Column(Integer, ForeignKey("products.id"))
-    similarity = Column(Float)
+    # Attribute names used by the API; column names as already created
+    similarity_score = Column("similarity", Float)
     buyer_id = Column(Integer, ForeignKey("users.id"))
     seller_id = Column(Integer, ForeignKey("users.id"))
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    date_matched = Column("timestamp", DateTime, default=datetime.utcnow, index=True)  # index: retention scans
 
     product_a = relationship("Product", foreign_keys=[product_a_id])
     product_b = relationship("Product", foreign_keys=[product_b_id])
     buyer = relationship("User", foreign_keys=[buyer_id])
     seller = relationship("User", foreign_keys=[seller_id])
+    members = relationship("MatchMember", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Ids are never reused once rows move to matches_archive (SQLite would
+    # otherwise hand out the ids of archived rows again)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class MatchMember(Base):
+    """
+    One row per user taking part in a match (the owners of both products),
+    so a user's matches are a single range scan of
+    ix_match_members_user_created. Written together with the match.
+    """
+    __tablename__ = "match_members"
+
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey("matches.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    role = Column(String(10), nullable=False)  # item_type of the user's product: have | need
+    created_at = Column(DateTime, nullable=False)  # = matches.timestamp
+
+    __table_args__ = (
+        UniqueConstraint("match_id", "user_id", name="uq_match_members_match_user"),
+        Index("ix_match_members_user_created", "user_id", created_at.desc()),
+        {"sqlite_autoincrement": True},  # see Match
+    )
 
 
 class Notification(Base):
     __tablename__ = "notifications"
 
+    # Same columns as the add_notifications_table migration
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=True)
+    message = Column(String(255), nullable=False)
+    is_read = Column(Boolean, default=False)
+    date_created = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Digests: notifications with the same key are combined into one row
+    # while it is unread and recent (see notify_coalesced)
+    group_key = Column(String(64), nullable=True)
+    count = Column(Integer, nullable=False, default=1, server_default="1")
+    date_updated = Column(DateTime(timezone=True), nullable=True)
+
+    # Pages are keyset scans by id within a user (see app/notifications.py)
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index("ix_notifications_user_group", "user_id", "group_key"),
+        {"sqlite_autoincrement": True},  # see Match
+    )
+
+
+class NotificationCounter(Base):
+    """Unread notifications per user, kept in step by app/notifications.py."""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+
+
+# ==========================
+# 💬 MESSAGING (see app/messaging.py)
+# ==========================
+class Conversation(Base):
+    """Chat between the users of a match, to arrange the trade."""
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True)
+    # SET NULL: the conversation outlives its match (product deleted, match archived)
+    match_id = Column(Integer, ForeignKey("matches.id", ondelete="SET NULL"), unique=True, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_message_id = Column(Integer, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+
+    participants = relationship("ConversationParticipant", passive_deletes=True)
+    last_message = relationship(
+        "Message", primaryjoin="foreign(Conversation.last_message_id) == Message.id", viewonly=True
+    )
+
+
+class ConversationParticipant(Base):
+    """A user's membership in a conversation, with their unread counter."""
+    __tablename__ = "conversation_participants"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    last_read_message_id = Column(Integer, nullable=True)
+    joined_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_conversation_participants_user", "user_id"),
+    )
+
+
+class Message(Base):
+    __tablename__ = "messages"
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # History pages are keyset scans on (conversation_id, id)
+    __table_args__ = (
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
+
+
+# ==========================
+# 🖼️ MEDIA VARIANT MODEL
+# ==========================
+class MediaVariant(Base):
+    """A resized/re-encoded derivative of an uploaded image."""
+    __tablename__ = "media_variants"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_path = Column(String(255), index=True, nullable=False)  # e.g. /uploads/<file>
+    path = Column(String(255), nullable=False)
+    width = Column(Integer, nullable=False)
+    format = Column(String(10), nullable=False)  # "webp" | "avif"
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ==========================
+# 🎞️ VIDEO METADATA MODEL
+# ==========================
+class VideoMetadata(Base):
+    """Poster frame and probe results for an uploaded video."""
+    __tablename__ = "video_metadata"
+
+    source_path = Column(String(255), primary_key=True)  # /uploads/<file>
+    poster_path = Column(String(255), nullable=False)
+    duration = Column(Float, nullable=True)  # seconds
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    codec = Column(String(50), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ==========================
+# 🧱 MEDIA BLOB MODEL
+# ==========================
+class MediaBlob(Base):
+    """A content-addressed upload, shared by every product that references it."""
+    __tablename__ = "media_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(255), unique=True, nullable=False)  # /uploads/<sha256><ext>
+    size = Column(BigInteger, nullable=False)
+    mime = Column(String(50), nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ==========================
+# 🗑️ MEDIA DELETION QUEUE
+# ==========================
+class MediaDeletion(Base):
+    """A released upload waiting to be removed by the deletion worker."""
+    __tablename__ = "media_deletions"
+
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    message = Column(String)
-    match_id = Column(Integer, ForeignKey("matches.id"), nullable=True)
-    read = Column(Boolean, default=False)
+    path = Column(String(255), nullable=False)  # /uploads/<file>
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    not_before = Column(DateTime, index=True, nullable=False)
+
+
+# ==========================
+# ⏫ RESUMABLE UPLOAD SESSION
+# ==========================
+class UploadSession(Base):
+    """An in-progress chunked video upload for a product."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received = Column(BigInteger, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+
+# ==========================
+# 🚫 REVOKED REFRESH TOKENS
+# ==========================
+class RevokedToken(Base):
+    """
+    A refresh token id (jti) that was used or logged out, or a whole token
+    family revoked after reuse. Rows expire together with the tokens.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(32), unique=True, nullable=False)  # token or family id (uuid4 hex)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    reason = Column(String(20), nullable=False)  # rotated | logout | reuse
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+
+# ==========================
+# 🗄️ ARCHIVES (see app/archiver.py)
+# ==========================
+# Cold rows moved out of matches / match_members / notifications. Same
+# columns and ids as the hot tables, plus archived_at. Products aren't
+# foreign keys here, so archived history never blocks deleting a product.
+class MatchArchive(Base):
+    __tablename__ = "matches_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    product_a_id = Column(Integer)
+    product_b_id = Column(Integer)
+    similarity_score = Column("similarity", Float)
+    buyer_id = Column(Integer)
+    seller_id = Column(Integer)
+    date_matched = Column("timestamp", DateTime)
+    archived_at = Column(DateTime, nullable=False)
+    archived = True  # schemas.MatchOut
+
+    product_a = relationship(
+        "Product", primaryjoin="foreign(MatchArchive.product_a_id) == Product.id", viewonly=True
+    )
+    product_b = relationship(
+        "Product", primaryjoin="foreign(MatchArchive.product_b_id) == Product.id", viewonly=True
+    )
+
+
+class MatchMemberArchive(Base):
+    __tablename__ = "match_members_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    match_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    role = Column(String(10), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_match_members_archive_user_created", "user_id", created_at.desc()),
+    )
+
+
+class NotificationArchive(Base):
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, nullable=True)
+    message = Column(String(255), nullable=False)
+    is_read = Column(Boolean, default=False)
+    date_created = Column(DateTime(timezone=True))
+    group_key = Column(String(64), nullable=True)
+    count = Column(Integer, nullable=False, default=1)
+    date_updated = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+    archived = True  # schemas.NotificationOut
+
+    __table_args__ = (
+        Index("ix_notifications_archive_user_id_id", "user_id", "id"),
+    )
@@ -0,0 +1,250 @@
+# backend/app/notifications.py
+"""
+Notification helpers that keep the per-user unread counter exact.
+
+`notification_counters` holds one row per user with the number of unread
+notifications, so the badge is a primary-key lookup instead of a COUNT over
+the user's whole history. Everything that changes which rows are unread
+goes through here and adjusts the counter in the same transaction:
+
+  * notify()              adds notifications, +1 per user per unread row,
+                          and pushes them on commit (app/realtime.py)
+  * notify_coalesced()    same, but folds notifications about one subject
+                          into a single unread digest row per user
+  * mark_read()           one UPDATE for a list of ids or everything up to
+                          a cursor, then -rowcount (rows that actually flipped)
+  * delete_for_product()  drops a product's notifications, -unread per user
+
+Coalescing keeps the table growing with users rather than with events: a
+product that matches hundreds of others leaves its owner one row ("12 new
+matches for 'left earbud'"), updated in place while it is unread and
+younger than NOTIFICATION_DIGEST_WINDOW_SECONDS.
+
+Listing is keyset-paginated on id, newest first. The cursor is the id of the
+last notification on the previous page, so a page costs one index range
+scan on (user_id, id) however deep the user scrolls.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import NOTIFICATION_DIGEST_WINDOW_SECONDS
+from app.realtime import publish_after_commit
+
+# NULL is_read (rows written outside the ORM) counts as unread
+_UNREAD = models.Notification.is_read.isnot(True)
+
+
+# ============================================================
+# COUNTER
+# ============================================================
+def _adjust_unread(db: Session, user_id: int, delta: int) -> None:
+    """Add `delta` to a user's unread counter (committed with the caller)."""
+    if not delta:
+        return
+    counter = models.NotificationCounter
+    bumped = db.execute(
+        update(counter).where(counter.user_id == user_id).values(unread=counter.unread + delta)
+    ).rowcount
+    if bumped:
+        return
+    try:
+        with db.begin_nested():
+            db.add(counter(user_id=user_id, unread=max(delta, 0)))
+    except IntegrityError:
+        # Another transaction created the row first
+        db.execute(
+            update(counter).where(counter.user_id == user_id).values(unread=counter.unread + delta)
+        )
+
+
+def adjust_unread_many(db: Session, deltas: Dict[int, int]) -> None:
+    """Add to several users' unread counters: one UPDATE for existing counters, one INSERT for new ones."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    counter = models.NotificationCounter
+    existing = {row.user_id for row in db.query(counter.user_id).filter(counter.user_id.in_(list(deltas)))}
+    if existing:
+        db.execute(
+            update(counter.__table__)
+            .where(counter.__table__.c.user_id == bindparam("uid"))
+            .values(unread=counter.__table__.c.unread + bindparam("delta")),
+            [{"uid": user_id, "delta": deltas[user_id]} for user_id in existing],
+        )
+    missing = [user_id for user_id in deltas if user_id not in existing]
+    if not missing:
+        return
+    try:
+        with db.begin_nested():
+            db.add_all([counter(user_id=user_id, unread=max(deltas[user_id], 0)) for user_id in missing])
+    except IntegrityError:
+        # Some were created concurrently; fall back to one at a time
+        for user_id in missing:
+            _adjust_unread(db, user_id, deltas[user_id])
+
+
+def unread_count(db: Session, user_id: int) -> int:
+    unread = db.query(models.NotificationCounter.unread).filter(
+        models.NotificationCounter.user_id == user_id
+    ).scalar()
+    return max(unread or 0, 0)
+
+
+# ============================================================
+# WRITES
+# ============================================================
+def notify(db: Session, notifications: Iterable[models.Notification]) -> List[models.Notification]:
+    """
+    Add notifications, count them as unread for their users, and push them
+    to the users' open connections once the transaction commits.
+    """
+    notifications = [n for n in notifications if n.user_id is not None]
+    if not notifications:
+        return notifications
+    db.add_all(notifications)
+    adjust_unread_many(db, Counter(n.user_id for n in notifications if not n.is_read))
+    db.flush()  # ids for the pushed events
+    for n in notifications:
+        _push(db, n)
+    return notifications
+
+
+class PendingNotification(NamedTuple):
+    """A notification for notify_coalesced(); ones with the same user_id and key are combined."""
+    user_id: int
+    key: str                                 # subject, e.g. "match:<product id>" (max 64 chars)
+    message: str                             # text while it's the only one
+    product_id: Optional[int] = None
+    digest_message: Optional[str] = None     # text for several; "{count}" is replaced
+    digest_product_id: Optional[int] = None  # product a digest points at (default product_id)
+
+
+def notify_coalesced(db: Session, pending: Iterable[PendingNotification]) -> None:
+    """
+    Write notifications combined per (user, key): into the user's unread
+    digest for that key if one was created in the digest window, otherwise
+    into one new row per group. Digests already stored are locked and
+    updated in one flush, new rows are inserted in one batch.
+    """
+    groups: Dict[Tuple[int, str], List[PendingNotification]] = {}
+    for p in pending:
+        if p.user_id is not None:
+            groups.setdefault((p.user_id, p.key), []).append(p)
+    if not groups:
+        return
+
+    open_digests: Dict[Tuple[int, str], models.Notification] = {}
+    if NOTIFICATION_DIGEST_WINDOW_SECONDS > 0:
+        since = datetime.now(timezone.utc) - timedelta(seconds=NOTIFICATION_DIGEST_WINDOW_SECONDS)
+        rows = db.query(models.Notification).filter(
+            models.Notification.user_id.in_({user_id for user_id, _ in groups}),
+            models.Notification.group_key.in_({key for _, key in groups}),
+            models.Notification.date_created >= since,
+            _UNREAD,
+        ).order_by(models.Notification.id).with_for_update().all()
+        for row in rows:
+            open_digests[(row.user_id, row.group_key)] = row  # newest wins
+
+    now = datetime.now(timezone.utc)
+    updated, new = [], []
+    for (user_id, key), items in groups.items():
+        last = items[-1]
+        row = open_digests.get((user_id, key))
+        count = len(items) + ((row.count or 1) if row is not None else 0)
+        if count == 1:
+            new.append(models.Notification(
+                user_id=user_id, product_id=last.product_id, message=last.message, group_key=key,
+            ))
+            continue
+        message = (last.digest_message or last.message).replace("{count}", str(count))
+        product_id = last.digest_product_id if last.digest_product_id is not None else last.product_id
+        if row is None:
+            new.append(models.Notification(
+                user_id=user_id, product_id=product_id, message=message, group_key=key, count=count,
+            ))
+        else:
+            # Still one unread row: the counter doesn't change
+            row.count, row.message, row.product_id, row.date_updated = count, message, product_id, now
+            updated.append(row)
+
+    if updated:
+        db.flush()
+        for row in updated:
+            _push(db, row)
+    notify(db, new)
+
+
+def _push(db: Session, n: models.Notification) -> None:
+    publish_after_commit(db, n.user_id, {
+        "type": "notification",
+        "notification": {
+            "id": n.id, "product_id": n.product_id, "message": n.message,
+            "is_read": bool(n.is_read), "count": n.count or 1,
+        },
+    })
+
+
+def mark_read(
+    db: Session, user_id: int, ids: Optional[Sequence[int]] = None, up_to: Optional[int] = None
+) -> int:
+    """
+    Mark the user's notifications read in one statement, either the given
+    ids or every notification with id <= up_to. Returns how many were
+    unread before.
+    """
+    stmt = update(models.Notification).where(models.Notification.user_id == user_id, _UNREAD)
+    if ids is not None:
+        stmt = stmt.where(models.Notification.id.in_(ids))
+    else:
+        stmt = stmt.where(models.Notification.id <= up_to)
+    flipped = db.execute(
+        stmt.values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+    _adjust_unread(db, user_id, -flipped)
+    return flipped
+
+
+def delete_for_product(db: Session, product_id: int) -> None:
+    """Delete notifications about a product (before the product itself)."""
+    unread = db.query(models.Notification.user_id, func.count()).filter(
+        models.Notification.product_id == product_id, _UNREAD
+    ).group_by(models.Notification.user_id).all()
+    for user_id, count in unread:
+        _adjust_unread(db, user_id, -count)
+    db.query(models.Notification).filter(
+        models.Notification.product_id == product_id
+    ).delete(synchronize_session=False)
+
+
+# ============================================================
+# READS
+# ============================================================
+def list_page(
+    db: Session, user_id: int, cursor: Optional[int], limit: int,
+    unread_only: bool = False, include_archived: bool = False,
+) -> Tuple[List[models.Notification], Optional[int]]:
+    """
+    One page of notifications, newest first, and the cursor for the next.
+    With include_archived, rows from notifications_archive (same ids) are
+    merged in, so the cursor runs on into archived history.
+    """
+    def page(model):
+        query = db.query(model).filter(model.user_id == user_id)
+        if cursor is not None:
+            query = query.filter(model.id < cursor)
+        if unread_only:
+            query = query.filter(model.is_read.isnot(True))
+        return query.order_by(model.id.desc()).limit(limit + 1).all()
+
+    rows = page(models.Notification)
+    if include_archived:
+        rows = sorted(rows + page(models.NotificationArchive), key=lambda n: n.id, reverse=True)[:limit + 1]
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
@@ -0,0 +1,138 @@
+# backend/app/passwords.py
+"""
+Password hashing on a dedicated process pool.
+
+bcrypt is deliberately slow CPU work. Run inline, a burst of logins ties up
+the request thread pool (and the GIL) and starves every other endpoint. Here
+hashing and verification run in a small pool of worker processes. Request
+handlers use the *_async functions and await the result, so a queue of
+logins holds no server threads; the plain functions block and are meant for
+scripts. The number of queued and running jobs is capped: beyond
+PASSWORD_HASH_MAX_PENDING the request is shed with 503 instead of piling up
+behind the pool.
+
+BCRYPT_ROUNDS sets the cost for new hashes. Hashes with a different cost
+are flagged by verify_and_update() so login can re-hash them.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+# ============================================================
+# WORKER FUNCTIONS (run in the pool processes)
+# ============================================================
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+# ============================================================
+# POOL
+# ============================================================
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: never fork a process that is already running server threads
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _admit() -> None:
+    if not _pending.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in attempts in progress. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+
+def _run(fn, *args):
+    _admit()
+    try:
+        executor = _get_executor()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool and retry once
+            print("⚠️ Password hashing pool broke; restarting it")
+            _reset_executor(executor)
+            return _get_executor().submit(fn, *args).result()
+    finally:
+        _pending.release()
+
+
+async def _run_async(fn, *args):
+    _admit()
+    try:
+        executor = _get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        except BrokenProcessPool:
+            print("⚠️ Password hashing pool broke; restarting it")
+            _reset_executor(executor)
+            return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        _pending.release()
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return _run(_verify, password, hashed)
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return _run(_verify_and_update, password, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+
+async def verify_and_update_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Awaitable verify_and_update()."""
+    return await _run_async(_verify_and_update, password, hashed)
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
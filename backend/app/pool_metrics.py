@@ -0,0 +1,107 @@
+# backend/app/pool_metrics.py
+"""
+Connection pool instrumentation.
+
+The engines in app.database use these pool classes. They behave exactly like
+SQLAlchemy's QueuePool / AsyncAdaptedQueuePool, and also record how long
+each checkout waited for a connection and how many checkouts timed out.
+pool_stats() adds the live pool state (checked out, overflow, idle) and is
+served at /internal/metrics.
+"""
+import bisect
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds of the wait-time buckets, in milliseconds
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_engines: Dict[str, Engine] = {}
+
+
+class Histogram:
+    def __init__(self, bounds=WAIT_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{b}ms" for b in self.bounds] + ["gt_30000ms"]
+            return {
+                "count": self.total,
+                "mean_ms": round(self.sum_ms / self.total, 3) if self.total else None,
+                "max_ms": round(self.max_ms, 3),
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_histogram.observe((time.perf_counter() - start) * 1000)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep the counters
+        new_pool = super().recreate()
+        new_pool.wait_histogram = self.wait_histogram
+        new_pool.timeouts = self.timeouts
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_engine(name: str, engine) -> None:
+    """Report `engine` (sync or async) in pool_stats() under `name`."""
+    _engines[name] = getattr(engine, "sync_engine", engine)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    stats = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        entry: Dict[str, Any] = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(0, pool.overflow()),
+                max_overflow=pool._max_overflow,
+                timeout_seconds=pool.timeout(),
+            )
+        if isinstance(pool, _InstrumentedPoolMixin):
+            entry.update(timeouts=pool.timeouts, wait=pool.wait_histogram.snapshot())
+        stats[name] = entry
+    return stats
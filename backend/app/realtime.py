@@ -0,0 +1,385 @@
+# backend/app/realtime.py
+"""
+Push channel for notifications and matches (/realtime/ws, /realtime/events).
+
+Code that writes a notification or a match queues an event on its session
+with publish_after_commit(). Events only leave the process once that
+transaction commits, and are dropped on rollback. They then reach every
+worker through the configured backend (REALTIME_BACKEND):
+
+    local     this process only (single worker)
+    unix      one Unix datagram socket per worker in REALTIME_SOCKET_DIR;
+              the committing worker sends each event to the others (one host)
+    postgres  pg_notify() inside the committing transaction, and a LISTEN
+              connection per worker. Postgres delivers only on commit.
+
+Each worker then hands the event to its own subscribers, which are the open
+WebSocket/SSE connections of that user. Every connection has a bounded
+queue (REALTIME_QUEUE_SIZE). A client that falls behind has its queue
+emptied and gets a single {"type": "resync"} event, telling it to refetch
+over REST, so a slow client never makes the server buffer without limit.
+
+The unix backend packs a commit's events into datagrams under
+MAX_DATAGRAM_BYTES. A worker whose socket buffer was full when a datagram was
+sent gets a resync datagram before the next one, and resyncs all its clients.
+An event too big for one datagram (or one Postgres NOTIFY) is sent to other
+workers as a resync for that user.
+"""
+import asyncio
+import json
+import os
+import socket
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.config import REALTIME_BACKEND, REALTIME_PG_CHANNEL, REALTIME_QUEUE_SIZE, REALTIME_SOCKET_DIR
+
+Event = Dict[str, object]
+RESYNC: Event = {"type": "resync"}
+
+MAX_DATAGRAM_BYTES = 60 * 1024  # receivers read up to 64 KB
+MAX_NOTIFY_BYTES = 7999  # Postgres NOTIFY payload limit
+_RESYNC_DATAGRAM = b'"resync"'
+
+
+# ============================================================
+# SUBSCRIPTIONS
+# ============================================================
+class Subscription:
+    """One connection's event queue. Only touched on the event loop."""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event: Event) -> bool:
+        if self.overflowed:
+            return False  # a resync is already pending; it covers this event
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.overflowed = True
+            return False
+
+    async def get(self) -> Event:
+        event = await self.queue.get()
+        if event is RESYNC:
+            self.overflowed = False
+        return event
+
+
+class Hub:
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.backend = None
+        self.delivered = 0
+        self.resyncs = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.backend = make_backend(REALTIME_BACKEND)
+        await self.backend.start(self)
+        print(f"📡 Realtime push via {self.backend.name} backend")
+
+    async def stop(self) -> None:
+        if self.backend is not None:
+            await self.backend.stop()
+        self.backend = None
+        self._loop = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        sub = Subscription(user_id, REALTIME_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscribers.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+
+    # --- called from any thread ---
+    def publish(self, events: List[Tuple[int, Event]]) -> None:
+        """Send committed events to every worker (this one included)."""
+        if self.backend is not None and events:
+            self.backend.publish(events)
+
+    def deliver(self, events: List[Tuple[int, Event]]) -> None:
+        """Hand events to this process's subscribers."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, events)
+
+    def resync_all(self) -> None:
+        """Events may have been missed (backend reconnected); tell everyone to refetch."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._resync_all)
+
+    # --- event loop only ---
+    def _deliver(self, events: List[Tuple[int, Event]]) -> None:
+        for user_id, evt in events:
+            for sub in tuple(self._subscribers.get(user_id, ())):
+                behind = sub.overflowed
+                if sub.offer(evt):
+                    self.delivered += 1
+                elif not behind:
+                    self.resyncs += 1
+
+    def _resync_all(self) -> None:
+        for subs in self._subscribers.values():
+            for sub in subs:
+                sub.offer(RESYNC)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend is not None else None,
+            "users": len(self._subscribers),
+            "connections": sum(len(subs) for subs in self._subscribers.values()),
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+
+hub = Hub()
+
+
+def _decode(payload) -> List[Tuple[int, Event]]:
+    return [(int(user_id), evt) for user_id, evt in json.loads(payload)]
+
+
+def _encode_one(user_id: int, evt: Event, limit: int) -> bytes:
+    """One encoded [user_id, event]; a resync for the user if it is over `limit`."""
+    item = json.dumps([user_id, evt], default=str).encode()
+    if len(item) + 2 > limit:
+        item = json.dumps([user_id, RESYNC]).encode()
+    return item
+
+
+def _datagrams(events: List[Tuple[int, Event]], limit: int = MAX_DATAGRAM_BYTES) -> List[bytes]:
+    """Encoded events packed into JSON arrays of at most `limit` bytes, in order."""
+    datagrams, batch, size = [], [], 2
+    for user_id, evt in events:
+        item = _encode_one(user_id, evt, limit)
+        if batch and size + len(item) + 1 > limit:
+            datagrams.append(b"[" + b",".join(batch) + b"]")
+            batch, size = [], 2
+        batch.append(item)
+        size += len(item) + 1
+    if batch:
+        datagrams.append(b"[" + b",".join(batch) + b"]")
+    return datagrams
+
+
+# ============================================================
+# BACKENDS
+# ============================================================
+class LocalBackend:
+    name = "local"
+
+    async def start(self, hub: Hub) -> None:
+        self.hub = hub
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, events: List[Tuple[int, Event]]) -> None:
+        self.hub.deliver(events)
+
+
+class UnixSocketBackend(LocalBackend):
+    """Workers on one host; each binds <REALTIME_SOCKET_DIR>/worker-<pid>.sock."""
+    name = "unix"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"worker-{os.getpid()}.sock")
+        self.dropped = 0
+        self._behind: Set[str] = set()  # peers that missed a datagram
+
+    async def start(self, hub: Hub) -> None:
+        self.hub = hub
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.bind(self.path)
+        self._receiver.setblocking(False)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._receiver.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        self._loop.remove_reader(self._receiver.fileno())
+        self._receiver.close()
+        self._sender.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                payload = self._receiver.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            if payload == _RESYNC_DATAGRAM:
+                self.hub.resync_all()
+                continue
+            try:
+                self.hub.deliver(_decode(payload))
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ Ignoring malformed realtime datagram: {e}")
+
+    def publish(self, events: List[Tuple[int, Event]]) -> None:
+        self.hub.deliver(events)
+        datagrams = _datagrams(events)
+        try:
+            peers = [entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".sock")]
+        except FileNotFoundError:
+            return
+        for peer in peers:
+            if peer == self.path:
+                continue
+            if peer in self._behind:
+                # Its clients missed events; they refetch before getting new ones
+                if not self._send(peer, _RESYNC_DATAGRAM):
+                    continue
+                self._behind.discard(peer)
+            for payload in datagrams:
+                if not self._send(peer, payload):
+                    break
+
+    def _send(self, peer: str, payload: bytes) -> bool:
+        try:
+            self._sender.sendto(payload, peer)
+            return True
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Socket left behind by a worker that exited
+            self._behind.discard(peer)
+            try:
+                os.unlink(peer)
+            except OSError:
+                pass
+        except (BlockingIOError, OSError):
+            # The peer's receive buffer is full; it gets a resync next time
+            self.dropped += 1
+            self._behind.add(peer)
+        return False
+
+
+class PostgresBackend(LocalBackend):
+    """NOTIFY in the writing transaction, LISTEN on one connection per worker."""
+    name = "postgres"
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+
+    async def start(self, hub: Hub) -> None:
+        self.hub = hub
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _listen(self) -> None:
+        import asyncpg  # only needed for this backend
+
+        def on_notify(connection, pid, channel, payload):
+            try:
+                self.hub.deliver(_decode(payload))
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ Ignoring malformed realtime notification: {e}")
+
+        backoff = 1.0
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except Exception as e:
+                print(f"⚠️ Realtime LISTEN connection failed ({e}); retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            backoff = 1.0
+            try:
+                await conn.add_listener(self.channel, on_notify)
+                # Anything sent while we weren't listening is lost
+                self.hub.resync_all()
+                while True:
+                    await asyncio.sleep(10)
+                    await conn.execute("SELECT 1")  # notice a dead connection
+            except asyncio.CancelledError:
+                await conn.close()
+                raise
+            except Exception as e:
+                print(f"⚠️ Realtime LISTEN connection lost ({e}); reconnecting")
+                conn.terminate()
+
+    def notify_in_transaction(self, session: Session, events: List[Tuple[int, Event]]) -> None:
+        for user_id, evt in events:
+            item = _encode_one(user_id, evt, MAX_NOTIFY_BYTES)
+            session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": (b"[" + item + b"]").decode()},
+            )
+
+    def publish(self, events: List[Tuple[int, Event]]) -> None:
+        # Sent with the transaction (notify_in_transaction); only reached for
+        # sessions that weren't on the primary Postgres engine
+        pass
+
+
+def make_backend(name: str):
+    if name == "unix":
+        return UnixSocketBackend(REALTIME_SOCKET_DIR)
+    if name == "postgres":
+        from sqlalchemy.engine import make_url
+        from app.database import sqlalchemy_url
+
+        dsn = make_url(sqlalchemy_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBackend(dsn, REALTIME_PG_CHANNEL)
+    if name != "local":
+        raise RuntimeError(f"Unknown REALTIME_BACKEND '{name}' (use local, unix or postgres)")
+    return LocalBackend()
+
+
+# ============================================================
+# PUBLISHING FROM A SESSION
+# ============================================================
+def publish_after_commit(db: Session, user_id: int, evt: Event) -> None:
+    """Push `evt` to the user's connections once this session commits."""
+    db.info.setdefault("realtime_events", []).append((user_id, evt))
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_with_commit(session):
+    backend = hub.backend
+    if isinstance(backend, PostgresBackend) and session.info.get("realtime_events"):
+        if session.get_bind().dialect.name == "postgresql":
+            backend.notify_in_transaction(session, session.info.pop("realtime_events"))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    events = session.info.pop("realtime_events", None)
+    if events:
+        hub.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("realtime_events", None)
@@ -0,0 +1,246 @@
+# backend/app/remote_uploads.py
+"""
+Concurrent uploads to Cloudinary.
+
+Uploads are blocking HTTP calls, so they run on a bounded thread pool
+instead of inside async handlers. All workers share one keep-alive urllib3
+pool sized to the worker count; the SDK is only used to sign the requests
+and build their URLs, because its own pool keeps one connection per host and
+has no public setting for its size. Transient failures are retried with
+exponential backoff, and a whole batch is bounded by a single deadline.
+
+A batch is all or nothing. If any upload fails the request gets a 502, and
+past the deadline a 504. Either way the workers stop retrying, jobs that
+haven't started are dropped, and whatever did reach Cloudinary (now or
+after the response) is destroyed again. The SDK is imported and configured
+on the first upload, so local-mode servers never load it.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import (
+    UPLOAD_MODE, CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET,
+    CLOUDINARY_UPLOAD_PREFIX, REMOTE_UPLOAD_WORKERS, REMOTE_UPLOAD_RETRIES,
+    REMOTE_UPLOAD_BACKOFF_SECONDS, REMOTE_UPLOAD_DEADLINE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FOLDER = "makeitwhole/products/images"
+VIDEO_FOLDER = "makeitwhole/products/videos"
+
+# (file, folder, resource_type)
+UploadJob = Tuple[UploadFile, str, str]
+
+# .../<resource_type>/upload/[v<version>/]<public_id>.<format>
+_DELIVERY_PATH = re.compile(r"/(image|video|raw)/upload/(?:v\d+/)?(.+)$")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_http = None  # urllib3.PoolManager shared by the upload workers
+
+
+# ============================================================
+# SETUP
+# ============================================================
+def configure_cloudinary() -> None:
+    """Apply credentials and create the HTTP pool, one connection per worker."""
+    global _http
+    import cloudinary
+    import urllib3
+
+    options = dict(
+        cloud_name=CLOUDINARY_CLOUD_NAME,
+        api_key=CLOUDINARY_API_KEY,
+        api_secret=CLOUDINARY_API_SECRET,
+    )
+    if CLOUDINARY_UPLOAD_PREFIX:
+        options["upload_prefix"] = CLOUDINARY_UPLOAD_PREFIX
+    cloudinary.config(**options)
+    _http = urllib3.PoolManager(maxsize=REMOTE_UPLOAD_WORKERS, **cloudinary.CERT_KWARGS)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        if UPLOAD_MODE == "cloudinary" and CLOUDINARY_CLOUD_NAME:
+            configure_cloudinary()
+        _executor = ThreadPoolExecutor(
+            max_workers=REMOTE_UPLOAD_WORKERS, thread_name_prefix="cloudinary-upload"
+        )
+    return _executor
+
+
+# ============================================================
+# SINGLE UPLOAD
+# ============================================================
+class UploadFailed(Exception):
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _post_upload(job: UploadJob, timeout: float) -> dict:
+    """One signed upload request; returns Cloudinary's response body."""
+    import cloudinary
+    import cloudinary.utils
+    import urllib3
+
+    file, folder, resource_type = job
+    params = cloudinary.utils.sign_request(cloudinary.utils.build_upload_params(folder=folder), {})
+    fields = [(name, value) for name, value in params.items() if value]
+    file.file.seek(0)
+    fields.append(("file", cloudinary.utils.handle_file_parameter(file.file, file.filename)))
+    try:
+        response = _http.request(
+            "POST",
+            cloudinary.utils.cloudinary_api_url("upload", resource_type=resource_type),
+            fields=fields,
+            headers={"User-Agent": cloudinary.get_user_agent()},
+            timeout=timeout,
+            retries=False,
+        )
+    except (urllib3.exceptions.HTTPError, OSError) as e:
+        raise UploadFailed(f"connection error: {e!r}", retryable=True)
+
+    # 5xx and rate limits are worth another try; other 4xx are permanent
+    retryable = response.status >= 500 or response.status == 429
+    try:
+        result = json.loads(response.data.decode("utf-8"))
+    except ValueError:
+        raise UploadFailed(f"HTTP {response.status} with an unreadable body", retryable=True)
+    if response.status >= 400 or "error" in result:
+        message = (result.get("error") or {}).get("message", "")
+        raise UploadFailed(f"HTTP {response.status}: {message}", retryable=retryable)
+    return result
+
+
+def _destroy(results: List[dict]) -> None:
+    """Remove uploads that won't be used (best effort)."""
+    import cloudinary.uploader
+
+    for result in results:
+        try:
+            cloudinary.uploader.destroy(result["public_id"], resource_type=result.get("resource_type", "image"))
+        except Exception as e:
+            logger.warning("Could not remove abandoned Cloudinary upload %s: %s", result.get("public_id"), e)
+
+
+def _result_for_url(url: str) -> Optional[dict]:
+    """The public_id/resource_type behind a secure_url, as _destroy() needs them."""
+    match = _DELIVERY_PATH.search(urlparse(url).path)
+    if not match:
+        return None
+    resource_type, public_id = match.groups()
+    if resource_type != "raw":  # raw public ids keep their extension
+        public_id = public_id.rsplit(".", 1)[0]
+    return {"public_id": public_id, "resource_type": resource_type}
+
+
+def destroy_uploads(urls: Sequence[Optional[str]]) -> None:
+    """Queue removal of uploads a request won't keep after all (non-blocking)."""
+    results = [r for r in (_result_for_url(url) for url in urls if url) if r]
+    if results:
+        _get_executor().submit(_destroy, results)
+
+
+# ============================================================
+# BATCHES
+# ============================================================
+class _Batch:
+    """State shared by the workers of one upload_many() call."""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.cancelled = threading.Event()
+        self.uploaded: List[dict] = []
+        self._lock = threading.Lock()
+
+    def keep(self, result: dict) -> bool:
+        """Record a finished upload; False if the batch was abandoned meanwhile."""
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            self.uploaded.append(result)
+            return True
+
+    def cancel(self) -> List[dict]:
+        """Stop the workers; returns the uploads finished so far."""
+        with self._lock:
+            self.cancelled.set()
+            return list(self.uploaded)
+
+
+def _upload_with_retries(job: UploadJob, batch: _Batch) -> Optional[str]:
+    filename = job[0].filename
+    attempt = 0
+    while True:
+        remaining = batch.deadline - time.monotonic()
+        if remaining <= 0 or batch.cancelled.is_set():
+            return None
+        try:
+            result = _post_upload(job, timeout=remaining)
+        except Exception as e:
+            attempt += 1
+            if attempt > REMOTE_UPLOAD_RETRIES or not getattr(e, "retryable", False):
+                logger.error("Cloudinary upload failed for '%s': %s", filename, e)
+                batch.cancel()  # the batch fails anyway; stop the other uploads
+                return None
+            delay = REMOTE_UPLOAD_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.5)
+            if time.monotonic() + delay >= batch.deadline:
+                logger.error("Cloudinary upload for '%s' ran out of time: %s", filename, e)
+                batch.cancel()
+                return None
+            logger.info("Retrying Cloudinary upload for '%s' in %.2fs (%s)", filename, delay, e)
+            if batch.cancelled.wait(delay):
+                return None
+            continue
+
+        if not batch.keep(result):
+            _destroy([result])  # finished after the request gave up on it
+            return None
+        return result.get("secure_url")
+
+
+async def upload_many(
+    jobs: Sequence[UploadJob],
+    deadline_seconds: float = REMOTE_UPLOAD_DEADLINE_SECONDS,
+) -> List[str]:
+    """
+    Upload several files concurrently and return their URLs in job order.
+
+    Raises 502 if any upload fails and 504 past the deadline; in both cases
+    nothing from the batch is kept.
+    """
+    if not jobs:
+        return []
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    batch = _Batch(time.monotonic() + deadline_seconds)
+    futures = [loop.run_in_executor(executor, _upload_with_retries, job, batch) for job in jobs]
+    try:
+        urls = await asyncio.wait_for(asyncio.gather(*futures), timeout=deadline_seconds)
+    except asyncio.TimeoutError:
+        # gather() cancelled the jobs that hadn't started; running ones see the flag
+        executor.submit(_destroy, batch.cancel())
+        raise HTTPException(status_code=504, detail="Media upload to storage timed out")
+    if not all(urls):
+        executor.submit(_destroy, batch.cancel())
+        raise HTTPException(status_code=502, detail="Media upload to storage failed")
+    return urls
+
+
+async def upload_to_cloudinary(file: UploadFile, folder: str, resource_type: str = "auto") -> str:
+    """Upload a single file off the event loop."""
+    urls = await upload_many([(file, folder, resource_type)])
+    return urls[0]
@@ -0,0 +1,183 @@
+# backend/app/resumable.py
+"""
+Server-side storage for resumable (chunked) video uploads.
+
+A session's bytes are appended to `<SESSION_DIR>/<upload_id>.part`. The part
+file's size is the authoritative offset: a chunk is accepted only if it
+starts exactly there, and bytes received before a dropped connection are
+kept so the client can resume from the reported offset. One chunk is written
+at a time: a writer holds an exclusive lock on the part file from the offset
+check to the last byte, and a second chunk for the same session (a client
+retrying while its first request is still streaming) gets 409. On finalize the part
+file is hashed and moved into the content-addressed store like any other
+upload. Abandoned sessions expire after RESUMABLE_UPLOAD_TTL_HOURS of
+inactivity.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.config import UPLOAD_DIR, MAX_UPLOAD_FILE_BYTES, RESUMABLE_UPLOAD_TTL_HOURS, UPLOAD_CHUNK_SIZE
+from app.media import StagedUpload, sniff_mime
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the single-process dev server, covered by _writing
+    fcntl = None
+
+# Sessions with a chunk being written by this process (when flock is unavailable)
+_writing = set()
+
+
+def session_dir() -> str:
+    # Sibling of UPLOAD_DIR: same filesystem (atomic rename), not publicly served
+    path = os.path.join(os.path.dirname(UPLOAD_DIR), "upload_sessions")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def part_path(upload_id: str) -> str:
+    return os.path.join(session_dir(), f"{upload_id}.part")
+
+
+def next_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(hours=RESUMABLE_UPLOAD_TTL_HOURS)
+
+
+def create_part_file(upload_id: str) -> None:
+    open(part_path(upload_id), "wb").close()
+
+
+def current_offset(upload_id: str) -> int:
+    try:
+        return os.path.getsize(part_path(upload_id))
+    except FileNotFoundError:
+        return 0
+
+
+def _lock_part(fh, upload_id: str) -> bool:
+    """Take the session's write lock without waiting; False if another chunk holds it."""
+    if fcntl is None:
+        if upload_id in _writing:
+            return False
+        _writing.add(upload_id)
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+async def append_chunk(
+    upload_session: models.UploadSession,
+    offset: int,
+    stream: AsyncIterator[bytes],
+) -> int:
+    """
+    Append a request body to the session's part file starting at `offset`.
+
+    Returns the new offset. Raises 409 if another chunk for the session is
+    still being written or `offset` is not the current end of the file, and
+    413 if the chunk would run past the declared total size. Bytes written
+    before a client disconnect are kept.
+    """
+    path = part_path(upload_session.id)
+    fh = await run_in_threadpool(open, path, "r+b")
+    locked = False
+    try:
+        locked = _lock_part(fh, upload_session.id)
+        actual = os.fstat(fh.fileno()).st_size
+        if not locked:
+            raise HTTPException(
+                status_code=409,
+                detail="Another chunk for this upload is still being written",
+                headers={"Upload-Offset": str(actual)},
+            )
+        if actual != offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload offset mismatch: expected {actual}",
+                headers={"Upload-Offset": str(actual)},
+            )
+        await run_in_threadpool(fh.seek, offset)
+
+        position = offset
+        async for data in stream:
+            if not data:
+                continue
+            if position + len(data) > upload_session.total_size:
+                raise HTTPException(status_code=413, detail="Chunk exceeds declared upload size")
+            if position == 0:
+                mime = sniff_mime(data)
+                if mime is None or not mime.startswith("video/"):
+                    raise HTTPException(status_code=415, detail="Upload is not a supported video file")
+            await run_in_threadpool(fh.write, data)
+            position += len(data)
+        return position
+    finally:
+        try:
+            await run_in_threadpool(fh.close)  # flushes, then drops the flock
+        finally:
+            if locked and fcntl is None:
+                _writing.discard(upload_session.id)
+
+
+def _inspect_part(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        mime = sniff_mime(fh.read(64))
+        fh.seek(0)
+        for chunk in iter(lambda: fh.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return mime, digest.hexdigest()
+
+
+async def stage_completed(upload_session: models.UploadSession) -> StagedUpload:
+    """Turn a fully received part file into a StagedUpload for store_staged()."""
+    path = part_path(upload_session.id)
+    size = current_offset(upload_session.id)
+    if size != upload_session.total_size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {size} of {upload_session.total_size} bytes received",
+            headers={"Upload-Offset": str(size)},
+        )
+    mime, sha256 = await run_in_threadpool(_inspect_part, path)
+    return StagedUpload(path, sha256, size, mime, upload_session.filename)
+
+
+def validate_total_size(total_size: int) -> None:
+    if total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    if total_size > MAX_UPLOAD_FILE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload exceeds {MAX_UPLOAD_FILE_BYTES // (1024 * 1024)} MB",
+        )
+
+
+def discard_session(db: Session, upload_session: models.UploadSession) -> None:
+    try:
+        os.remove(part_path(upload_session.id))
+    except FileNotFoundError:
+        pass
+    db.delete(upload_session)
+
+
+def purge_expired_sessions(db: Session, now: Optional[datetime] = None) -> int:
+    """Delete abandoned sessions and their part files; returns how many were removed."""
+    expired = db.query(models.UploadSession).filter(
+        models.UploadSession.expires_at < (now or datetime.utcnow())
+    ).all()
+    for upload_session in expired:
+        discard_session(db, upload_session)
+    if expired:
+        db.commit()
+    return len(expired)
@@ -0,0 +1,172 @@
+# backend/app/revocation.py
+"""
+Refresh-token revocation list.
+
+Refresh tokens carry a token id (`jti`) and a family id (`fam`) shared by
+every token rotated from the same login. Used, logged-out and
+reuse-compromised ids are stored in `revoked_tokens`. Each process mirrors
+them in a Bloom filter, so checking an id that was never revoked (the
+common case) costs no query. Only a filter hit, which is a true revocation
+or a rare false positive, is confirmed against the database.
+
+The filter is rebuilt from the table on startup (expired rows are purged
+then). Each process also pulls rows revoked elsewhere every
+REVOCATION_SYNC_SECONDS. Rotation itself does not depend on the filter:
+each jti is inserted exactly once, so a second use of a refresh token fails
+the unique constraint in any process.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_FP_RATE, REVOCATION_SYNC_SECONDS
+
+# Re-read rows revoked slightly before the last sync, so transactions that
+# committed late are not missed. Re-adding an id to the filter is harmless.
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+# ============================================================
+# BLOOM FILTER
+# ============================================================
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# ============================================================
+# REVOCATION LIST
+# ============================================================
+class RevocationList:
+    def __init__(self, capacity: int, fp_rate: float, sync_seconds: float):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.sync_seconds = sync_seconds
+        self._filter = BloomFilter(capacity, fp_rate)
+        self._lock = threading.Lock()
+        self._synced_at: Optional[float] = None  # monotonic; None until first load
+        self._synced_until: Optional[datetime] = None  # revoked_at watermark
+        self.filter_misses = 0
+        self.db_checks = 0
+        self.false_positives = 0
+
+    def rebuild(self, db: Session) -> int:
+        """Purge expired rows and reload the filter from the table."""
+        with self._lock:
+            db.query(models.RevokedToken).filter(models.RevokedToken.expires_at <= datetime.utcnow()).delete(
+                synchronize_session=False
+            )
+            db.commit()
+            return self._rebuild(db)
+
+    def _rebuild(self, db: Session) -> int:
+        # Only reads: sync() runs inside the caller's transaction (e.g. the
+        # BEGIN IMMEDIATE of a refresh), which must not be committed here
+        now = datetime.utcnow()
+        jtis = [jti for (jti,) in db.query(models.RevokedToken.jti).filter(models.RevokedToken.expires_at > now)]
+        # Leave headroom so new revocations don't push the error rate up right away
+        self.capacity = max(self.capacity, 2 * len(jtis))
+        bloom = BloomFilter(self.capacity, self.fp_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._synced_at = time.monotonic()
+        self._synced_until = now
+        return len(jtis)
+
+    def sync(self, db: Session, force: bool = False) -> None:
+        """Pull ids revoked by other processes (at most every sync_seconds)."""
+        if not force and self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        # One thread syncs; the others keep using the current filter
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            if self._synced_at is None or self._filter.count > self._filter.capacity:
+                self._rebuild(db)
+                return
+            now = datetime.utcnow()
+            rows = db.query(models.RevokedToken.jti).filter(
+                models.RevokedToken.revoked_at >= self._synced_until - _SYNC_OVERLAP,
+                models.RevokedToken.expires_at > now,
+            )
+            for (jti,) in rows:
+                self._filter.add(jti)
+            self._synced_at = time.monotonic()
+            self._synced_until = now
+        finally:
+            self._lock.release()
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self.sync(db)
+        if jti not in self._filter:
+            self.filter_misses += 1
+            return False
+        self.db_checks += 1
+        found = db.query(models.RevokedToken.id).filter(
+            models.RevokedToken.jti == jti,
+            models.RevokedToken.expires_at > datetime.utcnow(),
+        ).first()
+        if found is None:
+            self.false_positives += 1
+            return False
+        return True
+
+    def revoke(self, db: Session, jti: str, user_id: Optional[int], reason: str, expires_at: datetime,
+               revoked_at: Optional[datetime] = None) -> bool:
+        """
+        Record `jti` as revoked. Returns False if it already was: for a
+        rotated refresh token that means the token is being reused.
+        """
+        db.add(models.RevokedToken(
+            jti=jti, user_id=user_id, reason=reason, expires_at=expires_at,
+            revoked_at=revoked_at or datetime.utcnow(),
+        ))
+        try:
+            db.commit()
+            inserted = True
+        except IntegrityError:
+            db.rollback()
+            inserted = False
+        self._filter.add(jti)
+        return inserted
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "filter_bits": self._filter.num_bits,
+            "filter_hashes": self._filter.num_hashes,
+            "filter_capacity": self._filter.capacity,
+            "entries": self._filter.count,
+            "filter_misses": self.filter_misses,
+            "db_checks": self.db_checks,
+            "false_positives": self.false_positives,
+        }
+
+
+revocations = RevocationList(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_FP_RATE, REVOCATION_SYNC_SECONDS)
@@ -0,0 +1,31 @@
+# backend/app/routes/internal.py
+from fastapi import APIRouter, Header, HTTPException
+from typing import Optional
+import hmac
+
+from app.cache import cache_stats
+from app.config import INTERNAL_METRICS_TOKEN
+from app.db_routing import replicas
+from app.pool_metrics import pool_stats
+from app.realtime import hub
+from app.revocation import revocations
+
+router = APIRouter()
+
+
+# ============================================================
+# METRICS
+# ============================================================
+@router.get("/metrics")
+def get_metrics(x_metrics_token: Optional[str] = Header(None)):
+    """
+    Process-local runtime counters (cache hit rates, DB pool usage, ...).
+    Disabled (404) unless INTERNAL_METRICS_TOKEN is set; then the request
+    must send it in X-Metrics-Token.
+    """
+    if not INTERNAL_METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_metrics_token or "", INTERNAL_METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"caches": cache_stats(), "db_pools": pool_stats(), "read_replicas": replicas.stats(), "revocations": revocations.stats(),
+            "realtime": hub.stats()}
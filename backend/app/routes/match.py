@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, insert, or_
+from typing import List, Optional, Set
 from datetime import datetime
-from rapidfuzz import fuzz, process
 
-from app import models, schemas
+from app import models, notifications, schemas
 from app.database import get_db
-from app.auth import get_current_user
+from app.db_routing import get_read_db
+from app.auth import UserSnapshot, get_current_user
+from app.realtime import publish_after_commit
 
-router = APIRouter(prefix="/matches", tags=["Matches"])
+router = APIRouter(tags=["Matches"])
 
 # ==========================================================
 # 🧠 HELPER: Calculate similarity between two products
@@ -19,6 +20,8 @@ def compute_similarity(prod1: models.Product, prod2: models.Product) -> float:
     Compute fuzzy similarity between two products using name, category, and description.
     Weighted more towards the name and description.
     """
+    from rapidfuzz import fuzz  # imported on first use; only match generation needs it
+
     text1 = f"{prod1.name or ''} {prod1.category or ''} {prod1.description or ''}".lower()
     text2 = f"{prod2.name or ''} {prod2.category or ''} {prod2.description or ''}".lower()
 
@@ -31,13 +34,50 @@ def compute_similarity(prod1: models.Product, prod2: models.Product) -> float:
     return round((0.5 * name_score) + (0.4 * desc_score) + (0.1 * cat_score), 2)
 
 
+def _match_members(match: models.Match, *products: models.Product) -> List[dict]:
+    """Membership rows for the owners of a match's products (one per user)."""
+    members = {}
+    for product in products:
+        if product.owner_id is not None and product.owner_id not in members:
+            members[product.owner_id] = dict(
+                match_id=match.id, user_id=product.owner_id, role=product.item_type, created_at=match.date_matched
+            )
+    return list(members.values())
+
+
+def _matched_before(db: Session, product_id: int, other_ids: List[int]) -> Set[int]:
+    """
+    Which of `other_ids` were matched with the product before, in either
+    order: one query per table. Archived matches count too, so editing a
+    listing doesn't bring back a year-old match.
+    """
+    if not other_ids:
+        return set()
+    found = set()
+    for model in (models.Match, models.MatchArchive):
+        rows = db.query(model.product_a_id, model.product_b_id).filter(
+            or_(
+                and_(model.product_a_id == product_id, model.product_b_id.in_(other_ids)),
+                and_(model.product_b_id == product_id, model.product_a_id.in_(other_ids)),
+            )
+        ).all()
+        found.update(b if a == product_id else a for a, b in rows)
+    return found
+
+
 # ==========================================================
 # 🔍 FIND AND STORE MATCHES (called after create/update)
 # ==========================================================
 def find_and_store_matches(db: Session, new_product: models.Product):
     """
     Finds opposite-type products that are similar to the new/updated product
-    and stores the match + notifications in the database.
+    and stores the match + notifications in the database. Pairs matched
+    before are looked up in one query per table, and the new matches and
+    their members are inserted in one statement each (the ORM would insert
+    matches one at a time on SQLite to read back their ids). Notifications
+    are written in one batch at the end, combined into a digest per
+    recipient and item. Both are pushed to the owners' realtime connections
+    when the commit lands.
     """
     opposite_type = "need" if new_product.item_type == "have" else "have"
 
@@ -46,39 +86,64 @@ def find_and_store_matches(db: Session, new_product: models.Product):
         models.Product.id != new_product.id
     ).all()
 
+    similar = []
     for candidate in candidates:
         similarity = compute_similarity(new_product, candidate)
         if similarity >= 70:  # threshold for fuzzy match
-            existing = db.query(models.Match).filter(
-                or_(
-                    and_(models.Match.product_a_id == new_product.id, models.Match.product_b_id == candidate.id),
-                    and_(models.Match.product_a_id == candidate.id, models.Match.product_b_id == new_product.id),
-                )
-            ).first()
-
-            if not existing:
-                new_match = models.Match(
-                    product_a_id=new_product.id,
-                    product_b_id=candidate.id,
-                    similarity_score=similarity,
-                    date_matched=datetime.utcnow()
-                )
-                db.add(new_match)
-
-                # Notifications for both users
-                db.add_all([
-                    models.Notification(
-                        user_id=candidate.owner_id,
-                        product_id=new_product.id,
-                        message=f"A new match found for your item: '{candidate.name}'"
-                    ),
-                    models.Notification(
-                        user_id=new_product.owner_id,
-                        product_id=candidate.id,
-                        message=f"Your item '{new_product.name}' matches with '{candidate.name}'"
-                    ),
-                ])
+            similar.append((candidate, similarity))
+    matched = _matched_before(db, new_product.id, [candidate.id for candidate, _ in similar])
+    fresh = [(candidate, similarity) for candidate, similarity in similar if candidate.id not in matched]
+    if not fresh:
+        db.commit()
+        return
 
+    # Ids come back unordered; each new match has its own product_b_id
+    new_matches = {m.product_b_id: m for m in db.scalars(insert(models.Match).returning(models.Match), [
+        dict(product_a_id=new_product.id, product_b_id=candidate.id,
+             similarity_score=similarity, date_matched=datetime.utcnow())
+        for candidate, similarity in fresh
+    ])}
+
+    pending, members = [], []
+    for candidate, _ in fresh:
+        new_match = new_matches[candidate.id]
+        match_members = _match_members(new_match, new_product, candidate)
+        members += match_members
+        for member in match_members:
+            publish_after_commit(db, member["user_id"], {
+                "type": "match",
+                "match": {
+                    "id": new_match.id,
+                    "product_a_id": new_match.product_a_id,
+                    "product_b_id": new_match.product_b_id,
+                    "similarity_score": new_match.similarity_score,
+                    "date_matched": new_match.date_matched.isoformat(),
+                },
+            })
+
+        # Notifications for both users, combined per item below
+        pending += [
+            notifications.PendingNotification(
+                user_id=candidate.owner_id,
+                key=f"match:{candidate.id}",
+                product_id=new_product.id,
+                message=f"A new match found for your item: '{candidate.name}'",
+                digest_message=f"{{count}} new matches for '{candidate.name}'",
+                digest_product_id=candidate.id,
+            ),
+            notifications.PendingNotification(
+                user_id=new_product.owner_id,
+                key=f"match:{new_product.id}",
+                product_id=candidate.id,
+                message=f"Your item '{new_product.name}' matches with '{candidate.name}'",
+                digest_message=f"{{count}} new matches for '{new_product.name}'",
+                digest_product_id=new_product.id,
+            ),
+        ]
+    db.execute(insert(models.MatchMember), members)
+
+    # Per recipient and item: a popular listing leaves one digest row, not one per match
+    notifications.notify_coalesced(db, pending)
     db.commit()
 
 
@@ -87,57 +152,117 @@ def find_and_store_matches(db: Session, new_product: models.Product):
 # ==========================================================
 @router.get("/my", response_model=List[schemas.MatchOut])
 def get_my_matches(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    skip: int = 0,
+    limit: int = 50,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """
-    Fetch all matches where the current user's products are involved.
-    Sorted by most recent.
+    Fetch matches where the current user's products are involved, most
+    recent first (paginated with skip/limit). The user's page of match ids
+    comes from match_members (index on user_id, created_at desc).
+
+    Both products of every match on the page are loaded with the matches
+    (one query per side, not two per match) and prepared together, so the
+    number of queries doesn't grow with the page size.
+
+    include_archived=true also returns matches moved to matches_archive by
+    app/archiver.py, merged into the same order.
     """
-    user_products = db.query(models.Product.id).filter(models.Product.owner_id == current_user.id).subquery()
-    matches = db.query(models.Match).filter(
-        or_(
-            models.Match.product_a_id.in_(user_products),
-            models.Match.product_b_id.in_(user_products)
-        )
-    ).order_by(models.Match.date_matched.desc()).all()
+    from app.routes.products import prepare_product_responses  # products.py imports this module
+
+    limit = max(1, min(limit, 100))
+
+    def page(match_model, member_model, offset, count):
+        return db.query(match_model).join(
+            member_model, member_model.match_id == match_model.id
+        ).options(
+            selectinload(match_model.product_a),
+            selectinload(match_model.product_b),
+        ).filter(
+            member_model.user_id == current_user.id
+        ).order_by(
+            member_model.created_at.desc(), member_model.match_id.desc()
+        ).offset(offset).limit(count).all()
+
+    if include_archived:
+        # Top skip+limit of each, merged
+        matches = page(models.Match, models.MatchMember, 0, skip + limit)
+        matches += page(models.MatchArchive, models.MatchMemberArchive, 0, skip + limit)
+        matches.sort(key=lambda m: (m.date_matched or datetime.min, m.id), reverse=True)
+        matches = matches[skip:skip + limit]
+    else:
+        matches = page(models.Match, models.MatchMember, skip, limit)
+
+    # A product can appear in several matches; prepare each one once
+    products = {p.id: p for m in matches for p in (m.product_a, m.product_b) if p is not None}
+    prepare_product_responses(db, list(products.values()))
     return matches
 
 
 # ==========================================================
 # 🔔 GET NOTIFICATIONS FOR CURRENT USER
 # ==========================================================
-@router.get("/notifications/my", response_model=List[schemas.NotificationOut])
+@router.get("/notifications/my", response_model=schemas.NotificationPage)
 def get_my_notifications(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    cursor: Optional[int] = None,
+    limit: int = 20,
+    unread_only: bool = False,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """
-    Retrieve all notifications for the current user.
+    Notifications for the current user, newest first. Pass `next_cursor`
+    from the response as `cursor` to get the next page. Archived ones are
+    only included with include_archived=true.
     """
-    return db.query(models.Notification).filter(
-        models.Notification.user_id == current_user.id
-    ).order_by(models.Notification.date_created.desc()).all()
+    limit = max(1, min(limit, 100))
+    items, next_cursor = notifications.list_page(
+        db, current_user.id, cursor, limit, unread_only, include_archived
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/notifications/unread-count")
+def get_unread_count(
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    return {"unread": notifications.unread_count(db, current_user.id)}
 
 
 # ==========================================================
-# ✅ MARK A NOTIFICATION AS READ
+# ✅ MARK NOTIFICATIONS AS READ
 # ==========================================================
+@router.post("/notifications/read")
+def mark_notifications_read(
+    payload: schemas.NotificationReadRequest,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Mark several notifications read: a list of ids, or everything up to a cursor."""
+    if (payload.ids is None) == (payload.up_to is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or up_to")
+    updated = notifications.mark_read(db, current_user.id, ids=payload.ids, up_to=payload.up_to)
+    db.commit()
+    return {"updated": updated, "unread": notifications.unread_count(db, current_user.id)}
+
+
 @router.patch("/notifications/{notification_id}/read")
 def mark_notification_read(
     notification_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    notif = db.query(models.Notification).filter(
-        models.Notification.id == notification_id,
-        models.Notification.user_id == current_user.id
-    ).first()
-
-    if not notif:
-        raise HTTPException(status_code=404, detail="Notification not found")
+    if not notifications.mark_read(db, current_user.id, ids=[notification_id]):
+        exists = db.query(models.Notification.id).filter(
+            models.Notification.id == notification_id,
+            models.Notification.user_id == current_user.id
+        ).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Notification not found")
 
-    notif.is_read = True
     db.commit()
-    db.refresh(notif)
     return {"message": "✅ Notification marked as read"}
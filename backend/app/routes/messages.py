@@ -1 +1,135 @@
- 
+# backend/app/routes/messages.py
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app import messaging, models, schemas
+from app.auth import UserSnapshot, get_current_user
+from app.database import get_async_db
+
+router = APIRouter()
+
+
+def _conversation_out(
+    conversation: models.Conversation, participant: Optional[models.ConversationParticipant]
+) -> schemas.ConversationOut:
+    return schemas.ConversationOut(
+        id=conversation.id,
+        match_id=conversation.match_id,
+        participant_ids=sorted(p.user_id for p in conversation.participants),
+        unread_count=participant.unread_count if participant is not None else 0,
+        created_at=conversation.created_at,
+        last_message_at=conversation.last_message_at,
+        last_message=conversation.last_message,
+    )
+
+
+# ============================================================
+# 💬 OPEN A CONVERSATION FOR A MATCH
+# ============================================================
+@router.post("/", response_model=schemas.ConversationOut)
+async def open_conversation(
+    payload: schemas.ConversationCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """Conversation between the users of a match (created on first call)."""
+    def run(sync_db: Session) -> schemas.ConversationOut:
+        conversation = messaging.get_or_create_conversation(sync_db, payload.match_id, current_user.id)
+        sync_db.flush()
+        participant = sync_db.get(models.ConversationParticipant, (conversation.id, current_user.id))
+        return _conversation_out(conversation, participant)
+
+    out = await db.run_sync(run)
+    await db.commit()
+    return out
+
+
+# ============================================================
+# 📋 LIST MY CONVERSATIONS
+# ============================================================
+@router.get("/my", response_model=List[schemas.ConversationOut])
+async def list_my_conversations(
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """Most recently active first, each with the user's unread count and the last message."""
+    limit = max(1, min(limit, 100))
+    rows = await db.run_sync(messaging.list_conversations, current_user.id, skip, limit)
+    return [_conversation_out(conversation, participant) for conversation, participant in rows]
+
+
+@router.get("/unread-count")
+async def get_unread_messages(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    return {"unread": await db.run_sync(messaging.total_unread, current_user.id)}
+
+
+# ============================================================
+# 📜 MESSAGE HISTORY
+# ============================================================
+@router.get("/{conversation_id}/messages", response_model=schemas.MessagePage)
+async def get_messages(
+    conversation_id: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    Newest first; pass `next_cursor` as `before` for older messages. With
+    `after`, messages following that id oldest first (catching up after a
+    reconnect); pass `next_cursor` as `after` again until it is null.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after")
+    limit = max(1, min(limit, 100))
+
+    def run(sync_db: Session):
+        messaging.require_participant(sync_db, conversation_id, current_user.id)
+        return messaging.history_page(sync_db, conversation_id, limit, before=before, after=after)
+
+    items, next_cursor = await db.run_sync(run)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# ============================================================
+# ✉️ SEND A MESSAGE
+# ============================================================
+@router.post(
+    "/{conversation_id}/messages",
+    response_model=schemas.MessageOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def send_message(
+    conversation_id: int,
+    payload: schemas.MessageCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """Store the message and push it to the participants' realtime connections."""
+    message = await db.run_sync(messaging.post_message, conversation_id, current_user.id, payload.body)
+    await db.commit()
+    return message
+
+
+# ============================================================
+# ✅ MARK A CONVERSATION AS READ
+# ============================================================
+@router.post("/{conversation_id}/read")
+async def mark_conversation_read(
+    conversation_id: int,
+    payload: Optional[schemas.ConversationReadRequest] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    up_to = payload.up_to if payload is not None else None
+    unread = await db.run_sync(messaging.mark_read, conversation_id, current_user.id, up_to)
+    await db.commit()
+    return {"conversation_id": conversation_id, "unread": unread}
@@ -1,40 +1,40 @@
 from fastapi import (
-    APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Body
+    APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Body, Header, Request, Response
 )
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+from typing import List, Optional, Tuple
 from datetime import datetime
 import os
-import shutil
 import json
-import cloudinary
-import cloudinary.uploader
+import uuid
 from app.routes.match import find_and_store_matches
 
-from app import models, schemas
-from app.database import get_db
-from app.auth import get_current_user
-from app.config import (
-    UPLOAD_MODE, CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
+from app import models, notifications, schemas
+from app.database import SessionLocal, begin_immediate, get_async_db, get_db
+from app.db_routing import get_read_db
+from app.auth import UserSnapshot, get_current_user
+from app.media import (
+    UploadBudget, acquire_blob, discard_staged, enqueue_deletions, place_staged, release_media, stage_upload,
+    staged_path, store_staged_async,
 )
+from app.media_gc import wake_deletion_worker
+from app.derivatives import build_srcsets, load_variants, schedule_derivatives
+from app.video_meta import load_video_metadata, schedule_video_metadata
+from app.resumable import (
+    append_chunk, create_part_file, current_offset, discard_session, next_expiry,
+    purge_expired_sessions, stage_completed, validate_total_size,
+)
+from app.config import UPLOAD_MODE, RESUMABLE_MAX_CHUNK_BYTES
+from app.remote_uploads import IMAGE_FOLDER, VIDEO_FOLDER, destroy_uploads, upload_many, upload_to_cloudinary
 
 # ============================================================
 # CONFIG
 # ============================================================
 API_BASE_URL = os.getenv("API_BASE_URL", "https://api.makeitwhole.com")
 
-if UPLOAD_MODE == "cloudinary" and CLOUDINARY_CLOUD_NAME:
-    cloudinary.config(
-        cloud_name=CLOUDINARY_CLOUD_NAME,
-        api_key=CLOUDINARY_API_KEY,
-        api_secret=CLOUDINARY_API_SECRET
-    )
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 router = APIRouter()
 
 
@@ -62,30 +62,157 @@ def to_relative_path(url: str) -> str:
     return url
 
 
-async def save_upload_file(upload_file: UploadFile) -> str:
-    orig_name = upload_file.filename or "file"
-    safe_name = orig_name.replace(" ", "_")
-    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-    filename = f"{stamp}_{safe_name}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
-    return f"/uploads/{filename}"
+async def save_upload_file(
+    upload_file: UploadFile,
+    db: AsyncSession,
+    kind: Optional[str] = None,
+    budget: Optional[UploadBudget] = None,
+) -> str:
+    """
+    Stream an upload into upload storage under its content hash and take a
+    reference on the blob (committed together with the product change).
+    """
+    return (await save_upload_files([(upload_file, kind)], db, budget=budget))[0]
+
+
+async def save_upload_files(
+    uploads: List[Tuple[UploadFile, str]],
+    db: AsyncSession,
+    budget: Optional[UploadBudget] = None,
+) -> List[str]:
+    """
+    save_upload_file() for several (file, kind) pairs. Every file is staged
+    before any blob reference is taken, so the transaction doesn't stay
+    open (holding row locks, or SQLite's write lock) while the client is
+    still sending the rest.
+
+    If any file fails, nothing is kept: the other staged files are removed
+    and the ones already placed are handed to abandon_uploads().
+    """
+    staged_files = []
+    placed: List[str] = []
+
+    def _acquire(sync_db: Session) -> None:
+        for staged in staged_files:
+            acquire_blob(sync_db, staged.sha256, staged_path(staged), staged.size, staged.mime)
 
+    try:
+        for upload_file, kind in uploads:
+            staged_files.append(await stage_upload(upload_file, kind=kind, budget=budget))
+        await db.run_sync(_acquire)
+        for staged in staged_files:
+            placed.append(await place_staged(staged))
+    except BaseException:
+        await run_in_threadpool(discard_staged, staged_files[len(placed):])
+        await abandon_uploads(db, placed)
+        raise
+    return placed
+
+
+async def abandon_uploads(db: AsyncSession, rels: List[Optional[str]]) -> None:
+    """
+    Give up on files placed for a change that won't be committed: roll the
+    references back and queue the files for the deletion worker, which
+    keeps any that another request holds a reference to. Cloudinary uploads
+    are never shared, so they are destroyed outright.
+    """
+    await db.rollback()
+    destroy_uploads([url for url in rels if url and not url.startswith("/uploads/")])
+    rels = [rel for rel in rels if rel and rel.startswith("/uploads/")]
+    if not rels:
+        return
+    await db.run_sync(enqueue_deletions, rels)
+    await db.commit()
+    wake_deletion_worker()
+
+
+def _get_owned_product(db: Session, product_id: int, current_user: models.User) -> models.Product:
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if product.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return product
+
+
+def _lock_owned_product(db: Session, product_id: int, current_user: models.User) -> models.Product:
+    """
+    Re-read a product for the write at the end of a request that uploaded
+    first. The row is locked (FOR UPDATE; under SQLite the write lock, held
+    since the blob references were taken or from BEGIN IMMEDIATE) and its
+    values are fresh, so edits made during the upload are merged, not lost.
+    """
+    if not db.in_transaction():
+        begin_immediate(db)
+    product = (
+        db.query(models.Product)
+        .filter(models.Product.id == product_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if product.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return product
 
-def upload_to_cloudinary(file: UploadFile, folder: str, resource_type: str = "auto") -> Optional[str]:
+
+def _refresh_matches(product_id: int) -> None:
+    """Run match generation on its own session (CPU-bound; call via the threadpool)."""
+    db = SessionLocal()
     try:
-        result = cloudinary.uploader.upload(file.file, folder=folder, resource_type=resource_type)
-        return result.get("secure_url")
-    except Exception as e:
-        print(f"❌ Cloudinary upload failed: {e}")
-        return None
+        find_and_store_matches(db, db.get(models.Product, product_id))
+    finally:
+        db.close()
+
+
+def _release_local_media(db: Session, urls: List[Optional[str]]) -> None:
+    """
+    Drop references to local uploads and queue the files that are no longer
+    used for deletion (committed with the caller's transaction).
+    """
+    if UPLOAD_MODE == "cloudinary":
+        return
+    enqueue_deletions(db, [release_media(db, to_relative_path(url)) for url in urls if url])
 
 
 def _normalize_list_for_storage(urls: List[str]) -> List[str]:
     return urls
 
 
+def _product_image_list(product: models.Product) -> List[str]:
+    if not product.image_url:
+        return []
+    try:
+        imgs = json.loads(product.image_url) if isinstance(product.image_url, str) else product.image_url
+        return imgs if isinstance(imgs, list) else [imgs]
+    except Exception:
+        return [product.image_url]
+
+
+def _attach_image_srcsets(db: Session, products: List[models.Product]) -> None:
+    """Attach responsive variants (one query for the whole page); call before normalizing."""
+    images_by_product = {p.id: [to_relative_path(u) for u in _product_image_list(p)] for p in products}
+    variants = load_variants(db, (rel for rels in images_by_product.values() for rel in rels))
+    for p in products:
+        p.image_srcset = [build_srcsets(variants.get(rel, []), make_absolute_url) for rel in images_by_product[p.id]]
+
+
+def _attach_video_meta(db: Session, products: List[models.Product]) -> None:
+    """Attach video posters/metadata (one query for the whole page); call before normalizing."""
+    metadata = load_video_metadata(db, (to_relative_path(p.video_url) for p in products if p.video_url))
+    for p in products:
+        meta = metadata.get(to_relative_path(p.video_url)) if p.video_url else None
+        p.video_meta = schemas.VideoMetaOut(
+            poster_url=make_absolute_url(meta.poster_path),
+            duration=meta.duration,
+            width=meta.width,
+            height=meta.height,
+            codec=meta.codec,
+        ) if meta else None
+
+
 def _product_response_normalize(product: models.Product):
     if product.image_url:
         try:
@@ -103,6 +230,18 @@ def _product_response_normalize(product: models.Product):
         product.video_url = None
 
 
+def prepare_product_responses(db: Session, products: List[models.Product]) -> None:
+    """
+    Get a page of products ready for ProductOut: srcsets and video metadata
+    (one query each for the whole page), then absolute URLs. Pass each
+    product once; the objects are modified in place, so don't commit them.
+    """
+    _attach_image_srcsets(db, products)
+    _attach_video_meta(db, products)
+    for p in products:
+        _product_response_normalize(p)
+
+
 # ============================================================
 # CREATE PRODUCT
 # ============================================================
@@ -117,30 +256,31 @@ async def create_product(
     quantity: int = Form(1),
     image_files: Optional[List[UploadFile]] = File(None),
     video_file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     image_urls: List[str] = []
     video_url: Optional[str] = None
+    budget = UploadBudget()
+    image_files = (image_files or [])[:10]
 
-    if image_files:
-        for file in image_files[:10]:
-            if UPLOAD_MODE == "cloudinary":
-                uploaded = upload_to_cloudinary(file, folder="makeitwhole/products/images")
-                if uploaded:
-                    image_urls.append(uploaded)
-            else:
-                saved_rel = await save_upload_file(file)
-                image_urls.append(saved_rel)
-
-    if video_file:
-        if UPLOAD_MODE == "cloudinary":
-            uploaded = upload_to_cloudinary(video_file, folder="makeitwhole/products/videos", resource_type="video")
-            if uploaded:
-                video_url = uploaded
-        else:
-            saved_rel = await save_upload_file(video_file)
-            video_url = saved_rel
+    if UPLOAD_MODE == "cloudinary":
+        # Images and video go up concurrently; results keep their order
+        jobs = [(file, IMAGE_FOLDER, "auto") for file in image_files]
+        if video_file:
+            jobs.append((video_file, VIDEO_FOLDER, "video"))
+        uploaded = await upload_many(jobs)
+        if video_file:
+            video_url = uploaded.pop()
+        image_urls = uploaded
+    else:
+        jobs = [(file, "image") for file in image_files]
+        if video_file:
+            jobs.append((video_file, "video"))
+        saved = await save_upload_files(jobs, db, budget=budget)
+        if video_file:
+            video_url = saved.pop()
+        image_urls = saved
 
     stored_images = json.dumps(_normalize_list_for_storage(image_urls)) if image_urls else None
 
@@ -157,17 +297,19 @@ async def create_product(
         owner_id=current_user.id,
     )
     db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
+    await db.commit()
+    await db.refresh(new_product)
+    schedule_derivatives(image_urls)
+    schedule_video_metadata([video_url])
 
     # ✅ Find and store matches automatically
     try:
-        find_and_store_matches(db, new_product)
+        await run_in_threadpool(_refresh_matches, new_product.id)
         print(f"🔍 Match check completed for product {new_product.id} ({new_product.name})")
     except Exception as e:
         print(f"⚠️ Match generation failed for product {new_product.id}: {e}")
 
-    _product_response_normalize(new_product)
+    await db.run_sync(prepare_product_responses, [new_product])
     return new_product
 
 
@@ -181,7 +323,7 @@ def list_products(
     category: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     query = db.query(models.Product)
 
@@ -200,8 +342,7 @@ def list_products(
         )
 
     products = query.order_by(models.Product.id.desc()).offset(skip).limit(limit).all()
-    for p in products:
-        _product_response_normalize(p)
+    prepare_product_responses(db, products)
     return products
 
 
@@ -210,12 +351,11 @@ def list_products(
 # ============================================================
 @router.get("/me", response_model=List[schemas.ProductOut])
 def list_my_products(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     items = db.query(models.Product).filter(models.Product.owner_id == current_user.id).order_by(models.Product.id.desc()).all()
-    for p in items:
-        _product_response_normalize(p)
+    prepare_product_responses(db, items)
     return items
 
 
@@ -223,11 +363,11 @@ def list_my_products(
 # GET PRODUCT
 # ============================================================
 @router.get("/{product_id}", response_model=schemas.ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(product_id: int, db: Session = Depends(get_read_db)):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    _product_response_normalize(product)
+    prepare_product_responses(db, [product])
     return product
 
 
@@ -247,14 +387,40 @@ async def update_product(
     images: Optional[List[UploadFile]] = File(None),
     replace_images: Optional[bool] = Form(False),
     video: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if product.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await db.run_sync(_get_owned_product, product_id, current_user)
+    await db.commit()  # don't hold the lookup transaction while uploads stream in
+
+    budget = UploadBudget()
+    uploaded_images: List[str] = []
+    new_video_url: Optional[str] = None
+    images = (images or [])[:10]
+
+    if UPLOAD_MODE == "cloudinary":
+        jobs = [(f, IMAGE_FOLDER, "auto") for f in images]
+        if video:
+            jobs.append((video, VIDEO_FOLDER, "video"))
+        uploaded = await upload_many(jobs)
+        if video:
+            new_video_url = uploaded.pop()
+        uploaded_images = uploaded
+    else:
+        jobs = [(f, "image") for f in images]
+        if video:
+            # Save the new video first so a rejected upload keeps the old one
+            jobs.append((video, "video"))
+        uploaded_images = await save_upload_files(jobs, db, budget=budget)
+        if video:
+            new_video_url = uploaded_images.pop()
+
+    # Apply the changes to the row as it is now, not as it was before the upload
+    try:
+        product = await db.run_sync(_lock_owned_product, product_id, current_user)
+    except HTTPException:
+        await abandon_uploads(db, uploaded_images + [new_video_url])
+        raise
 
     # --- Update product fields ---
     if name is not None: product.name = name
@@ -266,25 +432,9 @@ async def update_product(
     if quantity is not None: product.quantity = quantity
 
     # --- Handle images ---
-    existing_images: List[str] = []
-    if product.image_url:
-        try:
-            existing_images = json.loads(product.image_url) if isinstance(product.image_url, str) else product.image_url
-        except Exception:
-            existing_images = [product.image_url]
-
-    uploaded_images: List[str] = []
-    if images:
-        for f in images[:10]:
-            if UPLOAD_MODE == "cloudinary":
-                url = upload_to_cloudinary(f, folder="makeitwhole/products/images")
-                if url:
-                    uploaded_images.append(url)
-            else:
-                rel = await save_upload_file(f)
-                uploaded_images.append(rel)
-
+    existing_images = _product_image_list(product)
     if replace_images:
+        await db.run_sync(_release_local_media, existing_images)
         product.image_url = json.dumps(_normalize_list_for_storage(uploaded_images)) if uploaded_images else None
     else:
         if uploaded_images:
@@ -292,37 +442,24 @@ async def update_product(
             product.image_url = json.dumps(_normalize_list_for_storage(new_store))
 
     # --- Handle video ---
-    if video:
-        if product.video_url:
-            old_rel = to_relative_path(product.video_url)
-            if old_rel.startswith("/uploads/") and UPLOAD_MODE != "cloudinary":
-                filename = old_rel.split("/uploads/")[-1]
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except Exception:
-                        pass
-
-        if UPLOAD_MODE == "cloudinary":
-            url = upload_to_cloudinary(video, folder="makeitwhole/products/videos", resource_type="video")
-            if url:
-                product.video_url = url
-        else:
-            rel = await save_upload_file(video)
-            product.video_url = rel
+    if new_video_url:
+        await db.run_sync(_release_local_media, [product.video_url])
+        product.video_url = new_video_url
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    wake_deletion_worker()
+    await db.refresh(product)
+    schedule_derivatives(uploaded_images)
+    schedule_video_metadata([new_video_url])
 
     # ✅ Run match generation again after product update
     try:
-        find_and_store_matches(db, product)
+        await run_in_threadpool(_refresh_matches, product.id)
         print(f"🔁 Match re-evaluation completed for updated product {product.id} ({product.name})")
     except Exception as e:
         print(f"⚠️ Match re-evaluation failed for product {product.id}: {e}")
 
-    _product_response_normalize(product)
+    await db.run_sync(prepare_product_responses, [product])
     return product
 
 
@@ -333,7 +470,7 @@ async def update_product(
 def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
@@ -341,35 +478,18 @@ def delete_product(
     if product.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    if product.image_url:
-        try:
-            imgs = json.loads(product.image_url)
-        except Exception:
-            imgs = [product.image_url]
-        for img in imgs:
-            rel = to_relative_path(img)
-            if rel.startswith("/uploads/") and UPLOAD_MODE != "cloudinary":
-                filename = rel.split("/uploads/")[-1]
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except Exception:
-                        pass
-
-    if product.video_url:
-        rel = to_relative_path(product.video_url)
-        if rel.startswith("/uploads/") and UPLOAD_MODE != "cloudinary":
-            filename = rel.split("/uploads/")[-1]
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception:
-                    pass
+    _release_local_media(db, _product_image_list(product) + [product.video_url])
 
+    # Matches reference the product without ON DELETE CASCADE
+    product_matches = or_(models.Match.product_a_id == product.id, models.Match.product_b_id == product.id)
+    db.query(models.MatchMember).filter(
+        models.MatchMember.match_id.in_(select(models.Match.id).where(product_matches))
+    ).delete(synchronize_session=False)
+    db.query(models.Match).filter(product_matches).delete(synchronize_session=False)
+    notifications.delete_for_product(db, product.id)
     db.delete(product)
     db.commit()
+    wake_deletion_worker()
     return {"message": "✅ Product deleted successfully"}
 
 
@@ -381,7 +501,7 @@ def delete_product_image(
     product_id: int,
     payload: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     image_url = payload.get("image_url")
     if not image_url:
@@ -407,20 +527,12 @@ def delete_product_image(
     if len(updated_storage) == len(existing_images):
         raise HTTPException(status_code=404, detail="Image not found in product")
 
-    removed_set = set(existing_images) - set(updated_storage)
-    for removed in removed_set:
-        rel = to_relative_path(removed)
-        if rel.startswith("/uploads/") and UPLOAD_MODE != "cloudinary":
-            filename = rel.split("/uploads/")[-1]
-            fpath = os.path.join(UPLOAD_DIR, filename)
-            if os.path.exists(fpath):
-                try:
-                    os.remove(fpath)
-                except Exception:
-                    pass
+    removed = [orig for orig, norm in zip(existing_images, norm_existing) if norm == provided_rel]
+    _release_local_media(db, removed)
 
     product.image_url = json.dumps(updated_storage) if updated_storage else None
     db.commit()
+    wake_deletion_worker()
     db.refresh(product)
 
     response_images = [make_absolute_url(u) for u in json.loads(product.image_url)] if product.image_url else []
@@ -435,14 +547,11 @@ async def replace_product_image(
     product_id: int,
     old_image_url: str = Form(...),
     new_image: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if product.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    product = await db.run_sync(_get_owned_product, product_id, current_user)
+    await db.commit()  # don't hold the lookup transaction during the upload
 
     existing_images: List[str] = []
     if product.image_url:
@@ -457,11 +566,20 @@ async def replace_product_image(
         raise HTTPException(status_code=404, detail="Old image not found in product")
 
     if UPLOAD_MODE == "cloudinary":
-        new_url = upload_to_cloudinary(new_image, folder="makeitwhole/products/images")
+        new_url = await upload_to_cloudinary(new_image, folder=IMAGE_FOLDER)
     else:
-        saved_rel = await save_upload_file(new_image)
+        saved_rel = await save_upload_file(new_image, db, kind="image")
         new_url = saved_rel
 
+    try:
+        product = await db.run_sync(_lock_owned_product, product_id, current_user)
+        existing_images = _product_image_list(product)
+        if old_rel not in [to_relative_path(img) for img in existing_images]:
+            raise HTTPException(status_code=409, detail="The image was changed by another request; reload the product")
+    except HTTPException:
+        await abandon_uploads(db, [new_url])
+        raise
+
     replaced = False
     updated_list = []
     for orig in existing_images:
@@ -471,18 +589,13 @@ async def replace_product_image(
         else:
             updated_list.append(orig)
 
-    if UPLOAD_MODE != "cloudinary" and old_rel.startswith("/uploads/"):
-        filename = old_rel.split("/uploads/")[-1]
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
+    await db.run_sync(_release_local_media, [old_rel])
 
     product.image_url = json.dumps(updated_list) if updated_list else None
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    wake_deletion_worker()
+    await db.refresh(product)
+    schedule_derivatives([new_url])
 
     resp_imgs = [make_absolute_url(u) for u in json.loads(product.image_url)] if product.image_url else []
     return {"message": "✅ Image replaced successfully", "images": resp_imgs}
@@ -495,38 +608,202 @@ async def replace_product_image(
 async def replace_product_video(
     product_id: int,
     new_video: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if product.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    if product.video_url:
-        old_rel = to_relative_path(product.video_url)
-        if old_rel.startswith("/uploads/") and UPLOAD_MODE != "cloudinary":
-            filename = old_rel.split("/uploads/")[-1]
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception:
-                    pass
+    await db.run_sync(_get_owned_product, product_id, current_user)
+    await db.commit()  # don't hold the lookup transaction during the upload
 
     if UPLOAD_MODE == "cloudinary":
-        new_url = upload_to_cloudinary(new_video, folder="makeitwhole/products/videos", resource_type="video")
+        new_url = await upload_to_cloudinary(new_video, folder=VIDEO_FOLDER, resource_type="video")
     else:
-        saved_rel = await save_upload_file(new_video)
+        saved_rel = await save_upload_file(new_video, db, kind="video")
         new_url = saved_rel
 
+    try:
+        product = await db.run_sync(_lock_owned_product, product_id, current_user)
+    except HTTPException:
+        await abandon_uploads(db, [new_url])
+        raise
+    await db.run_sync(_release_local_media, [product.video_url])
+
     product.video_url = new_url
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    wake_deletion_worker()
+    await db.refresh(product)
+    schedule_video_metadata([new_url])
     return {"message": "✅ Video replaced successfully", "video_url": make_absolute_url(new_url)}
 
 
+# ============================================================
+#              RESUMABLE VIDEO UPLOADS (local mode)
+# ============================================================
+# Large videos are sent as a series of PATCH requests, each carrying the
+# byte offset it starts at. After a dropped connection the client asks for
+# the current offset (GET/HEAD) and continues from there.
+def _get_upload_session(
+    db: Session, product_id: int, upload_id: str, current_user: models.User
+) -> models.UploadSession:
+    upload_session = db.query(models.UploadSession).filter(models.UploadSession.id == upload_id).first()
+    if (
+        not upload_session
+        or upload_session.product_id != product_id
+        or upload_session.owner_id != current_user.id
+    ):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if upload_session.expires_at < datetime.utcnow():
+        discard_session(db, upload_session)
+        db.commit()
+        raise HTTPException(status_code=404, detail="Upload session expired")
+    return upload_session
+
+
+def _upload_session_out(upload_session: models.UploadSession, offset: int) -> schemas.UploadSessionOut:
+    return schemas.UploadSessionOut(
+        upload_id=upload_session.id,
+        product_id=upload_session.product_id,
+        offset=offset,
+        total_size=upload_session.total_size,
+        chunk_size=RESUMABLE_MAX_CHUNK_BYTES,
+        expires_at=upload_session.expires_at,
+    )
+
+
+async def _limit_chunk(stream):
+    received = 0
+    async for data in stream:
+        received += len(data)
+        if received > RESUMABLE_MAX_CHUNK_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Chunk exceeds {RESUMABLE_MAX_CHUNK_BYTES // (1024 * 1024)} MB",
+            )
+        yield data
+
+
+@router.post(
+    "/{product_id}/video-uploads",
+    response_model=schemas.UploadSessionOut,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_video_upload(
+    product_id: int,
+    payload: schemas.UploadSessionCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    if UPLOAD_MODE == "cloudinary":
+        raise HTTPException(status_code=400, detail="Resumable uploads are only available for local storage")
+    _get_owned_product(db, product_id, current_user)
+    validate_total_size(payload.total_size)
+    purge_expired_sessions(db)
+
+    upload_session = models.UploadSession(
+        id=uuid.uuid4().hex,
+        owner_id=current_user.id,
+        product_id=product_id,
+        filename=payload.filename,
+        total_size=payload.total_size,
+        expires_at=next_expiry(),
+    )
+    create_part_file(upload_session.id)
+    db.add(upload_session)
+    db.commit()
+    db.refresh(upload_session)
+
+    response.headers["Location"] = f"/products/{product_id}/video-uploads/{upload_session.id}"
+    response.headers["Upload-Offset"] = "0"
+    return _upload_session_out(upload_session, 0)
+
+
+@router.api_route(
+    "/{product_id}/video-uploads/{upload_id}",
+    methods=["GET", "HEAD"],
+    response_model=schemas.UploadSessionOut,
+)
+def get_video_upload(
+    product_id: int,
+    upload_id: str,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    upload_session = _get_upload_session(db, product_id, upload_id, current_user)
+    offset = current_offset(upload_session.id)
+    response.headers["Upload-Offset"] = str(offset)
+    response.headers["Cache-Control"] = "no-store"
+    return _upload_session_out(upload_session, offset)
+
+
+@router.patch("/{product_id}/video-uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_video_chunk(
+    product_id: int,
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    upload_session = await db.run_sync(_get_upload_session, product_id, upload_id, current_user)
+    await db.commit()  # don't hold the lookup transaction while the chunk streams in
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > RESUMABLE_MAX_CHUNK_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Chunk exceeds {RESUMABLE_MAX_CHUNK_BYTES // (1024 * 1024)} MB",
+        )
+
+    offset = await append_chunk(upload_session, upload_offset, _limit_chunk(request.stream()))
+
+    upload_session.received = offset
+    upload_session.expires_at = next_expiry()
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(offset)})
+
+
+@router.post("/{product_id}/video-uploads/{upload_id}/finalize", status_code=status.HTTP_200_OK)
+async def finalize_video_upload(
+    product_id: int,
+    upload_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    await db.run_sync(_get_owned_product, product_id, current_user)
+    upload_session = await db.run_sync(_get_upload_session, product_id, upload_id, current_user)
+    await db.commit()  # hashing the assembled file can take a while
+
+    staged = await stage_completed(upload_session)
+    new_url = await store_staged_async(db, staged)
+    try:
+        product = await db.run_sync(_lock_owned_product, product_id, current_user)
+    except HTTPException:
+        await abandon_uploads(db, [new_url])
+        raise
+    await db.run_sync(_release_local_media, [product.video_url])
+
+    product.video_url = new_url
+    await db.delete(upload_session)
+    await db.commit()
+    wake_deletion_worker()
+    await db.refresh(product)
+    schedule_video_metadata([new_url])
+    return {"message": "✅ Video uploaded successfully", "video_url": make_absolute_url(new_url)}
+
+
+@router.delete("/{product_id}/video-uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abort_video_upload(
+    product_id: int,
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    upload_session = _get_upload_session(db, product_id, upload_id, current_user)
+    discard_session(db, upload_session)
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 
 
 
@@ -537,7 +814,7 @@ async def replace_product_video(
 def delete_product_video(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
@@ -547,14 +824,10 @@ def delete_product_video(
     if not product.video_url:
         raise HTTPException(status_code=404, detail="No video to delete")
 
-    rel_path = to_relative_path(product.video_url)
-    if rel_path.startswith("/uploads/") and UPLOAD_MODE != "cloudinary":
-        filename = rel_path.split("/uploads/")[-1]
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    _release_local_media(db, [product.video_url])
 
     product.video_url = None
     db.commit()
+    wake_deletion_worker()
     db.refresh(product)
     return {"message": "✅ Video deleted successfully"}
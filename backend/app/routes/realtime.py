@@ -0,0 +1,134 @@
+# backend/app/routes/realtime.py
+"""
+Push endpoints for new notifications and matches (see app/realtime.py).
+
+    WS  /realtime/ws?token=<access token>
+    GET /realtime/events?token=<access token>    (Server-Sent Events fallback)
+
+Browsers can't set headers on WebSocket or EventSource requests, so the
+access token may be passed as ?token=. An Authorization: Bearer header
+works too. Events are JSON objects with a "type": "notification", "match",
+"ping" (heartbeat every REALTIME_HEARTBEAT_SECONDS) or "resync" (events
+were dropped; refetch over REST). The connection is closed when the access
+token expires, and the client reconnects with a fresh one.
+"""
+import asyncio
+import json
+import time
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import SECRET_KEY, oauth2_scheme, verify_token
+from app.config import REALTIME_HEARTBEAT_SECONDS, REALTIME_SEND_TIMEOUT_SECONDS
+from app.realtime import hub
+
+router = APIRouter()
+
+PING = {"type": "ping"}
+
+
+def _authenticate(token: Optional[str]) -> Tuple[int, float]:
+    """User id and expiry (epoch seconds) of an access token."""
+    if not token:
+        raise HTTPException(status_code=401, detail="Authorization token missing.")
+    payload = verify_token(token, SECRET_KEY, "Invalid or expired access token.")
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    return int(payload["sub"]), float(payload.get("exp") or time.time() + 3600)
+
+
+def _bearer(header: Optional[str]) -> Optional[str]:
+    if header and header.lower().startswith("bearer "):
+        return header[7:].strip()
+    return None
+
+
+# ============================================================
+# WEBSOCKET
+# ============================================================
+@router.websocket("/ws")
+async def realtime_socket(websocket: WebSocket, token: Optional[str] = None):
+    try:
+        user_id, expires_at = _authenticate(token or _bearer(websocket.headers.get("authorization")))
+    except HTTPException as e:
+        await websocket.close(code=4401, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    sub = hub.subscribe(user_id)
+    # Client frames are ignored; reading them is how a disconnect is noticed
+    reader = asyncio.create_task(_read_until_closed(websocket))
+    try:
+        while True:
+            timeout = min(REALTIME_HEARTBEAT_SECONDS, expires_at - time.time())
+            if timeout <= 0:
+                await websocket.close(code=4401, reason="Token expired")
+                return
+            getter = asyncio.create_task(sub.get())
+            done, _ = await asyncio.wait({getter, reader}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if reader in done:
+                getter.cancel()
+                return
+            if getter in done:
+                evt = getter.result()
+            else:
+                getter.cancel()
+                evt = PING
+            try:
+                await asyncio.wait_for(websocket.send_json(evt), REALTIME_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                # Client isn't reading; drop it rather than buffer for it
+                await websocket.close(code=1013, reason="Too slow")
+                return
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        hub.unsubscribe(sub)
+
+
+async def _read_until_closed(websocket: WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except (WebSocketDisconnect, RuntimeError, KeyError):
+        pass
+
+
+# ============================================================
+# SERVER-SENT EVENTS
+# ============================================================
+@router.get("/events")
+async def realtime_events(
+    request: Request,
+    token: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+):
+    user_id, expires_at = _authenticate(token or (credentials.credentials if credentials else None))
+
+    async def stream():
+        sub = hub.subscribe(user_id)
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                timeout = min(REALTIME_HEARTBEAT_SECONDS, expires_at - time.time())
+                if timeout <= 0:
+                    yield "event: expired\ndata: {}\n\n"
+                    return
+                try:
+                    evt = await asyncio.wait_for(sub.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {evt['type']}\ndata: {json.dumps(evt, default=str)}\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,17 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional
 import os
 
 from app import models, schemas
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.auth import (
     get_password_hash,
-    verify_password,
+    verify_and_rehash_password,
     create_access_token,
+    create_refresh_token,
     refresh_access_token,
     get_current_user,
+    invalidate_user,
+    UserSnapshot,
 )
 
 router = APIRouter()
@@ -23,20 +27,24 @@ ACCESS_TOKEN_EXPIRE_HOURS = 12
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 
+def _user_by_name(db: Session, username: str, email: str):
+    return db.query(models.User).filter(
+        (models.User.username == username) | (models.User.email == email)
+    ).first()
+
+
 # 🧩 Register user (local or Google)
 @router.post("/register", response_model=schemas.UserOut)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user (local or Google).
     For Google, skip password.
     """
-    existing_user = db.query(models.User).filter(
-        (models.User.username == user_in.username)
-        | (models.User.email == user_in.email)
-    ).first()
+    existing_user = await db.run_sync(_user_by_name, user_in.username, user_in.email)
 
     if existing_user:
         raise HTTPException(status_code=400, detail="Username or email already registered")
+    await db.commit()  # don't hold the lookup transaction while hashing
 
     # Handle Google provider users
     if user_in.provider == "google":
@@ -46,7 +54,7 @@ def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
             raise HTTPException(
                 status_code=400, detail="Password is required for local registration"
             )
-        hashed_password = get_password_hash(user_in.password)
+        hashed_password = await get_password_hash(user_in.password)
 
     user = models.User(
         username=user_in.username,
@@ -59,20 +67,20 @@ def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return user
 
 
 # 🔐 Login user (local or Google)
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     username: str = Form(...),
     password: Optional[str] = Form(None),
     provider: Optional[str] = Form("local"),
     provider_id: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Login route for both local and Google users.
@@ -80,9 +88,7 @@ def login(
     - For Google: uses email + provider_id (auto-registers if new)
     """
     # Try to find existing user
-    user = db.query(models.User).filter(
-        (models.User.email == username) | (models.User.username == username)
-    ).first()
+    user = await db.run_sync(_user_by_name, username, username)
 
     # --- If user does not exist ---
     if not user:
@@ -97,8 +103,8 @@ def login(
                 date_created=datetime.utcnow(),
             )
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             user = new_user
         else:
             raise HTTPException(
@@ -110,7 +116,7 @@ def login(
     if provider == "local":
         if not password:
             raise HTTPException(status_code=400, detail="Password is required for local login")
-        if not user.hashed_password or not verify_password(password, user.hashed_password):
+        if not user.hashed_password or not await verify_and_rehash_password(db, user, password):
             raise HTTPException(status_code=401, detail="Invalid username/email or password")
 
     # --- Google login ---
@@ -125,7 +131,7 @@ def login(
     refresh_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
 
     access_token = create_access_token(data={"sub": str(user.id)}, expires_delta=access_expires)
-    refresh_token = create_access_token(data={"sub": str(user.id)}, expires_delta=refresh_expires)
+    refresh_token = create_refresh_token(data={"sub": str(user.id)}, expires_delta=refresh_expires)
 
     return {
         "access_token": access_token,
@@ -141,12 +147,13 @@ def login(
 
 # 🔁 Refresh token
 @router.post("/refresh")
-def refresh_token(refresh_token: str = Form(...)):
+def refresh_token(refresh_token: str = Form(...), db: Session = Depends(get_db)):
     """
     Refresh access token using a valid refresh token.
+    The refresh token is rotated: use the one in the response next time.
     """
     try:
-        new_token = refresh_access_token(refresh_token)
+        new_token = refresh_access_token(db, refresh_token)
         return new_token
     except Exception:
         raise HTTPException(
@@ -163,7 +170,7 @@ def get_users(db: Session = Depends(get_db)):
 
 # 👤 Get current logged-in user
 @router.get("/me", response_model=schemas.UserOut)
-def get_me(current_user: models.User = Depends(get_current_user)):
+def get_me(current_user: UserSnapshot = Depends(get_current_user)):
     return current_user
 
 
@@ -172,12 +179,17 @@ def get_me(current_user: models.User = Depends(get_current_user)):
 def update_user_me(
     payload: schemas.UserUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     for key, value in payload.dict(exclude_unset=True).items():
-        setattr(current_user, key, value)
+        setattr(user, key, value)
 
-    current_user.date_updated = datetime.utcnow()
+    user.date_updated = datetime.utcnow()
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    invalidate_user(user.id)
+    db.refresh(user)
+    return user
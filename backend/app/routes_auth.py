@@ -2,15 +2,19 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app import models, schemas
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.auth import (
     get_password_hash,
-    verify_password,
+    verify_and_rehash_password,
     create_access_token,
+    create_refresh_token,
     refresh_access_token,
+    revoke_refresh_token,
     get_current_user,
+    UserSnapshot,
 )
 from datetime import timedelta
 
@@ -18,45 +22,47 @@ router = APIRouter(tags=["Auth"])
 oauth2_scheme = HTTPBearer(auto_error=False)
 
 
+def _user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
 # ✅ 1. Register a new user
 @router.post("/register", response_model=schemas.UserOut)
-def register_user(
+async def register_user(
     username: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Register a new user"""
-    existing_user = db.query(models.User).filter(models.User.email == email).first()
+    existing_user = await db.run_sync(_user_by_email, email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered.")
+    await db.commit()  # don't hold the lookup transaction while hashing
 
-    hashed_pw = get_password_hash(password)
+    hashed_pw = await get_password_hash(password)
     user = models.User(username=username, email=email, hashed_password=hashed_pw)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 # ✅ 2. Login user and return access + refresh tokens
 @router.post("/login")
-def login_user(
+async def login_user(
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Authenticate user and return JWT tokens"""
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = await db.run_sync(_user_by_email, email)
+    if not user or not await verify_and_rehash_password(db, user, password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(data={"sub": str(user.id)}, expires_delta=access_token_expires)
-
-    # Optional: Create refresh token with longer expiry
-    refresh_token_expires = timedelta(days=7)
-    refresh_token = create_access_token(data={"sub": str(user.id)}, expires_delta=refresh_token_expires)
+    refresh_token = create_refresh_token(data={"sub": str(user.id)})
 
     return {
         "access_token": access_token,
@@ -66,27 +72,39 @@ def login_user(
     }
 
 
-# ✅ 3. Refresh access token
+# ✅ 3. Refresh access token (rotates the refresh token)
 @router.post("/refresh")
-def refresh_token(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    """Refresh expired access token"""
+def refresh_token(
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    """Exchange a refresh token for new access + refresh tokens"""
     if token is None:
         raise HTTPException(status_code=401, detail="No refresh token provided.")
-    return refresh_access_token(token.credentials)
+    return refresh_access_token(db, token.credentials)
 
 
-# ✅ 4. Logout user (client-side token deletion)
+# ✅ 4. Logout user (revokes the refresh token)
 @router.post("/logout")
-def logout_user():
+def logout_user(
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
     """
-    Logout endpoint — clears local tokens on the client.
-    No server state because JWTs are stateless.
+    Logout endpoint — send the refresh token as the bearer token. It and all
+    tokens rotated from the same login stop working; the client should also
+    drop its (short-lived) access token.
     """
+    if token is not None:
+        try:
+            revoke_refresh_token(db, token.credentials)
+        except HTTPException:
+            pass  # already invalid: nothing left to revoke
     return {"message": "Successfully logged out. Please clear tokens from client."}
 
 
 # ✅ 5. Get current user info
 @router.get("/me", response_model=schemas.UserOut)
-def get_me(current_user: models.User = Depends(get_current_user)):
+def get_me(current_user: UserSnapshot = Depends(get_current_user)):
     """Return profile of currently authenticated user"""
     return current_user
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, constr, field_validator
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict
 from datetime import datetime
 import json
 
@@ -83,6 +83,14 @@ class ProductUpdate(BaseModel):
     item_type: Optional[str] = Field(default=None, pattern="^(have|need)$")
 
 
+class VideoMetaOut(BaseModel):
+    poster_url: Optional[str] = None
+    duration: Optional[float] = None   # seconds
+    width: Optional[int] = None
+    height: Optional[int] = None
+    codec: Optional[str] = None
+
+
 class ProductOut(BaseModel):
     id: int
     owner_id: int
@@ -93,7 +101,9 @@ class ProductOut(BaseModel):
     price: float
     quantity: int
     image_url: List[str] = []          # always a list
+    image_srcset: List[Dict[str, str]] = []  # per image: MIME type -> srcset (resized variants)
     video_url: Optional[str] = None    # single URL or None
+    video_meta: Optional[VideoMetaOut] = None  # poster + probe results, once extracted
     item_type: Optional[str] = None
     date_posted: datetime
     date_updated: Optional[datetime] = None
@@ -139,6 +149,23 @@ class ProductOut(BaseModel):
 
 
 
+# ======================================================
+#                 RESUMABLE VIDEO UPLOADS
+# ======================================================
+class UploadSessionCreate(BaseModel):
+    filename: constr(min_length=1, max_length=255)
+    total_size: int = Field(gt=0)
+
+
+class UploadSessionOut(BaseModel):
+    upload_id: str
+    product_id: int
+    offset: int
+    total_size: int
+    chunk_size: int
+    expires_at: datetime
+
+
 # ======================================================
 #                       MATCHES
 # ======================================================
@@ -159,6 +186,7 @@ class MatchOut(BaseModel):
     product_b_id: int
     similarity_score: Optional[float]
     date_matched: datetime
+    archived: bool = False
 
     # Include full product details if needed for UI
     product_a: Optional[ProductOut] = None
@@ -192,5 +220,63 @@ class NotificationOut(BaseModel):
     message: str
     is_read: bool
     date_created: datetime
+    count: int = 1  # > 1 for a digest of several notifications
+    date_updated: Optional[datetime] = None
+    archived: bool = False
+
+    model_config = {"from_attributes": True}
+
+
+class NotificationPage(BaseModel):
+    items: List[NotificationOut]
+    # Pass back as ?cursor= for the next (older) page; None on the last page
+    next_cursor: Optional[int] = None
+
+
+class NotificationReadRequest(BaseModel):
+    """Either `ids`, or `up_to` (a notification id / page cursor) to mark everything at or below it."""
+    ids: Optional[List[int]] = Field(default=None, max_length=500)
+    up_to: Optional[int] = None
+
+
+
+# ======================================================
+#                     MESSAGING
+# ======================================================
+class ConversationCreate(BaseModel):
+    match_id: int
+
+
+class MessageCreate(BaseModel):
+    body: constr(strip_whitespace=True, min_length=1, max_length=4000)
+
+
+class MessageOut(BaseModel):
+    id: int
+    conversation_id: int
+    sender_id: Optional[int]
+    body: str
+    created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class MessagePage(BaseModel):
+    items: List[MessageOut]
+    # Pass back as ?before= (or ?after=) for the next page; None when there's no more
+    next_cursor: Optional[int] = None
+
+
+class ConversationOut(BaseModel):
+    id: int
+    match_id: Optional[int]
+    participant_ids: List[int]
+    unread_count: int = 0
+    created_at: datetime
+    last_message_at: Optional[datetime] = None
+    last_message: Optional[MessageOut] = None
+
+
+class ConversationReadRequest(BaseModel):
+    # Last message the user has seen; defaults to the newest
+    up_to: Optional[int] = None
@@ -0,0 +1,106 @@
+# backend/app/static_media.py
+"""
+Cache-aware serving for /uploads.
+
+Upload names never change content: content-addressed blobs (<sha256>.<ext>),
+their derivatives (<sha256>.<ext>.w320.webp, <sha256>.mp4.poster.jpg) and
+legacy timestamped files (20251015123814_kettle.mp4). Those are served with
+a one-year `immutable` Cache-Control and a strong ETag taken from the name,
+so browsers stop revalidating product media. Anything else is revalidated via ETag /
+If-None-Match.
+
+Byte ranges (video seeking), If-Range and the ASGI `pathsend` extension
+(zero-copy on servers that support it) come from Starlette's FileResponse.
+Behind nginx, MEDIA_ACCEL_REDIRECT_PREFIX hands the body to nginx via
+X-Accel-Redirect so it is sent with sendfile().
+
+URLs stay flat (/uploads/<name>) while files live in hash-prefix shard
+directories (see app.storage); files not yet migrated are still found at the
+top level. With the S3 backend, /uploads/<name> redirects to the object.
+"""
+import os
+import re
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.config import MEDIA_ACCEL_REDIRECT_PREFIX
+from app.storage import get_storage, shard_key
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_CONTENT_ADDRESSED = re.compile(
+    r"^(?P<digest>[0-9a-f]{64})(\.[a-z0-9]{1,10})?(\.w\d+\.[a-z0-9]+|\.poster\.jpg)?$"
+)
+_TIMESTAMPED = re.compile(r"^\d{14,20}_")
+
+
+class MediaFileResponse(FileResponse):
+    # Bigger reads for multi-MB videos; fewer thread hops per response
+    chunk_size = 256 * 1024
+
+
+def is_immutable_name(filename: str) -> bool:
+    return bool(_CONTENT_ADDRESSED.match(filename) or _TIMESTAMPED.match(filename))
+
+
+class MediaStaticFiles(StaticFiles):
+    def lookup_path(self, path: str):
+        if path and os.sep not in path and "/" not in path:
+            full_path, stat_result = super().lookup_path(os.path.join(*shard_key(path).split("/")))
+            if stat_result is not None:
+                return full_path, stat_result
+        return super().lookup_path(path)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        filename = os.path.basename(full_path)
+        immutable = is_immutable_name(filename)
+
+        response = MediaFileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        if immutable:
+            # The name already identifies the bytes; a strong ETag survives copies/restores.
+            response.headers["etag"] = f'"{filename}"'
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if MEDIA_ACCEL_REDIRECT_PREFIX:
+            rel = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            headers = {
+                "X-Accel-Redirect": f"{MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{rel}",
+                "Cache-Control": response.headers["cache-control"],
+                "ETag": response.headers["etag"],
+                "Content-Type": response.media_type,
+            }
+            return Response(status_code=status_code, headers=headers)
+
+        return response
+
+
+class RemoteMediaRedirect:
+    """Answers /uploads/<name> with a redirect to the object in S3 storage."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path, root_path = scope["path"], scope.get("root_path", "")
+        name = (path[len(root_path):] if path.startswith(root_path) else path).lstrip("/")
+        if scope["method"] not in ("GET", "HEAD"):
+            response: Response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif not name or "/" in name or name.startswith("."):
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            url = await run_in_threadpool(get_storage().url, name)
+            # Presigned URLs expire, so the redirect itself is only cached briefly
+            response = RedirectResponse(url, status_code=307, headers={"Cache-Control": "public, max-age=300"})
+        await response(scope, receive, send)
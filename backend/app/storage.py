@@ -0,0 +1,271 @@
+# backend/app/storage.py
+"""
+Storage backends for local-mode uploads.
+
+Media is addressed by its upload name (the part after `/uploads/` in a
+stored URL), so database references don't depend on where the bytes live.
+The local backend spreads files over two levels of hash-prefix directories
+under UPLOAD_DIR (`ab/cd/<name>`) instead of one flat directory. The S3
+backend stores the same layout under S3_KEY_PREFIX in any S3-compatible
+bucket (AWS, MinIO, scripts/fake_s3.py).
+
+Move an existing flat uploads directory into the configured backend with:
+
+    python -m app.storage migrate [--dry-run]
+"""
+import abc
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+from app.config import (
+    UPLOAD_DIR, STORAGE_BACKEND, S3_BUCKET, S3_ENDPOINT_URL, S3_REGION,
+    S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY, S3_KEY_PREFIX, S3_PUBLIC_BASE_URL,
+    REMOTE_UPLOAD_WORKERS,
+)
+
+_DIGEST_PREFIX = re.compile(r"^[0-9a-f]{64}")
+
+
+def shard_key(name: str) -> str:
+    """
+    `<sha256>.png` -> `ab/cd/<sha256>.png`. Derivatives share their source's
+    prefix; other names are placed by a hash of the name.
+    """
+    prefix = name[:4] if _DIGEST_PREFIX.match(name) else hashlib.sha256(name.encode()).hexdigest()[:4]
+    return f"{prefix[:2]}/{prefix[2:4]}/{name}"
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class StoredFile(NamedTuple):
+    name: str
+    size: int
+    mtime: float
+
+
+class StorageBackend(abc.ABC):
+    """Operations the upload pipeline needs from a media store."""
+
+    @abc.abstractmethod
+    def put(self, src_path: str, name: str) -> None:
+        """Move a finished local file in under `name` (an existing object is kept)."""
+
+    @abc.abstractmethod
+    def exists(self, name: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def fetch(self, name: str):
+        """Context manager yielding a readable local path for `name`."""
+
+    @abc.abstractmethod
+    def delete(self, name: str) -> None:
+        """Remove `name`; missing objects are ignored."""
+
+    @abc.abstractmethod
+    def iter_files(self) -> Iterator[StoredFile]:
+        ...
+
+
+# ============================================================
+# LOCAL (SHARDED) FILESYSTEM
+# ============================================================
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, *shard_key(name).split("/"))
+
+    def _find(self, name: str) -> Optional[str]:
+        # Files from before the sharded layout stay readable until migrated
+        for candidate in (self.path(name), os.path.join(self.root, name)):
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def put(self, src_path: str, name: str) -> None:
+        dest = self.path(name)
+        if os.path.exists(dest):
+            # Identical content is already stored: keep the existing file (and its mtime).
+            # Callers hold the blob reference by now, so the deletion worker won't remove it.
+            _discard(src_path)
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src_path, dest)
+
+    def exists(self, name: str) -> bool:
+        return self._find(name) is not None
+
+    @contextmanager
+    def fetch(self, name: str):
+        path = self._find(name)
+        if path is None:
+            raise FileNotFoundError(name)
+        yield path
+
+    def delete(self, name: str) -> None:
+        _discard(self.path(name))
+        _discard(os.path.join(self.root, name))
+
+    def iter_files(self) -> Iterator[StoredFile]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue  # staged uploads / temp files
+                st = os.stat(os.path.join(dirpath, filename))
+                yield StoredFile(filename, st.st_size, st.st_mtime)
+
+
+# ============================================================
+# S3-COMPATIBLE OBJECT STORAGE
+# ============================================================
+class S3Storage(StorageBackend):
+    def __init__(self, bucket: str, prefix: str = S3_KEY_PREFIX):
+        # Optional, and slow to import: only loaded for the S3 backend
+        try:
+            import boto3
+            from botocore.config import Config as BotoConfig
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3: pip install boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT_URL or None,
+            region_name=S3_REGION,
+            aws_access_key_id=S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=S3_SECRET_ACCESS_KEY or None,
+            config=BotoConfig(
+                signature_version="s3v4",
+                s3={"addressing_style": "path" if S3_ENDPOINT_URL else "auto"},
+                max_pool_connections=max(10, REMOTE_UPLOAD_WORKERS),
+                # Plain PUT bodies; some S3-compatible stores reject aws-chunked trailers
+                request_checksum_calculation="when_required",
+                response_checksum_validation="when_required",
+            ),
+        )
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{shard_key(name)}"
+
+    def put(self, src_path: str, name: str) -> None:
+        from app.static_media import IMMUTABLE_CACHE_CONTROL, is_immutable_name
+
+        try:
+            if self.exists(name):
+                return
+            extra = {"ContentType": mimetypes.guess_type(name)[0] or "application/octet-stream"}
+            if is_immutable_name(name):
+                extra["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+            self.client.upload_file(src_path, self.bucket, self.key(name), ExtraArgs=extra)
+        finally:
+            _discard(src_path)
+
+    def exists(self, name: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    @contextmanager
+    def fetch(self, name: str):
+        from botocore.exceptions import ClientError
+
+        tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+        try:
+            self.client.download_file(self.bucket, self.key(name), tmp_path)
+        except ClientError as e:
+            _discard(tmp_path)
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(name)
+            raise
+        try:
+            yield tmp_path
+        finally:
+            _discard(tmp_path)
+
+    def delete(self, name: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(name))
+
+    def iter_files(self) -> Iterator[StoredFile]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                yield StoredFile(obj["Key"].rsplit("/", 1)[-1], obj["Size"], obj["LastModified"].timestamp())
+
+    def url(self, name: str) -> str:
+        if S3_PUBLIC_BASE_URL:
+            return f"{S3_PUBLIC_BASE_URL.rstrip('/')}/{self.key(name)}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self.key(name)}, ExpiresIn=3600
+        )
+
+
+# ============================================================
+# BACKEND SELECTION
+# ============================================================
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "s3":
+            if not S3_BUCKET:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+            _storage = S3Storage(S3_BUCKET)
+        else:
+            _storage = LocalStorage(UPLOAD_DIR)
+    return _storage
+
+
+# ============================================================
+# FLAT DIRECTORY MIGRATION
+# ============================================================
+def migrate_flat_files(source_dir: str, storage: StorageBackend, dry_run: bool = False) -> int:
+    """
+    Move every file directly inside `source_dir` into `storage` under the
+    same name. Names are unchanged, so no database rows need rewriting.
+    """
+    moved = 0
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            print(f"  {entry.name} -> {shard_key(entry.name)}")
+            if not dry_run:
+                storage.put(entry.path, entry.name)
+            moved += 1
+    return moved
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upload storage maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="move flat UPLOAD_DIR files into the configured backend")
+    migrate.add_argument("--source", default=UPLOAD_DIR)
+    migrate.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    count = migrate_flat_files(args.source, get_storage(), args.dry_run)
+    print(f"✅ {'Would move' if args.dry_run else 'Moved'} {count} file(s) into {STORAGE_BACKEND} storage.")
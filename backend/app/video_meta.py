@@ -0,0 +1,208 @@
+# backend/app/video_meta.py
+"""
+Video poster frames and metadata.
+
+After a local video upload, a background worker runs ffprobe for duration,
+resolution and codec and grabs a poster frame with ffmpeg. The poster is
+stored next to the video (`<file>.poster.jpg`) and everything is recorded in
+`video_metadata`. Product responses then carry a poster URL and metadata, so
+clients can render a preview without downloading the video.
+
+Both binaries are optional: without them no metadata is produced. Backfill
+existing product videos with:
+
+    python -m app.video_meta
+"""
+import json
+import os
+import shutil
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import (
+    UPLOAD_DIR, FFMPEG_BINARY, FFPROBE_BINARY, VIDEO_META_WORKERS,
+    VIDEO_POSTER_OFFSET_SECONDS, VIDEO_POSTER_MAX_WIDTH, VIDEO_TOOL_TIMEOUT_SECONDS,
+)
+from app.database import SessionLocal
+from app.storage import get_storage
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=VIDEO_META_WORKERS, thread_name_prefix="video-meta")
+    return _executor
+
+
+def tools_available() -> bool:
+    return bool(shutil.which(FFPROBE_BINARY) and shutil.which(FFMPEG_BINARY))
+
+
+def poster_filename(filename: str) -> str:
+    return f"{filename}.poster.jpg"
+
+
+# ============================================================
+# EXTRACTION (runs on the worker pool)
+# ============================================================
+def probe_video(path: str) -> Dict:
+    """Duration (seconds), width, height and codec of the first video stream."""
+    result = subprocess.run(
+        [
+            FFPROBE_BINARY, "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=codec_name,width,height:format=duration",
+            "-of", "json", path,
+        ],
+        capture_output=True, check=True, timeout=VIDEO_TOOL_TIMEOUT_SECONDS,
+    )
+    info = json.loads(result.stdout or b"{}")
+    stream = (info.get("streams") or [{}])[0]
+    duration = info.get("format", {}).get("duration")
+    return {
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "codec": stream.get("codec_name"),
+    }
+
+
+def extract_poster(path: str, out_path: str, at: float) -> None:
+    subprocess.run(
+        [
+            FFMPEG_BINARY, "-v", "error", "-y",
+            "-ss", f"{at:.3f}", "-i", path,
+            "-frames:v", "1",
+            "-vf", f"scale='min({VIDEO_POSTER_MAX_WIDTH},iw)':-2",
+            "-q:v", "3", "-f", "image2", out_path,
+        ],
+        capture_output=True, check=True, timeout=VIDEO_TOOL_TIMEOUT_SECONDS,
+    )
+
+
+def _write_poster(storage, src_path: str, poster_name: str, duration: Optional[float]) -> None:
+    # Skip black lead-in frames, but stay inside very short clips
+    at = VIDEO_POSTER_OFFSET_SECONDS
+    if duration is not None and duration <= at:
+        at = duration / 2
+    tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+    try:
+        try:
+            extract_poster(src_path, tmp_path, at)
+        except subprocess.CalledProcessError:
+            if at == 0:
+                raise
+            extract_poster(src_path, tmp_path, 0)
+        storage.put(tmp_path, poster_name)
+    finally:
+        # Gone after a successful put; left behind when ffmpeg or the upload fails
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def generate_video_metadata(source_rel: str) -> models.VideoMetadata:
+    """Probe one /uploads/<file> video, store its poster and record the result."""
+    storage = get_storage()
+    filename = source_rel.split("/uploads/")[-1]
+    poster_name = poster_filename(filename)
+    with storage.fetch(filename) as src_path:
+        meta = probe_video(src_path)
+        # An existing poster is kept: replacing it in place would briefly 404
+        # (or serve a torn file) to clients already pointed at it
+        if not storage.exists(poster_name):
+            _write_poster(storage, src_path, poster_name, meta["duration"])
+
+    record = models.VideoMetadata(source_path=source_rel, poster_path=f"/uploads/{poster_name}", **meta)
+    db = SessionLocal()
+    try:
+        db.merge(record)
+        db.commit()
+    finally:
+        db.close()
+    return record
+
+
+def _has_metadata(source_rel: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.get(models.VideoMetadata, source_rel) is not None
+    finally:
+        db.close()
+
+
+def _generate_safely(source_rel: str) -> None:
+    try:
+        # Deduplicated uploads point at a blob that may already be processed
+        if _has_metadata(source_rel):
+            return
+        generate_video_metadata(source_rel)
+    except Exception as e:
+        print(f"⚠️ Video metadata extraction failed for {source_rel}: {e}")
+
+
+def schedule_video_metadata(source_rels: Iterable[Optional[str]]) -> None:
+    """Queue poster/metadata extraction for freshly saved local videos (non-blocking)."""
+    if not tools_available():
+        return
+    for rel in source_rels:
+        if rel and rel.startswith("/uploads/"):
+            _get_executor().submit(_generate_safely, rel)
+
+
+# ============================================================
+# LOOKUP / CLEANUP
+# ============================================================
+def load_video_metadata(db: Session, source_rels: Iterable[Optional[str]]) -> Dict[str, models.VideoMetadata]:
+    """Fetch metadata for many videos in a single query."""
+    rels = [r for r in set(source_rels) if r]
+    if not rels:
+        return {}
+    rows = db.query(models.VideoMetadata).filter(models.VideoMetadata.source_path.in_(rels)).all()
+    return {m.source_path: m for m in rows}
+
+
+def delete_video_metadata(db: Session, source_rel: str) -> None:
+    """Remove the poster and metadata row for a video that is being deleted."""
+    meta = db.get(models.VideoMetadata, source_rel)
+    if meta is None:
+        return
+    try:
+        get_storage().delete(meta.poster_path.split("/uploads/")[-1])
+    except Exception:
+        pass
+    db.delete(meta)
+
+
+# ============================================================
+# BACKFILL
+# ============================================================
+def backfill() -> None:
+    db = SessionLocal()
+    try:
+        rels = {
+            v for (v,) in db.query(models.Product.video_url).filter(models.Product.video_url.like("/uploads/%"))
+        }
+        done = {r for (r,) in db.query(models.VideoMetadata.source_path)}
+    finally:
+        db.close()
+
+    todo = sorted(rels - done)
+    print(f"🎞️ Extracting posters/metadata for {len(todo)} video(s)...")
+    for rel in todo:
+        _generate_safely(rel)
+    print("✅ Done!")
+
+
+if __name__ == "__main__":
+    if not tools_available():
+        raise SystemExit(f"ffmpeg/ffprobe not found ({FFMPEG_BINARY}, {FFPROBE_BINARY})")
+    backfill()
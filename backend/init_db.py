@@ -1,12 +1,11 @@
 # init_db.py — place this inside backend/
+# Deploy step: creates the database (Postgres) and any missing tables, so
+# the app itself can start with DB_INIT_ON_STARTUP=false.
 
-from app.database import Base, engine
-# Import models so SQLAlchemy knows about them
-from app import models
+from app.database import init_database
 
 def init_db():
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    init_database()
     print("✅ Done!")
 
 if __name__ == "__main__":
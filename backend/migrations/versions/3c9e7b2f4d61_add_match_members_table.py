@@ -0,0 +1,77 @@
+"""add match_members table
+
+Revision ID: 3c9e7b2f4d61
+Revises: a7c4e1f92b36
+Create Date: 2025-11-26 09:41:05.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e7b2f4d61'
+down_revision: Union[str, Sequence[str], None] = 'a7c4e1f92b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    # matches was only ever created by create_all
+    if 'matches' not in inspector.get_table_names():
+        op.create_table(
+            'matches',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('product_a_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=True),
+            sa.Column('product_b_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=True),
+            sa.Column('similarity', sa.Float(), nullable=True),
+            sa.Column('buyer_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('seller_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+        )
+        op.create_index(op.f('ix_matches_id'), 'matches', ['id'], unique=False)
+
+    op.create_table(
+        'match_members',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('match_id', sa.Integer(), sa.ForeignKey('matches.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('role', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('match_id', 'user_id', name='uq_match_members_match_user'),
+    )
+    op.create_index(
+        'ix_match_members_user_created', 'match_members',
+        ['user_id', sa.text('created_at DESC')], unique=False,
+    )
+
+    # Backfill: the owner of each side, once per user
+    op.execute(
+        """
+        INSERT INTO match_members (match_id, user_id, role, created_at)
+        SELECT m.id, p.owner_id, p.item_type, COALESCE(m.timestamp, CURRENT_TIMESTAMP)
+        FROM matches m JOIN products p ON p.id = m.product_a_id
+        WHERE p.owner_id IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO match_members (match_id, user_id, role, created_at)
+        SELECT m.id, pb.owner_id, pb.item_type, COALESCE(m.timestamp, CURRENT_TIMESTAMP)
+        FROM matches m
+        JOIN products pb ON pb.id = m.product_b_id
+        LEFT JOIN products pa ON pa.id = m.product_a_id
+        WHERE pb.owner_id IS NOT NULL
+          AND (pa.owner_id IS NULL OR pa.owner_id <> pb.owner_id)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_match_members_user_created', table_name='match_members')
+    op.drop_table('match_members')
@@ -0,0 +1,78 @@
+"""never reuse ids of archived matches, match_members and notifications
+
+The archive tables keep the ids of the rows they take over. Without
+AUTOINCREMENT, SQLite hands out the highest archived ids again once the
+newest rows of a hot table have been archived, and the next archive pass
+then fails on the duplicate. Postgres sequences never go back, so only
+SQLite needs the table rebuild.
+
+Revision ID: a3e7c1b9d462
+Revises: f2c8a5d7e194
+Create Date: 2025-12-03 10:12:44.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e7c1b9d462'
+down_revision: Union[str, Sequence[str], None] = 'f2c8a5d7e194'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (hot table, archive table, (child table, column) pointing at the hot ids)
+TABLES = (
+    ('matches', 'matches_archive', (('match_members', 'match_id'), ('conversations', 'match_id'))),
+    ('match_members', 'match_members_archive', ()),
+    ('notifications', 'notifications_archive', ()),
+)
+
+
+def _foreign_keys_off(bind) -> None:
+    # Rebuilding drops the old table, and with foreign keys on that cascades
+    # into match_members and conversations. The pragma is ignored inside a
+    # transaction; this runs before the migration's first write.
+    bind.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    if bind.exec_driver_sql("PRAGMA foreign_keys").scalar():
+        raise RuntimeError("Could not turn off SQLite foreign keys; run this migration on its own")
+
+
+def _max_id(bind, hot: str, archive: str) -> int:
+    return bind.exec_driver_sql(
+        f"SELECT COALESCE(MAX(id), 0) FROM (SELECT id FROM {hot} UNION ALL SELECT id FROM {archive})"
+    ).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    _foreign_keys_off(bind)
+
+    # Rows that already took an archived id move past every existing id
+    for hot, archive, children in TABLES:
+        offset = _max_id(bind, hot, archive)
+        reused = f"SELECT h.id FROM {hot} h JOIN {archive} a ON a.id = h.id"
+        for child, column in children:
+            bind.exec_driver_sql(f"UPDATE {child} SET {column} = {column} + {offset} WHERE {column} IN ({reused})")
+        bind.exec_driver_sql(f"UPDATE {hot} SET id = id + {offset} WHERE id IN ({reused})")
+
+    for hot, _, _ in TABLES:
+        with op.batch_alter_table(hot, recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+    # New ids continue after the archived ones too
+    for hot, archive, _ in TABLES:
+        bind.exec_driver_sql(f"DELETE FROM sqlite_sequence WHERE name = '{hot}'")
+        bind.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('{hot}', {_max_id(bind, hot, archive)})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    _foreign_keys_off(bind)
+    for hot, _, _ in TABLES:
+        with op.batch_alter_table(hot, recreate='always'):
+            pass
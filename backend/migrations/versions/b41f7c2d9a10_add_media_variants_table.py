@@ -0,0 +1,37 @@
+"""add media_variants table
+
+Revision ID: b41f7c2d9a10
+Revises: 826761d739b1
+Create Date: 2025-11-18 09:12:30.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f7c2d9a10'
+down_revision: Union[str, Sequence[str], None] = '826761d739b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'media_variants',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('source_path', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    )
+    op.create_index(op.f('ix_media_variants_id'), 'media_variants', ['id'], unique=False)
+    op.create_index(op.f('ix_media_variants_source_path'), 'media_variants', ['source_path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_media_variants_source_path'), table_name='media_variants')
+    op.drop_index(op.f('ix_media_variants_id'), table_name='media_variants')
+    op.drop_table('media_variants')
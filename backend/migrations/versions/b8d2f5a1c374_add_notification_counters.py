@@ -0,0 +1,41 @@
+"""add notification_counters table and notifications (user_id, id) index
+
+Revision ID: b8d2f5a1c374
+Revises: 3c9e7b2f4d61
+Create Date: 2025-11-26 15:03:48.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f5a1c374'
+down_revision: Union[str, Sequence[str], None] = '3c9e7b2f4d61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notifications_user_id_id', 'notifications', ['user_id', 'id'], unique=False)
+    op.create_table(
+        'notification_counters',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('unread', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Backfill from the existing unread notifications
+    op.execute(
+        """
+        INSERT INTO notification_counters (user_id, unread)
+        SELECT user_id, COUNT(*) FROM notifications
+        WHERE is_read IS NOT TRUE
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('notification_counters')
+    op.drop_index('ix_notifications_user_id_id', table_name='notifications')
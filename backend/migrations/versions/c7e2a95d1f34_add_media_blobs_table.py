@@ -0,0 +1,33 @@
+"""add media_blobs table
+
+Revision ID: c7e2a95d1f34
+Revises: b41f7c2d9a10
+Create Date: 2025-11-19 10:05:12.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a95d1f34'
+down_revision: Union[str, Sequence[str], None] = 'b41f7c2d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'media_blobs',
+        sa.Column('sha256', sa.String(length=64), primary_key=True),
+        sa.Column('path', sa.String(length=255), nullable=False, unique=True),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mime', sa.String(length=50), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_blobs')
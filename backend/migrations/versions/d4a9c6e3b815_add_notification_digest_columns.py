@@ -0,0 +1,31 @@
+"""add notification digest columns (group_key, count, date_updated)
+
+Revision ID: d4a9c6e3b815
+Revises: b8d2f5a1c374
+Create Date: 2025-11-27 11:26:19.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9c6e3b815'
+down_revision: Union[str, Sequence[str], None] = 'b8d2f5a1c374'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('group_key', sa.String(length=64), nullable=True))
+    op.add_column('notifications', sa.Column('count', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('notifications', sa.Column('date_updated', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_notifications_user_group', 'notifications', ['user_id', 'group_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_user_group', table_name='notifications')
+    op.drop_column('notifications', 'date_updated')
+    op.drop_column('notifications', 'count')
+    op.drop_column('notifications', 'group_key')
@@ -0,0 +1,37 @@
+"""add media_deletions table
+
+Revision ID: e5b9c2d47a18
+Revises: d3f8a1c6b527
+Create Date: 2025-11-21 11:02:09.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c2d47a18'
+down_revision: Union[str, Sequence[str], None] = 'd3f8a1c6b527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'media_deletions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('not_before', sa.DateTime(), nullable=False),
+    )
+    op.create_index(op.f('ix_media_deletions_id'), 'media_deletions', ['id'], unique=False)
+    op.create_index(op.f('ix_media_deletions_not_before'), 'media_deletions', ['not_before'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_media_deletions_not_before'), table_name='media_deletions')
+    op.drop_index(op.f('ix_media_deletions_id'), table_name='media_deletions')
+    op.drop_table('media_deletions')
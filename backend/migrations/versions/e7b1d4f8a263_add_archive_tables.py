@@ -0,0 +1,73 @@
+"""add matches_archive, match_members_archive and notifications_archive tables
+
+Revision ID: e7b1d4f8a263
+Revises: d4a9c6e3b815
+Create Date: 2025-11-28 09:52:44.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b1d4f8a263'
+down_revision: Union[str, Sequence[str], None] = 'd4a9c6e3b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'matches_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('product_a_id', sa.Integer(), nullable=True),
+        sa.Column('product_b_id', sa.Integer(), nullable=True),
+        sa.Column('similarity', sa.Float(), nullable=True),
+        sa.Column('buyer_id', sa.Integer(), nullable=True),
+        sa.Column('seller_id', sa.Integer(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        'match_members_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('match_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('role', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_match_members_archive_user_created', 'match_members_archive',
+        ['user_id', sa.text('created_at DESC')], unique=False,
+    )
+    op.create_table(
+        'notifications_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('message', sa.String(length=255), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('date_created', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('group_key', sa.String(length=64), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('date_updated', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_notifications_archive_user_id_id', 'notifications_archive', ['user_id', 'id'], unique=False
+    )
+    # Retention scans on the hot tables
+    op.create_index('ix_matches_timestamp', 'matches', ['timestamp'], unique=False)
+    op.create_index('ix_notifications_date_created', 'notifications', ['date_created'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_date_created', table_name='notifications')
+    op.drop_index('ix_matches_timestamp', table_name='matches')
+    op.drop_index('ix_notifications_archive_user_id_id', table_name='notifications_archive')
+    op.drop_table('notifications_archive')
+    op.drop_index('ix_match_members_archive_user_created', table_name='match_members_archive')
+    op.drop_table('match_members_archive')
+    op.drop_table('matches_archive')
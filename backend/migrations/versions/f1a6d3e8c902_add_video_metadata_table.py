@@ -0,0 +1,34 @@
+"""add video_metadata table
+
+Revision ID: f1a6d3e8c902
+Revises: e5b9c2d47a18
+Create Date: 2025-11-24 09:40:51.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6d3e8c902'
+down_revision: Union[str, Sequence[str], None] = 'e5b9c2d47a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'video_metadata',
+        sa.Column('source_path', sa.String(length=255), primary_key=True),
+        sa.Column('poster_path', sa.String(length=255), nullable=False),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('codec', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('video_metadata')
@@ -0,0 +1,61 @@
+"""add conversations, conversation_participants and messages tables
+
+Revision ID: f2c8a5d7e194
+Revises: e7b1d4f8a263
+Create Date: 2025-11-29 14:07:31.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a5d7e194'
+down_revision: Union[str, Sequence[str], None] = 'e7b1d4f8a263'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'conversations',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('match_id', sa.Integer(), sa.ForeignKey('matches.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_message_id', sa.Integer(), nullable=True),
+        sa.Column('last_message_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('match_id'),
+    )
+    op.create_table(
+        'conversation_participants',
+        sa.Column('conversation_id', sa.Integer(), sa.ForeignKey('conversations.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('unread_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_read_message_id', sa.Integer(), nullable=True),
+        sa.Column('joined_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_conversation_participants_user', 'conversation_participants', ['user_id'], unique=False
+    )
+    op.create_table(
+        'messages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('conversation_id', sa.Integer(), sa.ForeignKey('conversations.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('sender_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_messages_conversation_id_id', 'messages', ['conversation_id', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_conversation_id_id', table_name='messages')
+    op.drop_table('messages')
+    op.drop_index('ix_conversation_participants_user', table_name='conversation_participants')
+    op.drop_table('conversation_participants')
+    op.drop_table('conversations')
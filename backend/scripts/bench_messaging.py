@@ -0,0 +1,176 @@
+# backend/scripts/bench_messaging.py
+"""
+Benchmark for in-app messaging (app/messaging.py, /conversations).
+
+Seeds --conversations two-person conversations (with history) into a
+throwaway tuned SQLite database, or into DATABASE_URL if it is set. Then it
+runs the app in-process with its lifespan, so the realtime hub is live,
+and keeps both participants of every conversation subscribed, as if
+they were online. --concurrency clients then send messages to random
+conversations for --duration seconds. Each sender also reads a history
+page every few sends.
+
+Reports sends/s with p50/p95 latency, history-page latency, how many
+pushes reached subscribers, and the SQL statements per send. The
+statement count should not depend on --conversations or --history,
+since every step is an indexed lookup:
+
+    python scripts/bench_messaging.py
+    python scripts/bench_messaging.py --conversations 5000 --concurrency 100 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _pct(samples, q):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def seed(conversations: int, history: int) -> list:
+    """Two users per conversation, `history` messages in each; returns [(conversation_id, a, b)]."""
+    from sqlalchemy import insert
+    from app import models
+    from app.database import engine
+
+    now = datetime.utcnow()
+    tag = int(time.time())
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"chat-{tag}-{i}", "email": f"chat-{tag}-{i}@example.com",
+             "hashed_password": "x", "is_active": True, "provider": "local"}
+            for i in range(conversations * 2)
+        ])
+        user_ids = [row.id for row in conn.execute(
+            models.User.__table__.select().where(models.User.username.like(f"chat-{tag}-%")).order_by(models.User.id)
+        )]
+        first = conn.execute(insert(models.Conversation).returning(models.Conversation.id), [
+            {"created_at": now} for _ in range(conversations)
+        ]).scalars().all()
+        pairs = [(cid, user_ids[2 * i], user_ids[2 * i + 1]) for i, cid in enumerate(first)]
+        conn.execute(insert(models.ConversationParticipant), [
+            {"conversation_id": cid, "user_id": uid, "unread_count": 0, "joined_at": now}
+            for cid, a, b in pairs for uid in (a, b)
+        ])
+        if history:
+            conn.execute(insert(models.Message), [
+                {"conversation_id": cid, "sender_id": (a, b)[n % 2], "body": f"seeded {n}", "created_at": now}
+                for cid, a, b in pairs for n in range(history)
+            ])
+    return pairs
+
+
+async def _sender(client, pairs, tokens, deadline, send_lat, read_lat, errors, read_every):
+    n = 0
+    while time.perf_counter() < deadline:
+        cid, a, b = random.choice(pairs)
+        sender = random.choice((a, b))
+        headers = tokens[sender]
+        n += 1
+        start = time.perf_counter()
+        r = await client.post(f"/conversations/{cid}/messages", headers=headers, json={"body": f"offer {n}"})
+        if r.status_code != 201:
+            errors.append(r.status_code)
+            continue
+        send_lat.append(time.perf_counter() - start)
+        if n % read_every == 0:
+            start = time.perf_counter()
+            r = await client.get(f"/conversations/{cid}/messages", headers=headers, params={"limit": 50})
+            if r.status_code != 200:
+                errors.append(r.status_code)
+                continue
+            read_lat.append(time.perf_counter() - start)
+
+
+async def _drain(sub, received):
+    while True:
+        await sub.get()
+        received[0] += 1
+
+
+async def run(args) -> None:
+    import httpx
+    from sqlalchemy import event
+    from app.auth import create_access_token
+    from app.database import async_engine
+    from app.main import app
+    from app.realtime import hub
+
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        pairs = seed(args.conversations, args.history)
+        print(f"🌱 Seeded {len(pairs)} conversations x {args.history} messages in {time.perf_counter() - started:.1f}s")
+        tokens = {
+            uid: {"Authorization": f"Bearer {create_access_token({'sub': str(uid)})}"}
+            for _, a, b in pairs for uid in (a, b)
+        }
+        subs = [hub.subscribe(uid) for uid in tokens]
+        received = [0]
+        drains = [asyncio.create_task(_drain(sub, received)) for sub in subs]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # Statements per send, after a warm-up request (user cache, prepared statements)
+            cid, a, _ = pairs[0]
+            await client.post(f"/conversations/{cid}/messages", headers=tokens[a], json={"body": "warm-up"})
+            statements = []
+            record = lambda conn, cursor, statement, *rest: statements.append(statement)
+            event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+            await client.post(f"/conversations/{cid}/messages", headers=tokens[a], json={"body": "counted"})
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+            send_lat, read_lat, errors = [], [], []
+            deadline = time.perf_counter() + args.duration
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                _sender(client, pairs, tokens, deadline, send_lat, read_lat, errors, args.read_every)
+                for _ in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.2)  # let the last after-commit pushes land
+        for task in drains:
+            task.cancel()
+        for sub in subs:
+            hub.unsubscribe(sub)
+
+    sends = len(send_lat)
+    print(f"📨 {sends} sends in {elapsed:.1f}s = {sends / elapsed:.0f}/s "
+          f"(p50 {_pct(send_lat, 0.5):.1f} ms, p95 {_pct(send_lat, 0.95):.1f} ms)")
+    print(f"📜 {len(read_lat)} history pages (p50 {_pct(read_lat, 0.5):.1f} ms, p95 {_pct(read_lat, 0.95):.1f} ms)")
+    print(f"📡 {received[0]} pushes received by {len(subs)} subscribers "
+          f"(expected {2 * (sends + 2)}; resyncs {hub.resyncs})")
+    print(f"🔎 {len(statements)} SQL statements per send")
+    if errors:
+        print(f"⚠️ {len(errors)} errors, e.g. {errors[:5]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and push fan-out of /conversations")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=20, help="seeded messages per conversation")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="concurrent senders")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--read-every", type=int, default=5, help="a history read every N sends")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        tmp = tempfile.mkdtemp()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'messaging.db')}"
+        os.environ.setdefault("UPLOAD_DIR", tmp)
+    os.environ.setdefault("ARCHIVE_INTERVAL_HOURS", "0")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# backend/scripts/bench_password_hashing.py
+"""
+Measure login throughput of the bcrypt process pool.
+
+For each worker count, many threads verify a password at the same time (as
+concurrent login requests would). The script reports logins/sec overall and
+per worker, plus how many requests were shed with 503:
+
+    python scripts/bench_password_hashing.py --workers 1 2 4 --threads 32 --logins 200
+
+Each worker count runs in a fresh interpreter because app.passwords reads
+its settings from the environment at import time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_one(threads: int, logins: int) -> dict:
+    from fastapi import HTTPException
+    from app import passwords
+
+    hashed = passwords.hash_password("correct horse battery staple")
+    passwords.verify_password("warm-up", hashed)  # start every worker process
+
+    shed = 0
+
+    def login(_):
+        nonlocal shed
+        try:
+            passwords.verify_password("correct horse battery staple", hashed)
+        except HTTPException:
+            shed += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    passwords.shutdown()
+    return {"elapsed": elapsed, "shed": shed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt process pool throughput")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=32, help="concurrent login requests")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--max-pending", type=int, default=None, help="default: unbounded for the benchmark")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_one(args.threads, args.logins)))
+        return
+
+    print(f"🔐 bcrypt rounds={args.rounds}, {args.threads} concurrent logins, {args.logins} per run "
+          f"({os.cpu_count()} CPUs)")
+    print(f"{'workers':>8} {'seconds':>9} {'logins/s':>10} {'per worker':>11} {'shed':>6}")
+    for workers in args.workers:
+        env = dict(
+            os.environ,
+            BCRYPT_ROUNDS=str(args.rounds),
+            PASSWORD_HASH_WORKERS=str(workers),
+            PASSWORD_HASH_MAX_PENDING=str(args.max_pending or args.logins + 2),
+        )
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--threads", str(args.threads), "--logins", str(args.logins)],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        done = args.logins - result["shed"]
+        rate = done / result["elapsed"]
+        print(f"{workers:>8} {result['elapsed']:>9.2f} {rate:>10.1f} {rate / workers:>11.1f} {result['shed']:>6}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, BACKEND_DIR)
+    main()
@@ -0,0 +1,146 @@
+# backend/scripts/bench_sqlite_writers.py
+"""
+Concurrency benchmark for SQLite mode (see "SQLITE MODE" in app/database.py).
+
+Writer threads run the app's usual write shape: read a row, update it,
+insert another, commit. Reader threads run a query alongside them. The
+same workload runs against a fresh database file in three modes:
+
+    default    stock driver settings (rollback journal)
+    tuned      the app's pragmas (WAL etc.); a transaction opens at its first
+               write, with BEGIN IMMEDIATE
+    deferred   tuned, but writers open a DEFERRED transaction before the read
+               (what the app did before: fails at once when another writer
+               commits between the read and the write)
+    immediate  tuned, and writers use BEGIN IMMEDIATE like begin_immediate()
+
+The script reports commits/sec, reads/sec, how many transactions failed with
+"database is locked", and how many increments were lost. "default" and
+"tuned" only open a transaction at the first write, so the read-then-update
+isn't isolated (lost increments, but no lock errors):
+
+    python scripts/bench_sqlite_writers.py --writers 1 4 8 --readers 4 --duration 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# app.database builds its engines at import time; keep them off the real database
+os.environ["DATABASE_URL"] = "sqlite://"
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, exc, insert, select, update  # noqa: E402
+from sqlalchemy.pool import QueuePool  # noqa: E402
+
+from app.database import configure_sqlite  # noqa: E402
+
+metadata = MetaData()
+counters = Table("counters", metadata, Column("id", Integer, primary_key=True), Column("value", Integer))
+events = Table(
+    "events", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("counter_id", Integer),
+    Column("payload", String(200)),
+)
+COUNTERS = 16
+
+
+MODES = ("default", "tuned", "deferred", "immediate")
+
+
+def make_engines(path: str, mode: str, pool_size: int):
+    engine = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=pool_size, max_overflow=0)
+    if mode != "default":
+        configure_sqlite(engine)
+    if mode in ("deferred", "immediate"):
+        return engine.execution_options(sqlite_begin=mode.upper()), engine
+    return engine, engine
+
+
+def run(mode: str, writers: int, readers: int, duration: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        writer_engine, reader_engine = make_engines(os.path.join(tmp, "bench.db"), mode, writers + readers)
+        metadata.create_all(reader_engine)
+        with writer_engine.begin() as conn:
+            conn.execute(insert(counters), [{"id": i, "value": 0} for i in range(COUNTERS)])
+
+        stats = {"commits": 0, "locked": 0, "reads": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def write_loop(n: int):
+            commits = locked = 0
+            i = 0
+            while time.perf_counter() < deadline:
+                i += 1
+                counter_id = (n + i) % COUNTERS
+                try:
+                    with writer_engine.begin() as conn:
+                        value = conn.execute(select(counters.c.value).where(counters.c.id == counter_id)).scalar()
+                        conn.execute(update(counters).where(counters.c.id == counter_id).values(value=value + 1))
+                        conn.execute(insert(events).values(counter_id=counter_id, payload=f"writer {n} op {i}"))
+                    commits += 1
+                except exc.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    locked += 1
+            with lock:
+                stats["commits"] += commits
+                stats["locked"] += locked
+
+        def read_loop():
+            reads = 0
+            while time.perf_counter() < deadline:
+                try:
+                    with reader_engine.connect() as conn:
+                        conn.execute(select(events.c.counter_id).order_by(events.c.id.desc()).limit(20)).all()
+                    reads += 1
+                except exc.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+            with lock:
+                stats["reads"] += reads
+
+        threads = [threading.Thread(target=write_loop, args=(n,)) for n in range(writers)]
+        threads += [threading.Thread(target=read_loop) for _ in range(readers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with reader_engine.connect() as conn:
+            total = conn.execute(select(counters.c.value)).scalars().all()
+        reader_engine.dispose()
+
+    return {
+        "commits_per_sec": stats["commits"] / elapsed,
+        "reads_per_sec": stats["reads"] / elapsed,
+        "locked": stats["locked"],
+        "lost_updates": stats["commits"] - sum(total),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite multi-writer benchmark")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="seconds per run")
+    args = parser.parse_args()
+
+    print(f"🗄️ SQLite writers benchmark ({args.readers} readers, {args.duration:.0f}s per run)")
+    print(f"  {'mode':9} {'writers':>7} {'commits/s':>10} {'reads/s':>10} {'locked':>7} {'lost':>6}")
+    for writers in args.writers:
+        for mode in MODES:
+            r = run(mode, writers, args.readers, args.duration)
+            print(f"  {mode:9} {writers:7d} {r['commits_per_sec']:10.1f} "
+                  f"{r['reads_per_sec']:10.1f} {r['locked']:7d} {r['lost_updates']:6d}")
+
+
+if __name__ == "__main__":
+    main()
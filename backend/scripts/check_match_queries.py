@@ -0,0 +1,130 @@
+# backend/scripts/check_match_queries.py
+"""
+Query-count check for GET /matches/my.
+
+Seeds a throwaway SQLite database with a user who has a few matches, then
+with many. Requests the endpoint for each and counts the SQL statements it
+runs. The count must be the same for both and stay within --max-queries.
+If a lazy load creeps back into the match/product serialization path
+(N+1), the count grows with the number of matches and the script exits 1:
+
+    python scripts/check_match_queries.py
+    python scripts/check_match_queries.py --small 3 --large 80 --max-queries 6
+
+tests/test_match_queries.py runs the same check under pytest.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from typing import List, Sequence, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def seed_matches(db, models, owner_id: int, other_id: int, count: int) -> None:
+    for i in range(count):
+        mine = models.Product(
+            name=f"bike {i}", price=1, quantity=1, item_type="have", owner_id=owner_id,
+            image_url=json.dumps([f"/uploads/{i:064x}.jpg"]),
+        )
+        theirs = models.Product(
+            name=f"wanted bike {i}", price=1, quantity=1, item_type="need", owner_id=other_id,
+            video_url=f"/uploads/{i:064x}.mp4",
+        )
+        db.add_all([mine, theirs])
+        db.flush()
+        match = models.Match(product_a_id=mine.id, product_b_id=theirs.id, similarity_score=90)
+        match.members = [
+            models.MatchMember(user_id=owner_id, role="have", created_at=datetime.utcnow()),
+            models.MatchMember(user_id=other_id, role="need", created_at=datetime.utcnow()),
+        ]
+        db.add(match)
+    db.commit()
+
+
+def count_queries(client, engine, headers) -> int:
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = client.get("/matches/my", headers=headers, params={"limit": 100})
+        r.raise_for_status()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements), len(r.json())
+
+
+def query_counts(client, engine, db, models, headers, owner_id: int, other_id: int,
+                 sizes: Sequence[int]) -> List[Tuple[int, int]]:
+    """(queries, matches returned) for /matches/my after seeding up to each of `sizes` matches."""
+    results = []
+    seeded = 0
+    for target in sizes:
+        seed_matches(db, models, owner_id, other_id, target - seeded)
+        seeded = target
+        results.append(count_queries(client, engine, headers))
+    return results
+
+
+def problems(counts: List[Tuple[int, int]], max_queries: int) -> List[str]:
+    found = []
+    queries = [q for q, _ in counts]
+    if len(set(queries)) > 1:
+        found.append(f"Query count grows with the number of matches ({' -> '.join(map(str, queries))})")
+    if max(queries) > max_queries:
+        found.append(f"More than {max_queries} queries")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="N+1 guard for /matches/my")
+    parser.add_argument("--small", type=int, default=2, help="matches in the first run")
+    parser.add_argument("--large", type=int, default=40, help="matches in the second run")
+    parser.add_argument("--max-queries", type=int, default=6)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'matches.db')}"
+    os.environ.setdefault("UPLOAD_DIR", tmp)
+
+    from fastapi.testclient import TestClient
+    from app import models
+    from app.database import SessionLocal, engine
+    from app.main import app
+
+    with TestClient(app) as client:
+        headers = {}
+        for email, name in (("owner@example.com", "owner"), ("other@example.com", "other")):
+            client.post("/auth/register", data={"username": name, "email": email, "password": "check-queries"})
+        token = client.post("/auth/login", data={"email": "owner@example.com", "password": "check-queries"})
+        headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+        db = SessionLocal()
+        owner_id = db.query(models.User.id).filter(models.User.email == "owner@example.com").scalar()
+        other_id = db.query(models.User.id).filter(models.User.email == "other@example.com").scalar()
+        client.get("/matches/my", headers=headers)  # warm the user cache
+
+        counts = query_counts(client, engine, db, models, headers, owner_id, other_id, (args.small, args.large))
+        db.close()
+    for queries, returned in counts:
+        print(f"🔎 /matches/my with {returned:3d} matches: {queries} queries")
+
+    found = problems(counts, args.max_queries)
+    for problem in found:
+        print(f"❌ {problem}")
+    if not found:
+        print("✅ Constant query count")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
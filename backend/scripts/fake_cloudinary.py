@@ -0,0 +1,89 @@
+# backend/scripts/fake_cloudinary.py
+"""
+Local stand-in for the Cloudinary upload API.
+
+Accepts POST /v1_1/<cloud>/<resource_type>/upload and answers with a
+Cloudinary-shaped JSON body, so the concurrent upload path can be exercised
+without network access:
+
+    python scripts/fake_cloudinary.py --port 8090 --latency 0.3 --fail-rate 0.2
+    UPLOAD_MODE=cloudinary CLOUDINARY_CLOUD_NAME=demo CLOUDINARY_API_KEY=k \\
+    CLOUDINARY_API_SECRET=s CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:8090 \\
+        uvicorn app.main:app
+
+Connections are kept alive (HTTP/1.1), and every response includes the
+number of requests served on that connection, so connection reuse is
+visible in the logs.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCloudinaryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    fail_rate = 0.0
+    lock = threading.Lock()
+    total_requests = 0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        body = self.rfile.read(length)
+        self.requests_on_connection = getattr(self, "requests_on_connection", 0) + 1
+        with self.lock:
+            FakeCloudinaryHandler.total_requests += 1
+
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 4 or parts[0] != "v1_1" or parts[3] != "upload":
+            return self._reply(404, {"error": {"message": "Not found"}})
+
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            return self._reply(500, {"error": {"message": "Simulated server error"}})
+
+        cloud, resource_type = parts[1], parts[2]
+        public_id = uuid.uuid4().hex
+        fmt = "mp4" if resource_type == "video" else "jpg"
+        self._reply(200, {
+            "public_id": public_id,
+            "resource_type": "video" if resource_type == "video" else "image",
+            "bytes": len(body),
+            "secure_url": f"https://res.cloudinary.com/{cloud}/{resource_type}/upload/{public_id}.{fmt}",
+            "requests_on_connection": self.requests_on_connection,
+        })
+
+    def _reply(self, code: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        print(f"[fake-cloudinary] conn#{id(self.connection) % 10000} req={getattr(self, 'requests_on_connection', 0)} "
+              + fmt % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait per upload")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of uploads answered with 500")
+    args = parser.parse_args()
+
+    FakeCloudinaryHandler.latency = args.latency
+    FakeCloudinaryHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer((args.host, args.port), FakeCloudinaryHandler)
+    print(f"☁️  Fake Cloudinary listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
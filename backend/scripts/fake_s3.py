@@ -0,0 +1,163 @@
+# backend/scripts/fake_s3.py
+"""
+Local stand-in for an S3-compatible object store (MinIO-style, path-style URLs).
+
+Implements the calls the S3 storage backend makes (PUT/GET/HEAD/DELETE
+object, ListObjectsV2, and multipart uploads for large videos), keeping
+objects in memory, so STORAGE_BACKEND=s3 can be exercised without network
+access:
+
+    python scripts/fake_s3.py --port 9000
+    STORAGE_BACKEND=s3 S3_BUCKET=media S3_ENDPOINT_URL=http://127.0.0.1:9000 \\
+    S3_ACCESS_KEY_ID=k S3_SECRET_ACCESS_KEY=s uvicorn app.main:app
+
+Request signatures are not checked, and buckets are created on first write.
+"""
+import argparse
+import hashlib
+import re
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    objects = {}      # (bucket, key) -> (body, content_type, mtime)
+    multipart = {}    # upload_id -> {part_number: body}
+
+    # ------------------------------------------------------------
+    def _target(self):
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip("/").partition("/")
+        return unquote(bucket), unquote(key), parse_qs(parts.query, keep_blank_values=True)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", "0")))
+
+    def _reply(self, code: int, body: bytes = b"", headers=None, content_type="application/xml"):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body or code not in (204, 304):
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _not_found(self):
+        self._reply(404, b"<Error><Code>NoSuchKey</Code><Message>Not found</Message></Error>")
+
+    # ------------------------------------------------------------
+    def do_PUT(self):
+        bucket, key, query = self._target()
+        body = self._body()
+        if not key:
+            return self._reply(200)  # CreateBucket
+        if "uploadId" in query:
+            with self.lock:
+                self.multipart[query["uploadId"][0]][int(query["partNumber"][0])] = body
+            return self._reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        with self.lock:
+            self.objects[(bucket, key)] = (body, self.headers.get("Content-Type", "binary/octet-stream"), time.time())
+        self._reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    def do_POST(self):
+        bucket, key, query = self._target()
+        self._body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with self.lock:
+                self.multipart[upload_id] = {}
+            xml = (f"<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                   f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+            return self._reply(200, xml.encode())
+        if "uploadId" in query:
+            with self.lock:
+                parts = self.multipart.pop(query["uploadId"][0])
+                body = b"".join(parts[n] for n in sorted(parts))
+                self.objects[(bucket, key)] = (body, "binary/octet-stream", time.time())
+            xml = (f"<CompleteMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                   f"<ETag>\"{hashlib.md5(body).hexdigest()}-{len(parts)}\"</ETag></CompleteMultipartUploadResult>")
+            return self._reply(200, xml.encode())
+        self._reply(400, b"<Error><Code>InvalidRequest</Code></Error>")
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        bucket, key, query = self._target()
+        if not key:
+            return self._list(bucket, query)
+        with self.lock:
+            found = self.objects.get((bucket, key))
+        if found is None:
+            return self._not_found()
+        body, content_type, mtime = found
+        headers = {
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            "Last-Modified": formatdate(mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+        }
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(body) - 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return self._reply(206, body[start:end + 1], headers, content_type)
+        self._reply(200, body, headers, content_type)
+
+    def do_DELETE(self):
+        bucket, key, query = self._target()
+        with self.lock:
+            if "uploadId" in query:
+                self.multipart.pop(query["uploadId"][0], None)
+            else:
+                self.objects.pop((bucket, key), None)
+        self._reply(204)
+
+    def _list(self, bucket: str, query):
+        prefix = query.get("prefix", [""])[0]
+        max_keys = int(query.get("max-keys", ["1000"])[0])
+        after = query.get("continuation-token", query.get("start-after", [""]))[0]
+        with self.lock:
+            keys = sorted(k for (b, k) in self.objects if b == bucket and k.startswith(prefix) and k > after)
+            page = [(k, self.objects[(bucket, k)]) for k in keys[:max_keys]]
+        truncated = len(keys) > max_keys
+        contents = "".join(
+            f"<Contents><Key>{escape(k)}</Key>"
+            f"<LastModified>{time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(mtime))}</LastModified>"
+            f"<ETag>\"{hashlib.md5(body).hexdigest()}\"</ETag><Size>{len(body)}</Size>"
+            f"<StorageClass>STANDARD</StorageClass></Contents>"
+            for k, (body, _, mtime) in page
+        )
+        token = f"<NextContinuationToken>{escape(page[-1][0])}</NextContinuationToken>" if truncated else ""
+        xml = (f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult>'
+               f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+               f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+               f"{token}{contents}</ListBucketResult>")
+        self._reply(200, xml.encode())
+
+    def log_message(self, fmt, *args):
+        print("[fake-s3] " + fmt % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeS3Handler)
+    print(f"🪣 Fake S3 listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
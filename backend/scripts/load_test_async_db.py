@@ -0,0 +1,112 @@
+# backend/scripts/load_test_async_db.py
+"""
+Load test for the async product handlers.
+
+Sends concurrent `PUT /products/{id}` updates, which run on the async engine,
+to a running API. Meanwhile a probe requests `GET /` every few
+milliseconds. The probe route does no work, so its latency shows how long
+the event loop is blocked. A handler that makes synchronous database calls
+stalls the probe and every other request on that worker:
+
+    uvicorn app.main:app --port 8000            # in another shell
+    python scripts/load_test_async_db.py --url http://127.0.0.1:8000 -c 50 -d 20
+
+Run it once on this tree and once on a checkout from before the async port
+(same database, same settings) to compare update throughput and probe latency.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def _pct(samples, q):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+async def _login(client: httpx.AsyncClient) -> dict:
+    email = f"load-{uuid.uuid4().hex[:8]}@example.com"
+    await client.post("/auth/register", data={"username": email.split("@")[0], "email": email, "password": "load-test"})
+    r = await client.post("/auth/login", data={"email": email, "password": "load-test"})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _updater(client, headers, product_id, deadline, latencies, errors):
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        start = time.perf_counter()
+        try:
+            r = await client.put(f"/products/{product_id}", headers=headers, data={"description": f"rev {n}"})
+            if r.status_code != 200:
+                errors.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def _probe(client, deadline, latencies, interval):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def run(url: str, concurrency: int, duration: float, products: int, interval: float):
+    limits = httpx.Limits(max_connections=concurrency + 5, max_keepalive_connections=concurrency + 5)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        headers = await _login(client)
+        product_ids = []
+        for i in range(products):
+            r = await client.post("/products/", headers=headers, data={"name": f"load test {i}", "price": "1"})
+            r.raise_for_status()
+            product_ids.append(r.json()["id"])
+
+        update_latencies, probe_latencies, errors = [], [], []
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            _probe(client, deadline, probe_latencies, interval),
+            *(
+                _updater(client, headers, product_ids[i % len(product_ids)], deadline, update_latencies, errors)
+                for i in range(concurrency)
+            ),
+        )
+        elapsed = time.perf_counter() - started
+
+        for product_id in product_ids:
+            await client.delete(f"/products/{product_id}", headers=headers)
+
+    print(f"🔧 {concurrency} concurrent updaters for {elapsed:.1f}s against {url}")
+    print(f"  updates : {len(update_latencies) / elapsed:8.1f} req/s   "
+          f"p50 {_pct(update_latencies, 0.5):7.1f} ms   p99 {_pct(update_latencies, 0.99):7.1f} ms   "
+          f"errors {len(errors)}")
+    print(f"  GET /   : {len(probe_latencies):8d} probes  "
+          f"p50 {_pct(probe_latencies, 0.5):7.1f} ms   p99 {_pct(probe_latencies, 0.99):7.1f} ms   "
+          f"max {max(probe_latencies, default=0) * 1000:7.1f} ms   "
+          f"mean {statistics.fmean(probe_latencies) * 1000 if probe_latencies else float('nan'):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="async DB handler load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-d", "--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--products", type=int, default=10, help="products to spread updates over")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="seconds between GET / probes")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.duration, args.products, args.probe_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# backend/scripts/sqlite_replica.py
+"""
+Poor man's read replica for local testing of app/db_routing.py.
+
+Copies a SQLite primary into a second database file every --interval
+seconds, using SQLite's online backup API so each copy is a consistent
+snapshot. Each copy is delayed by --lag seconds to imitate replication lag:
+
+    python scripts/sqlite_replica.py --primary primary.db --replica replica.db --lag 2
+    DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URLS=sqlite:///replica.db \\
+        uvicorn app.main:app
+
+/internal/metrics (with INTERNAL_METRICS_TOKEN set) shows how many reads each replica served.
+"""
+import argparse
+import sqlite3
+import time
+
+
+def copy_database(source: str, target: str) -> None:
+    """Overwrite `target` in place (open readers see the new contents)."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a lagging SQLite copy of a database")
+    parser.add_argument("--primary", required=True)
+    parser.add_argument("--replica", required=True)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between copies")
+    parser.add_argument("--lag", type=float, default=0.0, help="extra delay before each copy is published")
+    args = parser.parse_args()
+
+    print(f"🪞 Replicating {args.primary} -> {args.replica} every {args.interval}s (lag {args.lag}s)")
+    while True:
+        started = time.monotonic()
+        staged = f"{args.replica}.staged"
+        copy_database(args.primary, staged)
+        time.sleep(args.lag)
+        copy_database(staged, args.replica)
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# backend/tests/conftest.py
+"""
+Shared fixtures. The app builds its engines and reads its settings at import
+time, so the environment is pointed at a throwaway database and upload
+directory before anything from `app` is imported.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_TMP = tempfile.mkdtemp(prefix="makeitwhole-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP, "uploads")
+os.environ["UPLOAD_MODE"] = "local"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["REALTIME_BACKEND"] = "local"
+os.environ["ARCHIVE_INTERVAL_HOURS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db(client):
+    """A session on the test database (the app's startup has created the tables)."""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def login(client):
+    """Register a fresh user; returns (user_id, headers, tokens)."""
+    def _login(name: str = "user"):
+        email = f"{name}-{uuid.uuid4().hex[:8]}@example.com"
+        r = client.post("/auth/register", data={"username": email.split("@")[0], "email": email, "password": "secret1"})
+        assert r.status_code == 200, r.text
+        tokens = client.post("/auth/login", data={"email": email, "password": "secret1"}).json()
+        return tokens["user"]["id"], {"Authorization": f"Bearer {tokens['access_token']}"}, tokens
+    return _login
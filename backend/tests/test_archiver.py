@@ -0,0 +1,102 @@
+# backend/tests/test_archiver.py
+from datetime import datetime, timedelta, timezone
+
+from app import archiver, models, notifications
+
+from tests.test_messaging import make_match
+
+
+def age(db, model, row_id: int, column: str, days: int) -> None:
+    """Backdate a row, written in the form the column stores (naive UTC unless timezone=True)."""
+    moment = datetime.now(timezone.utc) - timedelta(days=days)
+    if not getattr(model, column).type.timezone:
+        moment = moment.replace(tzinfo=None)
+    db.query(model).filter(model.id == row_id).update({column: moment})
+    db.commit()
+
+
+def test_old_notifications_move_to_the_archive_and_leave_the_counter(client, db, login):
+    user_id, headers, _ = login()
+    old, new = notifications.notify(db, [
+        models.Notification(user_id=user_id, message="old news"),
+        models.Notification(user_id=user_id, message="fresh news"),
+    ])
+    old_id, new_id = old.id, new.id
+    db.commit()
+    age(db, models.Notification, old_id, "date_created", 40)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+    assert archiver.archive_notifications(db, cutoff) == 1
+
+    assert db.get(models.Notification, old_id) is None
+    assert db.get(models.Notification, new_id) is not None
+    archived = db.get(models.NotificationArchive, old_id)
+    assert archived.message == "old news" and archived.archived_at is not None
+    assert notifications.unread_count(db, user_id) == 1
+
+
+def test_old_matches_move_with_their_members(client, db, login):
+    a_id, _, _ = login("a")
+    b_id, _, _ = login("b")
+    old_id = make_match(db, a_id, b_id)
+    new_id = make_match(db, a_id, b_id)
+    age(db, models.Match, old_id, "date_matched", 400)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=365)
+    assert archiver.archive_matches(db, cutoff) == 1
+
+    assert db.get(models.Match, old_id) is None and db.get(models.Match, new_id) is not None
+    assert db.get(models.MatchArchive, old_id) is not None
+    members = db.query(models.MatchMemberArchive).filter(models.MatchMemberArchive.match_id == old_id).all()
+    assert sorted(m.user_id for m in members) == sorted([a_id, b_id])
+
+
+def test_cutoffs_are_converted_to_what_each_column_stores():
+    aware = datetime(2026, 1, 1, 12, 0, tzinfo=timezone(timedelta(hours=3)))
+    # Naive UTC for plain DateTime columns
+    assert archiver._as_stored(models.Match.date_matched, aware) == datetime(2026, 1, 1, 9, 0)
+    # Aware for DateTime(timezone=True)
+    stored = archiver._as_stored(models.Notification.date_created, aware)
+    assert stored == aware and stored.tzinfo == timezone.utc
+    # A naive cutoff is taken as UTC
+    assert archiver._as_stored(models.Notification.date_created, datetime(2026, 1, 1, 9, 0)) == aware
+
+
+def test_ids_are_not_reused_after_archiving_everything(client, db, login):
+    user_id, _, _ = login()
+    a_id, _, _ = login("a")
+    everything = datetime.now(timezone.utc) + timedelta(days=1)
+    for _ in range(2):
+        notifications.notify(db, [models.Notification(user_id=user_id, message="news")])
+        make_match(db, user_id, a_id)
+        db.commit()
+        # A second pass over new rows must not collide with the first one's
+        archiver.archive_notifications(db, everything)
+        archiver.archive_matches(db, everything)
+
+    assert db.query(models.Notification).count() == 0 and db.query(models.Match).count() == 0
+    archived = [row.id for row in db.query(models.NotificationArchive.id)]
+    assert len(archived) == len(set(archived))
+    archived = [row.id for row in db.query(models.MatchArchive.id)]
+    assert len(archived) == len(set(archived))
+
+
+def test_archived_matches_are_not_recreated_on_update(client, db, login):
+    a_id, a, _ = login("a")
+    b_id, _, _ = login("b")
+    match_id = make_match(db, a_id, b_id)
+    match = db.get(models.Match, match_id)
+    have_id, need_id = match.product_a_id, match.product_b_id
+    for product_id in (have_id, need_id):  # similar enough to match again
+        db.get(models.Product, product_id).description = "archived pair, kid's bike"
+    db.commit()
+    age(db, models.Match, match_id, "date_matched", 400)
+    assert archiver.archive_matches(db, datetime.now(timezone.utc) - timedelta(days=365)) == 1
+    before = db.query(models.Notification).filter(models.Notification.user_id == a_id).count()
+
+    from app.routes.match import find_and_store_matches
+    find_and_store_matches(db, db.get(models.Product, have_id))
+
+    pair = {have_id, need_id}
+    assert not [m for m in db.query(models.Match).all() if {m.product_a_id, m.product_b_id} == pair]
+    assert db.query(models.Notification).filter(models.Notification.user_id == a_id).count() == before
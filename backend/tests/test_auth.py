@@ -0,0 +1,130 @@
+# backend/tests/test_auth.py
+from datetime import timedelta
+
+from app import models
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/auth/refresh", headers={"Authorization": f"Bearer {refresh_token}"})
+
+
+def test_refresh_rotates_the_token(client, login):
+    _, _, tokens = login()
+    r = refresh(client, tokens["refresh_token"])
+    assert r.status_code == 200
+    rotated = r.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {rotated['access_token']}"}).status_code == 200
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+
+def test_concurrent_refresh_gets_the_same_successor(client, login):
+    _, _, tokens = login()
+    first = refresh(client, tokens["refresh_token"]).json()
+    retry = refresh(client, tokens["refresh_token"])
+    assert retry.status_code == 200
+    assert retry.json()["refresh_token"] == first["refresh_token"]
+    # Either tab carries on with it
+    assert refresh(client, first["refresh_token"]).status_code == 200
+
+
+def test_reuse_after_grace_window_revokes_family(client, db, login):
+    user_id, _, tokens = login()
+    successor = refresh(client, tokens["refresh_token"]).json()["refresh_token"]
+    for row in db.query(models.RevokedToken).filter(models.RevokedToken.user_id == user_id):
+        row.revoked_at -= timedelta(minutes=5)
+    db.commit()
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    assert refresh(client, successor).status_code == 401
+
+
+def test_reuse_after_successor_was_used_revokes_family(client, login):
+    _, _, tokens = login()
+    successor = refresh(client, tokens["refresh_token"]).json()["refresh_token"]
+    latest = refresh(client, successor).json()["refresh_token"]
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    assert refresh(client, latest).status_code == 401
+
+
+def test_logout_revokes_the_family(client, login):
+    _, _, tokens = login()
+    successor = refresh(client, tokens["refresh_token"]).json()["refresh_token"]
+    client.post("/auth/logout", headers={"Authorization": f"Bearer {successor}"})
+    assert refresh(client, successor).status_code == 401
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_only_access_tokens_are_cached_and_not_past_their_lifetime(client, login, monkeypatch):
+    from app import auth
+
+    _, _, tokens = login()
+    cached = []
+    monkeypatch.setattr(auth.token_cache, "set", lambda key, value, ttl=None: cached.append((value, ttl)))
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 200
+    assert cached == []
+
+    long_lived = auth.create_access_token({"sub": "1"}, expires_delta=timedelta(days=7))
+    auth.verify_token(long_lived, auth.SECRET_KEY, "invalid")
+    (payload, ttl), = cached
+    assert payload["sub"] == "1"
+    assert ttl <= auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+def test_logins_beyond_the_pending_cap_are_shed(client, login, monkeypatch):
+    import threading
+    from app import passwords
+
+    _, _, tokens = login()
+    full = threading.BoundedSemaphore(1)
+    full.acquire()  # every slot taken by logins still hashing
+    monkeypatch.setattr(passwords, "_pending", full)
+    r = client.post("/auth/login", data={"email": tokens["user"]["email"], "password": "secret1"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_a_password_with_another_cost(client, db, login):
+    from app import passwords
+
+    user_id, _, tokens = login()
+    old_hash = passwords.pwd_context.hash("secret1", rounds=5)
+    db.get(models.User, user_id).hashed_password = old_hash
+    db.commit()
+
+    r = client.post("/auth/login", data={"email": tokens["user"]["email"], "password": "secret1"})
+    assert r.status_code == 200
+    db.expire_all()
+    new_hash = db.get(models.User, user_id).hashed_password
+    assert new_hash != old_hash and new_hash.startswith("$2b$04$")
+    # The upgraded hash still signs in; a wrong password still doesn't
+    assert client.post("/auth/login", data={"email": tokens["user"]["email"], "password": "secret1"}).status_code == 200
+    assert client.post("/auth/login", data={"email": tokens["user"]["email"], "password": "nope"}).status_code == 401
+
+
+def test_rebuilding_the_revocation_filter_keeps_the_callers_transaction(db):
+    from datetime import datetime
+
+    from app.database import begin_immediate
+    from app.revocation import RevocationList
+
+    now = datetime.utcnow()
+    db.add(models.RevokedToken(jti="expired-jti", reason="logout", expires_at=now - timedelta(days=1)))
+    db.commit()
+    revocations = RevocationList(capacity=4, fp_rate=0.01, sync_seconds=0)
+
+    begin_immediate(db)
+    db.add(models.RevokedToken(jti="pending-jti", reason="rotated", expires_at=now + timedelta(days=1)))
+    db.flush()
+    # Never loaded in this process: the check rebuilds the filter first
+    assert not revocations.is_revoked(db, "expired-jti")
+    assert db.in_transaction()
+    db.rollback()
+    assert db.query(models.RevokedToken).filter(models.RevokedToken.jti == "pending-jti").count() == 0
+
+    # Startup purges expired rows; sync only skips them
+    assert db.query(models.RevokedToken).filter(models.RevokedToken.jti == "expired-jti").count() == 1
+    revocations.rebuild(db)
+    assert db.query(models.RevokedToken).filter(models.RevokedToken.jti == "expired-jti").count() == 0
@@ -0,0 +1,84 @@
+# backend/tests/test_database.py
+import threading
+import time
+
+import pytest
+
+from app import models
+from app.database import SessionLocal, begin_immediate
+
+
+def test_begin_immediate_refuses_an_open_transaction(db):
+    db.query(models.User.id).first()
+    with pytest.raises(RuntimeError):
+        begin_immediate(db)
+    db.rollback()
+
+    begin_immediate(db)
+    assert db.in_transaction()
+    db.rollback()
+
+
+def _rename(session, user_id: int, name: str) -> None:
+    session.query(models.User).filter(models.User.id == user_id).update({"full_name": name})
+
+
+def test_read_then_write_survives_a_commit_in_between(db, login):
+    user_id, _, _ = login()
+    a, b = SessionLocal(), SessionLocal()
+    try:
+        assert a.get(models.User, user_id) is not None  # A reads...
+        b.get(models.User, user_id)
+        _rename(b, user_id, "from b")                   # ...B reads, writes and commits...
+        b.commit()
+        _rename(a, user_id, "from a")                   # ...and A's write still goes through
+        a.commit()
+    finally:
+        a.close()
+        b.close()
+    db.expire_all()
+    assert db.get(models.User, user_id).full_name == "from a"
+
+
+def test_read_then_write_waits_for_the_write_lock(db, login):
+    user_id, _, _ = login()
+    holder = SessionLocal()
+    begin_immediate(holder)
+    _rename(holder, user_id, "holder")
+    errors = []
+
+    def read_then_write():
+        session = SessionLocal()
+        try:
+            session.get(models.User, user_id)
+            _rename(session, user_id, "waiter")
+            session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    thread = threading.Thread(target=read_then_write)
+    thread.start()
+    time.sleep(0.3)
+    assert thread.is_alive()  # queued behind the lock, not failed
+    holder.commit()
+    holder.close()
+    thread.join(5)
+
+    assert errors == []
+    db.expire_all()
+    assert db.get(models.User, user_id).full_name == "waiter"
+
+
+def test_savepoint_first_write_stays_in_the_transaction(db, login):
+    user_id, _, _ = login()
+    session = SessionLocal()
+    try:
+        with session.begin_nested():
+            _rename(session, user_id, "nested")
+        session.rollback()  # RELEASE must not have committed it
+    finally:
+        session.close()
+    db.expire_all()
+    assert db.get(models.User, user_id).full_name != "nested"
@@ -0,0 +1,109 @@
+# backend/tests/test_db_routing.py
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import create_engine, update
+
+from app import db_routing, models
+from app.database import engine as primary_engine
+from app.db_routing import ReadSessionLocal, ReplicaSet
+
+
+@pytest.fixture
+def replica_of(tmp_path, monkeypatch):
+    """Snapshot copies of the primary as replicas: they miss anything written afterwards."""
+    monkeypatch.setattr(ReplicaSet, "_ensure_checker", lambda self: None)
+    engines = []
+
+    def snapshot(name: str = "replica"):
+        path = tmp_path / f"{name}.db"
+        src, dst = sqlite3.connect(primary_engine.url.database), sqlite3.connect(path)
+        src.backup(dst)
+        src.close(), dst.close()
+        engines.append(create_engine(f"sqlite:///{path}"))
+        return engines[-1]
+
+    yield snapshot
+    for replica in engines:
+        replica.dispose()
+
+
+def use_replicas(monkeypatch, engines, cooldown: float = 30) -> ReplicaSet:
+    replica_set = ReplicaSet(engines, cooldown)
+    monkeypatch.setattr(db_routing, "replicas", replica_set)
+    monkeypatch.setattr(db_routing, "recent_writers", db_routing.TTLCache("replica_sticky_test", 100, 30))
+    return replica_set
+
+
+def product(db, owner_id: int, name: str) -> int:
+    row = models.Product(name=name, price=1, quantity=1, owner_id=owner_id)
+    db.add(row)
+    db.commit()
+    return row.id
+
+
+def test_reads_use_a_replica_until_the_session_writes(db, login, replica_of, monkeypatch):
+    user_id, _, _ = login()
+    use_replicas(monkeypatch, [replica_of()])
+    fresh = product(db, user_id, "written after the snapshot")
+
+    session = ReadSessionLocal()
+    try:
+        assert session.get(models.Product, fresh) is None  # the replica hasn't got it
+        session.execute(update(models.Product).where(models.Product.id == fresh).values(quantity=2))
+        # From the first write on, the session stays on the primary
+        assert session.get(models.Product, fresh).quantity == 2
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_replicas_are_used_round_robin_and_skipped_while_down(replica_of, monkeypatch):
+    a, b = replica_of("a"), replica_of("b")
+    replica_set = use_replicas(monkeypatch, [a, b], cooldown=0.2)
+    assert {replica_set.choose(), replica_set.choose()} == {a, b}
+
+    replica_set.mark_down(0, "test")
+    assert [replica_set.choose() for _ in range(3)] == [b, b, b]
+    replica_set.mark_down(1, "test")
+    assert replica_set.choose() is None  # the caller falls back to the primary
+    assert replica_set.primary_fallbacks == 1
+
+    # Back in rotation once the cooldown is over
+    time.sleep(0.25)
+    assert {replica_set.choose(), replica_set.choose()} == {a, b}
+    assert [r["reads_routed"] for r in replica_set.stats()["replicas"]] == [2, 5]
+
+
+def test_a_replica_that_fails_to_connect_sits_out_the_cooldown(tmp_path, replica_of, monkeypatch):
+    broken = create_engine(f"sqlite:///{tmp_path}/missing-dir/replica.db")
+    good = replica_of()
+    replica_set = use_replicas(monkeypatch, [broken, good])
+
+    with pytest.raises(Exception):
+        broken.connect()
+    assert not replica_set.is_up(0)
+    assert [replica_set.choose() for _ in range(3)] == [good, good, good]
+
+    # A health check on a still-broken replica keeps it out
+    replica_set.check(0)
+    assert not replica_set.is_up(0)
+    broken.dispose()
+
+
+def test_a_user_reads_their_own_writes_from_the_primary(client, login, replica_of, monkeypatch):
+    _, headers, _ = login("writer")
+    _, other, _ = login("reader")
+    use_replicas(monkeypatch, [replica_of()])
+
+    r = client.post("/products/", headers=headers, data={"name": "fresh teapot", "price": "1"})
+    product_id = r.json()["id"]
+    assert client.get(f"/products/{product_id}", headers=headers).status_code == 200
+    # Everyone else reads the (lagging) replica
+    assert client.get(f"/products/{product_id}", headers=other).status_code == 404
+    assert client.get(f"/products/{product_id}").status_code == 404
+
+    # Stickiness expires
+    db_routing.recent_writers.clear()
+    assert client.get(f"/products/{product_id}", headers=headers).status_code == 404
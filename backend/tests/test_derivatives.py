@@ -0,0 +1,103 @@
+# backend/tests/test_derivatives.py
+import io
+import json
+import os
+import uuid
+
+import pytest
+from PIL import Image
+
+from app import derivatives, models
+from app.config import UPLOAD_DIR
+from app.routes import products
+from app.storage import get_storage
+
+
+@pytest.fixture(autouse=True)
+def no_background_work(monkeypatch):
+    monkeypatch.setattr(products, "schedule_derivatives", lambda rels: None)
+    monkeypatch.setattr(products, "schedule_video_metadata", lambda urls: None)
+
+
+def png(size=(800, 400)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, tuple(uuid.uuid4().bytes[:3])).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def part_files() -> list:
+    return [name for name in os.listdir(UPLOAD_DIR) if name.endswith(".part")]
+
+
+def create(client, headers, image: bytes) -> dict:
+    r = client.post("/products/", headers=headers, data={"name": "poster frame", "price": "1"},
+                    files=[("image_files", ("a.png", image))])
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def stored_rel(db, product_id: int) -> str:
+    return json.loads(db.get(models.Product, product_id).image_url)[0]
+
+
+def variants_of(db, rel: str) -> list:
+    db.expire_all()
+    return db.query(models.MediaVariant).filter(models.MediaVariant.source_path == rel).all()
+
+
+def test_variants_are_written_and_recorded_for_each_width(client, db, login):
+    _, headers, _ = login()
+    rel = stored_rel(db, create(client, headers, png())["id"])
+
+    derivatives.generate_derivatives(rel)
+    variants = variants_of(db, rel)
+    assert sorted({v.width for v in variants}) == [320, 640, 800]  # 1280 is capped at the original width
+    assert {v.format for v in variants} == set(derivatives._enabled_formats())
+    for v in variants:
+        assert get_storage().exists(v.path.split("/uploads/")[-1])
+
+
+def test_existing_variant_files_are_kept_not_rewritten(client, db, login):
+    _, headers, _ = login()
+    rel = stored_rel(db, create(client, headers, png())["id"])
+    derivatives.generate_derivatives(rel)
+    first = variants_of(db, rel)
+    path = get_storage().path(first[0].path.split("/uploads/")[-1])
+    before = os.stat(path)
+
+    derivatives.generate_derivatives(rel)
+    after = os.stat(path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    # Rows are replaced, not duplicated
+    assert len(variants_of(db, rel)) == len(first)
+
+
+def test_failed_encoding_leaves_no_scratch_file(client, db, login, monkeypatch):
+    _, headers, _ = login()
+    rel = stored_rel(db, create(client, headers, png())["id"])
+
+    def broken_save(self, fp, *args, **kwargs):
+        open(fp, "wb").write(b"half an image")
+        raise OSError("encoder crashed")
+
+    monkeypatch.setattr(Image.Image, "save", broken_save)
+    with pytest.raises(OSError):
+        derivatives.generate_derivatives(rel)
+    assert part_files() == []
+
+
+def test_write_responses_carry_srcsets(client, db, login):
+    _, headers, _ = login()
+    image = png()
+    first = create(client, headers, image)
+    derivatives.generate_derivatives(stored_rel(db, first["id"]))
+
+    # Same content again: deduplicated onto the processed blob
+    created = create(client, headers, image)
+    assert "image/webp" in created["image_srcset"][0]
+
+    r = client.put(f"/products/{first['id']}", headers=headers, data={"name": "renamed"})
+    assert r.status_code == 200, r.text
+    assert r.json()["name"] == "renamed"
+    assert "image/webp" in r.json()["image_srcset"][0]
+    assert r.json()["video_meta"] is None
@@ -0,0 +1,37 @@
+# backend/tests/test_import_time.py
+"""The startup budget of scripts/check_import_time.py, enforced in CI."""
+import os
+
+from scripts import check_import_time
+
+
+def test_import_stays_within_budget_and_lazy():
+    budget_ms = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+    # DATABASE_URL points at a closed port: an import that connects fails here
+    runs = [check_import_time.import_once(check_import_time.UNREACHABLE_DB) for _ in range(3)]
+    assert check_import_time.problems(runs, budget_ms) == []
+
+
+def test_problems_flags_eager_modules_and_overruns():
+    runs = [{"total_ms": 900.0, "modules": ["app", "boto3"]}, {"total_ms": 2000.0, "modules": []}]
+    found = check_import_time.problems(runs + [{"total_ms": 1800.0, "modules": []}], 1500)
+    assert found == ["Imported at startup but should load lazily: boto3", "Over budget by 300 ms"]
+
+
+def test_postgres_drivers_load_only_for_a_postgres_database():
+    assert check_import_time.drivers_for(check_import_time.SQLITE_DB) == []
+
+
+def test_import_does_not_touch_the_upload_directory(tmp_path):
+    import subprocess
+    import sys
+
+    upload_dir = tmp_path / "uploads"
+    env = dict(os.environ, DATABASE_URL=check_import_time.SQLITE_DB, UPLOAD_DIR=str(upload_dir))
+    proc = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=check_import_time.BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert not upload_dir.exists()
+    assert "Serving uploads" not in proc.stdout
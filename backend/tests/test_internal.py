@@ -0,0 +1,17 @@
+# backend/tests/test_internal.py
+from app.routes import internal
+
+
+def test_metrics_are_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(internal, "INTERNAL_METRICS_TOKEN", "")
+    assert client.get("/internal/metrics").status_code == 404
+    assert client.get("/internal/metrics", headers={"X-Metrics-Token": ""}).status_code == 404
+
+
+def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(internal, "INTERNAL_METRICS_TOKEN", "s3cret")
+    assert client.get("/internal/metrics").status_code == 403
+    assert client.get("/internal/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 403
+    r = client.get("/internal/metrics", headers={"X-Metrics-Token": "s3cret"})
+    assert r.status_code == 200
+    assert {"caches", "db_pools", "realtime"} <= r.json().keys()
@@ -0,0 +1,138 @@
+# backend/tests/test_match_members.py
+import importlib.util
+import pathlib
+from datetime import datetime
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, inspect, text
+
+from app import models
+from app.database import Base
+
+MIGRATION = pathlib.Path(__file__).resolve().parent.parent / "migrations/versions/3c9e7b2f4d61_add_match_members_table.py"
+
+
+def listing(db, owner_id: int, item_type: str, name: str) -> models.Product:
+    product = models.Product(
+        name=name, description=name, category="music",
+        price=1, quantity=1, item_type=item_type, owner_id=owner_id,
+    )
+    db.add(product)
+    db.commit()
+    return product
+
+
+def members_of(db, match_id: int) -> list:
+    rows = db.query(models.MatchMember).filter(models.MatchMember.match_id == match_id)
+    return sorted((m.user_id, m.role, m.created_at) for m in rows)
+
+
+# ============================================================
+# WRITTEN WITH EACH MATCH
+# ============================================================
+def test_each_stored_match_gets_a_member_row_per_owner(client, db, login):
+    from app.routes.match import find_and_store_matches
+
+    a_id, a, _ = login("wanter")
+    b_id, _, _ = login("seller")
+    haves = [listing(db, b_id, "have", "banjo capo") for _ in range(2)]
+    mine = listing(db, a_id, "have", "banjo capo")  # same owner: one member row, not two
+    wanted = listing(db, a_id, "need", "banjo capo")
+
+    find_and_store_matches(db, wanted)
+    matches = db.query(models.Match).filter(models.Match.product_a_id == wanted.id).all()
+    assert sorted(m.product_b_id for m in matches) == sorted([p.id for p in haves] + [mine.id])
+    for match in matches:
+        expected = [(a_id, "need", match.date_matched)]
+        if match.product_b_id != mine.id:
+            expected.append((b_id, "have", match.date_matched))
+        assert members_of(db, match.id) == sorted(expected)
+
+    assert {m["id"] for m in client.get("/matches/my", headers=a).json()} == {m.id for m in matches}
+
+
+def test_deleting_a_product_removes_its_member_rows(client, db, login):
+    from app.routes.match import find_and_store_matches
+
+    a_id, a, _ = login("wanter")
+    b_id, _, _ = login("seller")
+    listing(db, b_id, "have", "harp strings")
+    wanted = listing(db, a_id, "need", "harp strings")
+    find_and_store_matches(db, wanted)
+    [match_id] = [m.id for m in db.query(models.Match).filter(models.Match.product_a_id == wanted.id)]
+
+    assert client.delete(f"/products/{wanted.id}", headers=a).status_code == 200
+    db.expire_all()
+    assert members_of(db, match_id) == []
+
+
+# ============================================================
+# MIGRATION BACKFILL
+# ============================================================
+def run_migration(conn, step: str) -> None:
+    spec = importlib.util.spec_from_file_location("match_members_migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with Operations.context(MigrationContext.configure(conn)):
+        getattr(migration, step)()
+
+
+@pytest.fixture
+def old_schema(tmp_path):
+    """A database as it was before the migration: no match_members yet."""
+    engine = create_engine(f"sqlite:///{tmp_path}/before.db")
+    tables = [models.User.__table__, models.Product.__table__]
+
+    def create(with_matches: bool = True):
+        Base.metadata.create_all(engine, tables=tables + ([models.Match.__table__] if with_matches else []))
+        return engine
+
+    yield create
+    engine.dispose()
+
+
+def test_backfill_adds_the_owners_of_existing_matches(old_schema):
+    engine = old_schema()
+    matched = datetime(2025, 6, 1, 12, 0)
+    with engine.begin() as conn:
+        for user_id in (1, 2):
+            conn.execute(text(
+                "INSERT INTO users (id, username, email, hashed_password, is_active, provider) "
+                "VALUES (:id, :name, :email, 'x', 1, 'local')"
+            ), {"id": user_id, "name": f"user{user_id}", "email": f"user{user_id}@example.com"})
+        for product_id, owner_id, item_type in ((10, 1, "need"), (20, 2, "have"), (30, 1, "have")):
+            conn.execute(text(
+                "INSERT INTO products (id, name, price, quantity, item_type, owner_id) "
+                "VALUES (:id, 'thing', 1, 1, :item_type, :owner_id)"
+            ), {"id": product_id, "owner_id": owner_id, "item_type": item_type})
+        conn.execute(text("INSERT INTO matches (id, product_a_id, product_b_id, timestamp) VALUES "
+                          "(1, 10, 20, :at), (2, 10, 30, :at), (3, 99, 20, NULL)"), {"at": matched})
+
+        run_migration(conn, "upgrade")
+        rows = conn.execute(text(
+            "SELECT match_id, user_id, role, created_at FROM match_members ORDER BY match_id, user_id"
+        )).all()
+
+    at = str(matched)
+    assert [tuple(r[:3]) for r in rows] == [
+        (1, 1, "need"), (1, 2, "have"),
+        (2, 1, "need"),  # both products are user 1's: one row
+        (3, 2, "have"),  # product_a is gone: only the owner of product_b
+    ]
+    assert [r[3] for r in rows[:3]] == [at, at, at]
+    assert rows[3][3] is not None  # no timestamp: backfilled with the migration time
+    assert "ix_match_members_user_created" in {i["name"] for i in inspect(engine).get_indexes("match_members")}
+
+
+def test_migration_creates_matches_when_it_is_missing_and_downgrades(old_schema):
+    engine = old_schema(with_matches=False)
+    with engine.begin() as conn:
+        run_migration(conn, "upgrade")
+    assert {"matches", "match_members"} <= set(inspect(engine).get_table_names())
+
+    with engine.begin() as conn:
+        run_migration(conn, "downgrade")
+    tables = set(inspect(engine).get_table_names())
+    assert "match_members" not in tables and "matches" in tables
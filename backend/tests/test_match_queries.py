@@ -0,0 +1,22 @@
+# backend/tests/test_match_queries.py
+"""The N+1 guard of scripts/check_match_queries.py, enforced in CI."""
+from app import models
+from app.database import engine
+from scripts import check_match_queries
+
+
+def test_match_list_query_count_is_constant(client, db, login):
+    owner_id, headers, _ = login("owner")
+    other_id, _, _ = login("other")
+    client.get("/matches/my", headers=headers)  # warm the user cache
+
+    counts = check_match_queries.query_counts(client, engine, db, models, headers, owner_id, other_id, (2, 40))
+    assert [returned for _, returned in counts] == [2, 40]
+    assert check_match_queries.problems(counts, max_queries=6) == []
+
+
+def test_problems_flags_growth():
+    assert check_match_queries.problems([(4, 2), (42, 40)], max_queries=6) == [
+        "Query count grows with the number of matches (4 -> 42)",
+        "More than 6 queries",
+    ]
@@ -0,0 +1,198 @@
+# backend/tests/test_media_blobs.py
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app import media, media_gc, models
+from app.config import UPLOAD_DIR
+from app.database import SessionLocal
+from app.storage import get_storage
+
+
+@pytest.fixture(autouse=True)
+def remove_unused_staged_files():
+    """Staged copies a test never uploads would look like leaks to test_uploads."""
+    before = set(os.listdir(UPLOAD_DIR)) if os.path.isdir(UPLOAD_DIR) else set()
+    yield
+    for name in set(os.listdir(UPLOAD_DIR)) - before:
+        if name.startswith(".") and name.endswith(".part"):
+            os.remove(os.path.join(UPLOAD_DIR, name))
+
+
+def released_blob(db) -> media.StagedUpload:
+    """A stored blob whose last reference is gone and whose deletion is queued."""
+    data = b"\x89PNG\r\n\x1a\n" + uuid.uuid4().bytes
+    sha256 = hashlib.sha256(data).hexdigest()
+    staged = stage(data)
+    rel = media.staged_path(staged)
+    get_storage().put(staged.tmp_path, rel.split("/uploads/")[-1])
+    db.add(models.MediaBlob(sha256=sha256, path=rel, size=len(data), mime="image/png", ref_count=0))
+    db.add(models.MediaDeletion(path=rel, not_before=datetime.utcnow()))
+    db.commit()
+    return stage(data)
+
+
+def stage(data: bytes) -> media.StagedUpload:
+    get_storage()  # creates UPLOAD_DIR
+    tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    return media.StagedUpload(tmp_path, hashlib.sha256(data).hexdigest(), len(data), "image/png", "a.png")
+
+
+def stored(db, staged: media.StagedUpload) -> tuple:
+    rel = media.staged_path(staged)
+    db.expire_all()
+    ref_count = db.query(models.MediaBlob.ref_count).filter(models.MediaBlob.path == rel).scalar()
+    return ref_count, get_storage().exists(rel.split("/uploads/")[-1])
+
+
+def upload(staged: media.StagedUpload, hold: float = 0.0) -> None:
+    session = SessionLocal()
+    try:
+        asyncio.run(media.store_staged(session, staged))
+        time.sleep(hold)  # rest of the request, before its commit
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_reupload_during_deletion_pass_keeps_file(db):
+    staged = released_blob(db)
+    uploader = threading.Thread(target=upload, args=(staged, 0.3))
+    uploader.start()
+    time.sleep(0.1)  # the upload holds its new reference, uncommitted
+    worker = SessionLocal()
+    try:
+        media_gc.process_deletions(worker)
+    finally:
+        worker.close()
+    uploader.join()
+    assert stored(db, staged) == (1, True)
+
+
+def test_reupload_while_file_is_being_deleted_keeps_file(db, monkeypatch):
+    staged = released_blob(db)
+    storage = get_storage()
+    real_delete = storage.delete
+
+    def slow_delete(name):
+        real_delete(name)
+        time.sleep(0.3)  # the upload arrives between the unlink and the commit
+
+    monkeypatch.setattr(storage, "delete", slow_delete)
+    worker = threading.Thread(target=media_gc.drain_deletions)
+    worker.start()
+    time.sleep(0.1)
+    upload(staged)
+    worker.join()
+    assert stored(db, staged) == (1, True)
+
+
+# ============================================================
+# DELETION QUEUE AND WORKER
+# ============================================================
+def test_worker_runs_with_the_app_and_drains_the_queue(client, db):
+    assert media_gc._worker is not None and media_gc._worker.is_alive()
+    staged = released_blob(db)
+    media_gc.wake_deletion_worker()
+    for _ in range(100):
+        if stored(db, staged) == (None, False):
+            break
+        time.sleep(0.05)
+    assert stored(db, staged) == (None, False)
+    assert db.query(models.MediaDeletion).filter(models.MediaDeletion.path == media.staged_path(staged)).count() == 0
+
+
+def test_failed_deletions_back_off_then_give_up(db, monkeypatch):
+    from app.config import MEDIA_DELETION_MAX_ATTEMPTS
+
+    staged = released_blob(db)
+    rel = media.staged_path(staged)
+
+    def broken_delete(name):
+        raise OSError("disk on fire")
+
+    monkeypatch.setattr(get_storage(), "delete", broken_delete)
+    for attempt in range(1, MEDIA_DELETION_MAX_ATTEMPTS):
+        media_gc.process_deletions(db)
+        db.expire_all()
+        job = db.query(models.MediaDeletion).filter(models.MediaDeletion.path == rel).one()
+        assert job.attempts == attempt and job.last_error == "disk on fire"
+        assert job.not_before > datetime.utcnow()
+        job.not_before = datetime.utcnow()  # skip the wait
+        db.commit()
+
+    media_gc.process_deletions(db)
+    db.expire_all()
+    assert db.query(models.MediaDeletion).filter(models.MediaDeletion.path == rel).count() == 0
+
+
+def test_deleting_a_source_removes_its_variants(db):
+    staged = released_blob(db)
+    rel = media.staged_path(staged)
+    variant = stage(b"\x89PNG\r\n\x1a\n" + uuid.uuid4().bytes)
+    variant_rel = f"/uploads/{uuid.uuid4().hex}_w320.webp"
+    get_storage().put(variant.tmp_path, variant_rel.split("/uploads/")[-1])
+    db.add(models.MediaVariant(source_path=rel, path=variant_rel, width=320, format="webp"))
+    db.commit()
+
+    media_gc.process_deletions(db)
+    assert stored(db, staged) == (None, False)
+    assert not get_storage().exists(variant_rel.split("/uploads/")[-1])
+    assert db.query(models.MediaVariant).filter(models.MediaVariant.source_path == rel).count() == 0
+
+
+# ============================================================
+# ORPHAN COLLECTION
+# ============================================================
+def orphan_blob(db, days_old: float) -> media.StagedUpload:
+    """A stored blob file nothing references, last modified `days_old` ago."""
+    data = b"\x89PNG\r\n\x1a\n" + uuid.uuid4().bytes
+    staged = stage(data)
+    rel = media.staged_path(staged)
+    name = rel.split("/uploads/")[-1]
+    get_storage().put(staged.tmp_path, name)
+    db.add(models.MediaBlob(sha256=staged.sha256, path=rel, size=len(data), mime="image/png", ref_count=0))
+    db.commit()
+    moment = time.time() - days_old * 86400
+    os.utime(get_storage().path(name), (moment, moment))
+    return staged
+
+
+def test_gc_removes_old_orphans_and_keeps_young_ones(db):
+    old, young = orphan_blob(db, days_old=30), orphan_blob(db, days_old=0)
+
+    removed = media_gc.collect_orphans(db, grace_hours=24 * 7)
+    assert media.staged_path(old).split("/uploads/")[-1] in removed
+    assert stored(db, old) == (None, False)
+    assert stored(db, young) == (0, True)
+
+
+def test_gc_keeps_a_blob_uploaded_again_after_the_scan(db, monkeypatch):
+    staged = orphan_blob(db, days_old=30)
+    with open(get_storage().path(media.staged_path(staged).split("/uploads/")[-1]), "rb") as fh:
+        data = fh.read()
+    real_referenced = media_gc._referenced_filenames
+
+    def scan_then_reupload(session):
+        referenced = real_referenced(session)
+        upload(stage(data))  # same content, committed before the GC deletes
+        return referenced
+
+    monkeypatch.setattr(media_gc, "_referenced_filenames", scan_then_reupload)
+    removed = media_gc.collect_orphans(db, grace_hours=24 * 7)
+    assert media.staged_path(staged).split("/uploads/")[-1] not in removed
+    assert stored(db, staged) == (1, True)
+
+
+def test_gc_dry_run_only_lists(db):
+    staged = orphan_blob(db, days_old=30)
+    assert media.staged_path(staged).split("/uploads/")[-1] in media_gc.collect_orphans(db, 24 * 7, dry_run=True)
+    assert stored(db, staged) == (0, True)
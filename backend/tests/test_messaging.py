@@ -0,0 +1,101 @@
+# backend/tests/test_messaging.py
+from datetime import datetime
+
+from app import models
+
+
+def make_match(db, a_id: int, b_id: int) -> int:
+    have = models.Product(name="orange bmx", price=1, quantity=1, item_type="have", owner_id=a_id)
+    need = models.Product(name="orange bmx", price=1, quantity=1, item_type="need", owner_id=b_id)
+    db.add_all([have, need])
+    db.flush()
+    match = models.Match(product_a_id=have.id, product_b_id=need.id, similarity_score=90)
+    match.members = [
+        models.MatchMember(user_id=a_id, role="have", created_at=datetime.utcnow()),
+        models.MatchMember(user_id=b_id, role="need", created_at=datetime.utcnow()),
+    ]
+    db.add(match)
+    db.flush()
+    match_id = match.id
+    db.commit()
+    return match_id
+
+
+def open_conversation(client, db, login, messages: int = 0):
+    alice_id, alice, _ = login("alice")
+    bob_id, bob, _ = login("bob")
+    match_id = make_match(db, alice_id, bob_id)
+    cid = client.post("/conversations/", headers=alice, json={"match_id": match_id}).json()["id"]
+    ids = [
+        client.post(f"/conversations/{cid}/messages", headers=alice, json={"body": f"hi {i}"}).json()["id"]
+        for i in range(messages)
+    ]
+    return cid, alice, bob, ids
+
+
+def unread(client, headers) -> int:
+    return client.get("/conversations/unread-count", headers=headers).json()["unread"]
+
+
+def test_open_is_idempotent_and_limited_to_match_users(client, db, login):
+    cid, alice, bob, _ = open_conversation(client, db, login)
+    _, carol, _ = login("carol")
+    match_id = client.get("/conversations/my", headers=alice).json()[0]["match_id"]
+
+    assert client.post("/conversations/", headers=bob, json={"match_id": match_id}).json()["id"] == cid
+    assert client.post("/conversations/", headers=carol, json={"match_id": match_id}).status_code == 404
+    assert client.get(f"/conversations/{cid}/messages", headers=carol).status_code == 404
+    assert client.post(f"/conversations/{cid}/messages", headers=carol, json={"body": "x"}).status_code == 404
+
+
+def test_history_is_keyset_paginated(client, db, login):
+    cid, _, bob, ids = open_conversation(client, db, login, messages=5)
+
+    page = client.get(f"/conversations/{cid}/messages", headers=bob, params={"limit": 2}).json()
+    assert [m["id"] for m in page["items"]] == ids[:-3:-1]
+    page = client.get(f"/conversations/{cid}/messages", headers=bob,
+                      params={"limit": 2, "before": page["next_cursor"]}).json()
+    assert [m["id"] for m in page["items"]] == ids[2:0:-1]
+
+    page = client.get(f"/conversations/{cid}/messages", headers=bob, params={"after": ids[1]}).json()
+    assert [m["id"] for m in page["items"]] == ids[2:]
+    assert page["next_cursor"] is None
+
+
+def test_unread_counters(client, db, login):
+    cid, alice, bob, ids = open_conversation(client, db, login, messages=4)
+    assert unread(client, bob) == 4
+    assert unread(client, alice) == 0
+
+    assert client.post(f"/conversations/{cid}/read", headers=bob, json={"up_to": ids[1]}).json()["unread"] == 2
+    # Moving the marker back is a no-op
+    assert client.post(f"/conversations/{cid}/read", headers=bob, json={"up_to": ids[0]}).json()["unread"] == 2
+    assert client.post(f"/conversations/{cid}/read", headers=bob).json()["unread"] == 0
+
+    client.post(f"/conversations/{cid}/messages", headers=bob, json={"body": "reply"})
+    assert unread(client, alice) == 1
+    assert unread(client, bob) == 0
+
+
+def test_read_marker_past_the_conversation_is_rejected(client, db, login):
+    cid, alice, bob, ids = open_conversation(client, db, login, messages=2)
+    other_cid, _, _, other_ids = open_conversation(client, db, login, messages=1)
+
+    r = client.post(f"/conversations/{cid}/read", headers=bob, json={"up_to": 10**9})
+    assert r.status_code == 400
+    r = client.post(f"/conversations/{cid}/read", headers=bob, json={"up_to": other_ids[0]})
+    assert r.status_code == 400
+
+    # Later reads still move the marker and clear the counter
+    client.post(f"/conversations/{cid}/messages", headers=alice, json={"body": "later"})
+    assert unread(client, bob) == 3
+    assert client.post(f"/conversations/{cid}/read", headers=bob).json()["unread"] == 0
+
+
+def test_new_message_is_pushed_to_participants(client, db, login):
+    cid, alice, bob, _ = open_conversation(client, db, login)
+    token = bob["Authorization"].split()[1]
+    with client.websocket_connect(f"/realtime/ws?token={token}") as ws:
+        sent = client.post(f"/conversations/{cid}/messages", headers=alice, json={"body": "still available?"}).json()
+        event = ws.receive_json()
+    assert event == {"type": "message", "message": {**sent}}
@@ -0,0 +1,182 @@
+# backend/tests/test_notifications.py
+from app import models, notifications
+
+
+def notify_many(db, user_id: int, count: int, product_id=None) -> list:
+    rows = notifications.notify(db, [
+        models.Notification(user_id=user_id, product_id=product_id, message=f"news {i}") for i in range(count)
+    ])
+    ids = [n.id for n in rows]
+    db.commit()
+    return ids
+
+
+def unread(client, headers) -> int:
+    return client.get("/matches/notifications/unread-count", headers=headers).json()["unread"]
+
+
+def test_cursor_pages_walk_the_history_newest_first(client, db, login):
+    user_id, headers, _ = login()
+    ids = notify_many(db, user_id, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor is not None else {})}
+        page = client.get("/matches/notifications/my", headers=headers, params=params).json()
+        seen += [n["id"] for n in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert len(page["items"]) == 2
+    assert seen == sorted(ids, reverse=True)
+
+    client.post("/matches/notifications/read", headers=headers, json={"ids": ids[:3]})
+    page = client.get("/matches/notifications/my", headers=headers, params={"unread_only": True}).json()
+    assert [n["id"] for n in page["items"]] == sorted(ids[3:], reverse=True)
+
+
+def test_bulk_read_takes_ids_or_up_to_but_not_both(client, db, login):
+    user_id, headers, _ = login()
+    ids = notify_many(db, user_id, 4)
+    assert unread(client, headers) == 4
+
+    assert client.post("/matches/notifications/read", headers=headers, json={}).status_code == 400
+    r = client.post("/matches/notifications/read", headers=headers, json={"ids": ids[:1], "up_to": ids[-1]})
+    assert r.status_code == 400
+
+    r = client.post("/matches/notifications/read", headers=headers, json={"ids": [ids[0], ids[0]]})
+    assert r.json() == {"updated": 1, "unread": 3}
+    # Everything up to the third: one more was already read
+    r = client.post("/matches/notifications/read", headers=headers, json={"up_to": ids[2]})
+    assert r.json() == {"updated": 2, "unread": 1}
+    r = client.post("/matches/notifications/read", headers=headers, json={"up_to": ids[2]})
+    assert r.json() == {"updated": 0, "unread": 1}
+
+
+def test_bulk_read_leaves_other_users_alone(client, db, login):
+    user_id, headers, _ = login("reader")
+    other_id, other, _ = login("other")
+    theirs = notify_many(db, other_id, 2)
+    notify_many(db, user_id, 1)
+
+    r = client.post("/matches/notifications/read", headers=headers, json={"ids": theirs})
+    assert r.json() == {"updated": 0, "unread": 1}
+    assert unread(client, other) == 2
+
+
+def test_patch_marks_one_notification(client, db, login):
+    user_id, headers, _ = login()
+    other_id, other, _ = login("other")
+    first, second = notify_many(db, user_id, 2)
+
+    assert client.patch(f"/matches/notifications/{first}/read", headers=headers).status_code == 200
+    assert unread(client, headers) == 1
+    # Already read: still fine, and the counter doesn't move
+    assert client.patch(f"/matches/notifications/{first}/read", headers=headers).status_code == 200
+    assert unread(client, headers) == 1
+    # Someone else's, or none at all
+    assert client.patch(f"/matches/notifications/{second}/read", headers=other).status_code == 404
+    assert client.patch("/matches/notifications/999999/read", headers=headers).status_code == 404
+    assert unread(client, headers) == 1
+
+
+def test_deleting_a_product_takes_its_unread_notifications_off_the_counter(client, db, login):
+    user_id, headers, _ = login()
+    product_id = client.post("/products/", headers=headers, data={"name": "kettle", "price": "1"}).json()["id"]
+    about_it = notify_many(db, user_id, 3, product_id=product_id)
+    notify_many(db, user_id, 1)
+    client.patch(f"/matches/notifications/{about_it[0]}/read", headers=headers)
+    assert unread(client, headers) == 3
+
+    assert client.delete(f"/products/{product_id}", headers=headers).status_code == 200
+    assert unread(client, headers) == 1
+    assert db.query(models.Notification).filter(models.Notification.product_id == product_id).count() == 0
+
+
+# ============================================================
+# MATCH DIGESTS
+# ============================================================
+def listing(db, owner_id: int, item_type: str, name: str) -> models.Product:
+    product = models.Product(
+        name=name, description=name, category="music",
+        price=1, quantity=1, item_type=item_type, owner_id=owner_id,
+    )
+    db.add(product)
+    db.commit()
+    return product
+
+
+def digest_rows(db, user_id: int, product_id: int) -> list:
+    return db.query(models.Notification).filter(
+        models.Notification.user_id == user_id, models.Notification.group_key == f"match:{product_id}"
+    ).all()
+
+
+def test_matches_for_one_item_fold_into_a_digest(client, db, login, monkeypatch):
+    from app.routes.match import find_and_store_matches
+
+    a_id, a, _ = login("wanter")
+    b_id, _, _ = login("seller")
+    wanted = listing(db, a_id, "need", "theremin kit")
+
+    find_and_store_matches(db, listing(db, b_id, "have", "theremin kit"))
+    [row] = digest_rows(db, a_id, wanted.id)
+    assert row.count == 1 and row.message == "A new match found for your item: 'theremin kit'"
+
+    for _ in range(2):
+        find_and_store_matches(db, listing(db, b_id, "have", "theremin kit"))
+    db.expire_all()
+    [row] = digest_rows(db, a_id, wanted.id)
+    assert row.count == 3 and row.message == "3 new matches for 'theremin kit'"
+    assert row.date_updated is not None
+    # Updated in place while unread: still one unread notification
+    assert unread(client, a) == 1
+
+    # Outside the window a new row starts
+    monkeypatch.setattr(notifications, "NOTIFICATION_DIGEST_WINDOW_SECONDS", 0)
+    find_and_store_matches(db, listing(db, b_id, "have", "theremin kit"))
+    db.expire_all()
+    assert sorted(r.count for r in digest_rows(db, a_id, wanted.id)) == [1, 3]
+    assert unread(client, a) == 2
+
+
+def test_a_new_listing_matching_several_gets_one_digest(client, db, login):
+    from app.routes.match import find_and_store_matches
+
+    a_id, a, _ = login("wanter")
+    b_id, _, _ = login("seller")
+    for _ in range(3):
+        listing(db, b_id, "have", "cello bow")
+
+    wanted = listing(db, a_id, "need", "cello bow")
+    find_and_store_matches(db, wanted)
+    [row] = digest_rows(db, a_id, wanted.id)
+    assert row.count == 3 and row.message == "3 new matches for 'cello bow'"
+    assert unread(client, a) == 1
+
+
+def test_storing_matches_takes_the_same_match_queries_for_few_or_many(client, db, login):
+    from sqlalchemy import event
+    from app.database import engine
+    from app.routes.match import find_and_store_matches
+
+    a_id, _, _ = login("wanter")
+    b_id, _, _ = login("seller")
+
+    def statements_for(count: int, name: str) -> int:
+        for _ in range(count):
+            listing(db, b_id, "have", name)
+        wanted = listing(db, a_id, "need", name)
+        seen = []
+        def record(conn, cursor, statement, *args):
+            if " match" in statement:  # matches, matches_archive, match_members
+                seen.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            find_and_store_matches(db, wanted)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert db.query(models.Match).filter(models.Match.product_a_id == wanted.id).count() == count
+        return len(seen)
+
+    assert statements_for(2, "accordion strap") == statements_for(12, "xylophone mallets")
@@ -0,0 +1,105 @@
+# backend/tests/test_products.py
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from app import models
+from app.database import SessionLocal, begin_immediate
+from app.routes import products
+
+
+@pytest.fixture(autouse=True)
+def no_derivatives(monkeypatch):
+    # Background resizing commits at random points; these tests make their own concurrent writes
+    monkeypatch.setattr(products, "schedule_derivatives", lambda rels: None)
+
+
+def png(color: str) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def stored_images(db, product_id: int) -> list:
+    db.expire_all()
+    product = db.get(models.Product, product_id)
+    return [url.split("/uploads/")[-1] for url in json.loads(product.image_url)], product
+
+
+def edit_during_upload(monkeypatch, edit):
+    """Run `edit(product)` on another session while the request's upload is streaming."""
+    real_stage_upload = products.stage_upload
+
+    async def stage_upload(*args, **kwargs):
+        staged = await real_stage_upload(*args, **kwargs)
+        session = SessionLocal()
+        try:
+            begin_immediate(session)
+            edit(session)
+            session.commit()
+        finally:
+            session.close()
+        return staged
+
+    monkeypatch.setattr(products, "stage_upload", stage_upload)
+
+
+def create_product(client, headers) -> dict:
+    r = client.post("/products/", headers=headers, data={"name": "red kettle", "price": "1"},
+                    files=[("image_files", ("a.png", png("red")))])
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def add_image_elsewhere(product_id: int):
+    def edit(session):
+        product = session.get(models.Product, product_id)
+        product.image_url = json.dumps(json.loads(product.image_url) + ["/uploads/added-elsewhere.png"])
+        product.description = "edited elsewhere"
+    return edit
+
+
+def test_update_product_keeps_concurrent_edits(client, db, login, monkeypatch):
+    _, headers, _ = login()
+    created = create_product(client, headers)
+    edit_during_upload(monkeypatch, add_image_elsewhere(created["id"]))
+
+    r = client.put(f"/products/{created['id']}", headers=headers, data={"name": "blue kettle"},
+                   files=[("images", ("b.png", png("blue")))])
+    assert r.status_code == 200, r.text
+
+    images, product = stored_images(db, created["id"])
+    assert len(images) == 3 and images[1] == "added-elsewhere.png"
+    assert (product.name, product.description) == ("blue kettle", "edited elsewhere")
+
+
+def test_replace_image_keeps_concurrent_edits(client, db, login, monkeypatch):
+    _, headers, _ = login()
+    created = create_product(client, headers)
+    old_url = created["image_url"][0]
+    edit_during_upload(monkeypatch, add_image_elsewhere(created["id"]))
+
+    r = client.patch(f"/products/{created['id']}/replace-image", headers=headers,
+                     data={"old_image_url": old_url}, files=[("new_image", ("b.png", png("blue")))])
+    assert r.status_code == 200, r.text
+
+    images, _ = stored_images(db, created["id"])
+    assert len(images) == 2 and images[1] == "added-elsewhere.png"
+    assert images[0] != old_url.split("/uploads/")[-1]
+
+
+def test_replace_image_conflicts_when_old_image_was_removed(client, db, login, monkeypatch):
+    _, headers, _ = login()
+    created = create_product(client, headers)
+    old_url = created["image_url"][0]
+
+    def remove_image(session):
+        session.get(models.Product, created["id"]).image_url = json.dumps([])
+
+    edit_during_upload(monkeypatch, remove_image)
+    r = client.patch(f"/products/{created['id']}/replace-image", headers=headers,
+                     data={"old_image_url": old_url}, files=[("new_image", ("b.png", png("blue")))])
+    assert r.status_code == 409
+    assert stored_images(db, created["id"])[0] == []
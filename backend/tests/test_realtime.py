@@ -0,0 +1,180 @@
+# backend/tests/test_realtime.py
+import asyncio
+import json
+
+import pytest
+
+from app import realtime
+from app.realtime import RESYNC, Hub, Subscription, UnixSocketBackend, hub
+from app.routes import realtime as realtime_routes
+
+
+class RecordingHub:
+    """Stands in for the Hub behind a backend: records what reaches it."""
+
+    def __init__(self):
+        self.events = []
+        self.resyncs = 0
+
+    def deliver(self, events):
+        self.events += events
+
+    def resync_all(self):
+        self.resyncs += 1
+
+
+def token_of(headers) -> str:
+    return headers["Authorization"].split()[1]
+
+
+# ============================================================
+# SUBSCRIPTIONS AND THE HUB
+# ============================================================
+def test_a_full_queue_is_replaced_by_one_resync():
+    async def run():
+        sub = Subscription(user_id=1, maxsize=2)
+        assert sub.offer({"n": 1}) and sub.offer({"n": 2})
+        assert not sub.offer({"n": 3})
+        assert not sub.offer({"n": 4})  # the pending resync covers it
+        assert sub.queue.qsize() == 1 and await sub.get() == RESYNC
+        # Caught up: events flow again
+        assert sub.offer({"n": 5}) and await sub.get() == {"n": 5}
+
+    asyncio.run(run())
+
+
+def test_hub_delivers_to_every_connection_of_the_user_and_counts_resyncs():
+    async def run():
+        h = Hub()
+        h._loop = asyncio.get_running_loop()
+        a1, a2, b = h.subscribe(1), h.subscribe(1), h.subscribe(2)
+        slow = Subscription(1, 1)
+        h._subscribers[1].add(slow)
+
+        h.deliver([(1, {"n": 1}), (1, {"n": 2})])
+        await asyncio.sleep(0)
+        assert [await a1.get(), await a1.get()] == [{"n": 1}, {"n": 2}]
+        assert a2.queue.qsize() == 2 and b.queue.empty()
+        assert await slow.get() == RESYNC
+        assert h.stats()["resyncs"] == 1 and h.stats()["delivered"] == 5
+
+        h.unsubscribe(a1), h.unsubscribe(a2), h.unsubscribe(slow)
+        assert h.stats()["users"] == 1
+
+    asyncio.run(run())
+
+
+# ============================================================
+# UNIX DATAGRAM BACKEND
+# ============================================================
+def test_events_are_packed_into_datagrams_under_the_limit():
+    events = [(i, {"type": "notification", "body": "x" * 1000}) for i in range(200)]
+    datagrams = realtime._datagrams(events)
+    assert len(datagrams) > 1
+    assert all(len(d) <= realtime.MAX_DATAGRAM_BYTES for d in datagrams)
+    assert [e for d in datagrams for e in realtime._decode(d)] == events
+
+    # One event too big for any datagram becomes a resync for its user
+    huge = realtime._datagrams([(7, {"type": "match", "blob": "x" * 100_000}), (8, {"type": "ping"})])
+    assert realtime._decode(huge[0]) == [(7, RESYNC), (8, {"type": "ping"})]
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two unix backends in one directory, as two workers would have."""
+    async def start():
+        a, b = UnixSocketBackend(str(tmp_path)), UnixSocketBackend(str(tmp_path))
+        b.path = str(tmp_path / "worker-b.sock")
+        await a.start(RecordingHub())
+        await b.start(RecordingHub())
+        return a, b
+    return start
+
+
+async def settle():
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+
+
+def test_large_commits_reach_other_workers_in_several_datagrams(workers):
+    async def run():
+        a, b = await workers()
+        try:
+            events = [(i % 3, {"type": "notification", "body": "x" * 1500}) for i in range(80)]  # ~120 KB
+            a.publish(events)
+            await settle()
+            assert a.hub.events == events  # this worker's own clients
+            assert b.hub.events == events
+            assert a.dropped == 0
+        finally:
+            await a.stop()
+            await b.stop()
+
+    asyncio.run(run())
+
+
+def test_a_worker_that_missed_a_datagram_is_told_to_resync(workers):
+    async def run():
+        a, b = await workers()
+        real_sender = a._sender
+
+        class FullBuffer:
+            def sendto(self, payload, peer):
+                raise BlockingIOError
+
+        try:
+            a._sender = FullBuffer()
+            a.publish([(1, {"type": "notification"})])
+            assert a.dropped == 1 and b.path in a._behind
+
+            a._sender = real_sender
+            a.publish([(1, {"type": "match"})])
+            await settle()
+            assert b.hub.resyncs == 1
+            assert b.hub.events == [(1, {"type": "match"})]
+            assert not a._behind
+        finally:
+            a._sender = real_sender
+            await a.stop()
+            await b.stop()
+
+    asyncio.run(run())
+
+
+# ============================================================
+# WEBSOCKET AND SSE ENDPOINTS
+# ============================================================
+def test_websocket_sends_a_heartbeat_when_idle(client, login, monkeypatch):
+    _, headers, _ = login()
+    monkeypatch.setattr(realtime_routes, "REALTIME_HEARTBEAT_SECONDS", 0.05)
+    with client.websocket_connect(f"/realtime/ws?token={token_of(headers)}") as ws:
+        assert ws.receive_json() == {"type": "ping"}
+
+
+def test_websocket_without_a_valid_token_is_closed(client):
+    from starlette.websockets import WebSocketDisconnect
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/realtime/ws?token=nope") as ws:
+            ws.receive_json()
+    assert closed.value.code == 4401
+
+
+def test_sse_streams_events_and_heartbeats_until_the_token_expires(client, login, monkeypatch):
+    import threading
+    from datetime import timedelta
+    from app.auth import create_access_token
+
+    user_id, _, _ = login()
+    token = create_access_token({"sub": str(user_id)}, expires_delta=timedelta(seconds=2))
+    monkeypatch.setattr(realtime_routes, "REALTIME_HEARTBEAT_SECONDS", 0.05)
+    threading.Timer(0.3, hub.publish, [[(user_id, {"type": "notification", "id": 1})]]).start()
+
+    # The stream ends by itself when the token expires
+    r = client.get(f"/realtime/events?token={token}")
+    assert r.headers["content-type"].startswith("text/event-stream")
+    frames = r.text.split("\n\n")
+    assert frames[0] == "retry: 3000"
+    assert ": ping" in frames
+    assert 'event: notification\ndata: {"type": "notification", "id": 1}' in frames
+    assert frames[-2] == "event: expired\ndata: {}"
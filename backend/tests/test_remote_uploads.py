@@ -0,0 +1,151 @@
+# backend/tests/test_remote_uploads.py
+import asyncio
+import io
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app import remote_uploads
+from scripts.fake_cloudinary import FakeCloudinaryHandler
+
+
+def job(name: str):
+    return UploadFile(io.BytesIO(b"data " + name.encode()), filename=name), remote_uploads.IMAGE_FOLDER, "image"
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """A fresh worker pool with recorded destroys and no backoff."""
+    monkeypatch.setattr(remote_uploads, "_executor", None)
+    monkeypatch.setattr(remote_uploads, "REMOTE_UPLOAD_BACKOFF_SECONDS", 0.01)
+    destroyed = []
+    monkeypatch.setattr(remote_uploads, "_destroy", lambda results: destroyed.extend(r["public_id"] for r in results))
+    yield destroyed
+    remote_uploads._executor.shutdown(wait=True)
+
+
+def fake_post(monkeypatch, behave):
+    calls = []
+
+    def _post_upload(job, timeout):
+        name = job[0].filename
+        calls.append(name)
+        behave(name)
+        return {"public_id": name, "secure_url": f"https://cdn.example/{name}"}
+
+    monkeypatch.setattr(remote_uploads, "_post_upload", _post_upload)
+    return calls
+
+
+def test_results_keep_job_order(uploads, monkeypatch):
+    fake_post(monkeypatch, lambda name: time.sleep(0.05 if name == "a" else 0))
+    urls = asyncio.run(remote_uploads.upload_many([job("a"), job("b"), job("c")]))
+    assert urls == ["https://cdn.example/a", "https://cdn.example/b", "https://cdn.example/c"]
+    assert uploads == []
+
+
+def test_failed_upload_fails_the_batch_and_removes_the_rest(uploads, monkeypatch):
+    def behave(name):
+        if name == "bad":
+            raise remote_uploads.UploadFailed("HTTP 400: Invalid image file", retryable=False)
+
+    fake_post(monkeypatch, behave)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(remote_uploads.upload_many([job("good"), job("bad")]))
+    assert e.value.status_code == 502
+    remote_uploads._executor.shutdown(wait=True)
+    assert uploads == ["good"]
+
+
+def test_transient_failures_are_retried(uploads, monkeypatch):
+    failures = iter([True, True, False])
+
+    def behave(name):
+        if next(failures):
+            raise remote_uploads.UploadFailed("HTTP 503: busy", retryable=True)
+
+    calls = fake_post(monkeypatch, behave)
+    assert asyncio.run(remote_uploads.upload_many([job("a")])) == ["https://cdn.example/a"]
+    assert calls == ["a", "a", "a"]
+
+
+def test_deadline_stops_workers_and_removes_late_uploads(uploads, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(remote_uploads, "REMOTE_UPLOAD_WORKERS", 2)
+    calls = fake_post(monkeypatch, lambda name: release.wait(5))
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(remote_uploads.upload_many([job("a"), job("b"), job("c"), job("d")], deadline_seconds=0.2))
+    assert e.value.status_code == 504
+    release.set()
+    remote_uploads._executor.shutdown(wait=True)
+    # The queued jobs never started; the two that finished late were removed again
+    assert sorted(calls) == ["a", "b"]
+    assert sorted(uploads) == ["a", "b"]
+
+
+@pytest.fixture
+def fake_cloudinary(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCloudinaryHandler)
+    monkeypatch.setattr(FakeCloudinaryHandler, "log_message", lambda *args: None)
+    monkeypatch.setattr(remote_uploads, "_http", None)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(remote_uploads, "CLOUDINARY_CLOUD_NAME", "demo")
+    monkeypatch.setattr(remote_uploads, "CLOUDINARY_API_KEY", "key")
+    monkeypatch.setattr(remote_uploads, "CLOUDINARY_API_SECRET", "secret")
+    monkeypatch.setattr(remote_uploads, "CLOUDINARY_UPLOAD_PREFIX", f"http://127.0.0.1:{server.server_port}")
+    remote_uploads.configure_cloudinary()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_uploads_share_pooled_connections(uploads, fake_cloudinary, monkeypatch):
+    before = FakeCloudinaryHandler.total_requests
+    urls = asyncio.run(remote_uploads.upload_many([job(f"f{i}") for i in range(12)]))
+    assert len(urls) == 12 and all(url.startswith("https://res.cloudinary.com/demo/image/upload/") for url in urls)
+    assert FakeCloudinaryHandler.total_requests - before == 12
+
+    pool = remote_uploads._http.connection_from_url(remote_uploads.CLOUDINARY_UPLOAD_PREFIX)
+    assert pool.num_connections <= remote_uploads.REMOTE_UPLOAD_WORKERS
+
+
+def test_delivery_urls_map_back_to_public_ids():
+    assert remote_uploads._result_for_url(
+        "https://res.cloudinary.com/demo/image/upload/v1712/makeitwhole/products/images/abc.jpg"
+    ) == {"public_id": "makeitwhole/products/images/abc", "resource_type": "image"}
+    assert remote_uploads._result_for_url(
+        "https://res.cloudinary.com/demo/video/upload/makeitwhole/products/videos/clip.mp4"
+    ) == {"public_id": "makeitwhole/products/videos/clip", "resource_type": "video"}
+    assert remote_uploads._result_for_url("https://res.cloudinary.com/demo/raw/upload/v1/doc.pdf") == {
+        "public_id": "doc.pdf", "resource_type": "raw",
+    }
+    assert remote_uploads._result_for_url("https://example.com/elsewhere.jpg") is None
+
+
+def test_uploads_for_an_update_that_fails_afterwards_are_destroyed(client, db, login, uploads, monkeypatch):
+    from app import models
+    from app.routes import products
+
+    _, headers, _ = login()
+    product_id = client.post("/products/", headers=headers, data={"name": "lamp", "price": "1"}).json()["id"]
+
+    async def upload_many(jobs):
+        # The product is deleted while its new media is still uploading
+        db.delete(db.get(models.Product, product_id))
+        db.commit()
+        return [
+            f"https://res.cloudinary.com/demo/{'video' if kind == 'video' else 'image'}/upload/v1/{folder}/{f.filename}.x"
+            for f, folder, kind in jobs
+        ]
+
+    monkeypatch.setattr(products, "UPLOAD_MODE", "cloudinary")
+    monkeypatch.setattr(products, "upload_many", upload_many)
+    r = client.put(f"/products/{product_id}", headers=headers,
+                   files=[("images", ("a.png", b"a")), ("video", ("v.mp4", b"v"))])
+    assert r.status_code == 404
+    remote_uploads._executor.shutdown(wait=True)
+    assert sorted(uploads) == [f"{remote_uploads.IMAGE_FOLDER}/a.png", f"{remote_uploads.VIDEO_FOLDER}/v.mp4"]
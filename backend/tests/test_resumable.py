@@ -0,0 +1,112 @@
+# backend/tests/test_resumable.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, resumable
+from app.routes import products
+
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + bytes(range(256)) * 4  # sniffed as video/mp4
+
+
+@pytest.fixture(autouse=True)
+def no_video_metadata(monkeypatch):
+    monkeypatch.setattr(products, "schedule_video_metadata", lambda urls: None)
+
+
+def start_upload(client, headers, total_size: int = len(VIDEO)):
+    product_id = client.post("/products/", headers=headers, data={"name": "camera", "price": "1"}).json()["id"]
+    r = client.post(f"/products/{product_id}/video-uploads", headers=headers,
+                    json={"filename": "clip.mp4", "total_size": total_size})
+    assert r.status_code == 201, r.text
+    return product_id, r.headers["Location"]
+
+
+def send(client, headers, location: str, offset: int, body: bytes):
+    return client.patch(location, headers={**headers, "Upload-Offset": str(offset)}, content=body)
+
+
+def test_chunks_resume_from_the_reported_offset_and_finalize(client, db, login):
+    _, headers, _ = login()
+    product_id, location = start_upload(client, headers)
+
+    assert send(client, headers, location, 0, VIDEO[:100]).headers["Upload-Offset"] == "100"
+    # The client lost the response and asks where to carry on
+    r = client.head(location, headers=headers)
+    assert r.headers["Upload-Offset"] == "100"
+    assert send(client, headers, location, 100, VIDEO[100:]).status_code == 204
+
+    r = client.post(f"{location}/finalize", headers=headers)
+    assert r.status_code == 200, r.text
+    db.expire_all()
+    assert db.get(models.Product, product_id).video_url.startswith("/uploads/")
+    assert db.get(models.UploadSession, location.rsplit("/", 1)[-1]) is None
+
+
+def test_chunk_at_the_wrong_offset_is_refused(client, login):
+    _, headers, _ = login()
+    _, location = start_upload(client, headers)
+    send(client, headers, location, 0, VIDEO[:100])
+
+    r = send(client, headers, location, 50, VIDEO[50:150])
+    assert r.status_code == 409
+    assert r.headers["Upload-Offset"] == "100"
+    assert send(client, headers, location, 100, VIDEO[100:]).status_code == 204
+
+
+def test_chunk_past_the_declared_size_and_early_finalize_are_refused(client, login):
+    _, headers, _ = login()
+    _, location = start_upload(client, headers, total_size=100)
+    assert send(client, headers, location, 0, VIDEO[:150]).status_code == 413
+
+    r = client.post(f"{location}/finalize", headers=headers)
+    assert r.status_code == 409 and "Upload incomplete" in r.json()["detail"]
+
+
+def test_second_writer_on_a_session_is_refused_while_the_first_streams(client, db, login):
+    _, headers, _ = login()
+    _, location = start_upload(client, headers)
+    upload_session = db.get(models.UploadSession, location.rsplit("/", 1)[-1])
+
+    async def run():
+        paused = asyncio.Event()
+        resume = asyncio.Event()
+
+        async def slow():
+            yield VIDEO[:100]
+            paused.set()
+            await resume.wait()
+            yield VIDEO[100:200]
+
+        async def once(data):
+            yield data
+
+        first = asyncio.ensure_future(resumable.append_chunk(upload_session, 0, slow()))
+        await paused.wait()
+        # A retry of the same chunk while the first is still streaming
+        with pytest.raises(HTTPException) as refused:
+            await resumable.append_chunk(upload_session, 0, once(VIDEO[:100]))
+        resume.set()
+        return refused.value, await first
+
+    refused, offset = asyncio.run(run())
+    assert refused.status_code == 409
+    assert offset == 200
+    assert resumable.current_offset(upload_session.id) == 200
+    with open(resumable.part_path(upload_session.id), "rb") as fh:
+        assert fh.read() == VIDEO[:200]
+
+
+def test_expired_sessions_are_purged_with_their_part_files(client, db, login):
+    _, headers, _ = login()
+    _, location = start_upload(client, headers)
+    upload_id = location.rsplit("/", 1)[-1]
+    send(client, headers, location, 0, VIDEO[:100])
+
+    later = datetime.utcnow() + timedelta(days=30)
+    assert resumable.purge_expired_sessions(db, now=later) >= 1
+    assert db.get(models.UploadSession, upload_id) is None
+    assert resumable.current_offset(upload_id) == 0
+    assert client.head(location, headers=headers).status_code == 404
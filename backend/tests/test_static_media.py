@@ -0,0 +1,92 @@
+# backend/tests/test_static_media.py
+import hashlib
+import os
+import uuid
+
+import pytest
+
+from app import static_media
+from app.config import UPLOAD_DIR
+from app.storage import get_storage, shard_key
+
+BODY = bytes(range(256)) * 8
+
+
+@pytest.fixture
+def media_file():
+    """Writes files where /uploads serves them from; removed again afterwards."""
+    written = []
+
+    def write(name: str, sharded: bool = True) -> str:
+        path = get_storage().path(name) if sharded else os.path.join(UPLOAD_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(BODY)
+        written.append(path)
+        return name
+
+    yield write
+    for path in written:
+        os.remove(path)
+
+
+def blob_name() -> str:
+    return f"{hashlib.sha256(uuid.uuid4().bytes).hexdigest()}.mp4"
+
+
+def test_content_addressed_media_is_immutable_with_a_name_etag(client, media_file):
+    name = media_file(blob_name())
+    r = client.get(f"/uploads/{name}")
+    assert r.status_code == 200 and r.content == BODY
+    assert r.headers["cache-control"] == static_media.IMMUTABLE_CACHE_CONTROL
+    assert r.headers["etag"] == f'"{name}"'
+    assert r.headers["accept-ranges"] == "bytes"
+
+    r = client.get(f"/uploads/{name}", headers={"If-None-Match": f'"{name}"'})
+    assert r.status_code == 304 and r.content == b""
+
+
+def test_other_names_are_revalidated(client, media_file):
+    name = media_file(f"notes-{uuid.uuid4().hex}.txt")
+    r = client.get(f"/uploads/{name}")
+    assert r.headers["cache-control"] == static_media.REVALIDATE_CACHE_CONTROL
+    etag = r.headers["etag"]
+    assert etag != f'"{name}"'
+
+    assert client.get(f"/uploads/{name}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/uploads/{name}", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_byte_ranges_and_if_range(client, media_file):
+    name = media_file(blob_name())
+    r = client.get(f"/uploads/{name}", headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.content == BODY[100:200]
+    assert r.headers["content-range"] == f"bytes 100-199/{len(BODY)}"
+
+    # If-Range with the current ETag honours the range; a stale one gets the whole file
+    r = client.get(f"/uploads/{name}", headers={"Range": "bytes=0-9", "If-Range": f'"{name}"'})
+    assert r.status_code == 206 and r.content == BODY[:10]
+    r = client.get(f"/uploads/{name}", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert r.status_code == 200 and r.content == BODY
+
+
+def test_flat_urls_find_sharded_and_unmigrated_files(client, media_file):
+    sharded = media_file(blob_name())
+    flat = media_file(blob_name(), sharded=False)
+    assert client.get(f"/uploads/{sharded}").content == BODY
+    assert client.get(f"/uploads/{flat}").content == BODY
+    assert client.get(f"/uploads/{blob_name()}").status_code == 404
+
+
+def test_accel_redirect_hands_the_body_to_nginx(client, media_file, monkeypatch):
+    monkeypatch.setattr(static_media, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-uploads/")
+    name = media_file(blob_name())
+    r = client.get(f"/uploads/{name}")
+    assert r.status_code == 200 and r.content == b""
+    assert r.headers["x-accel-redirect"] == f"/protected-uploads/{shard_key(name)}"
+    assert r.headers["cache-control"] == static_media.IMMUTABLE_CACHE_CONTROL
+    assert r.headers["etag"] == f'"{name}"'
+    assert r.headers["content-type"] == "video/mp4"
+    # Conditional requests are still answered here
+    assert client.get(f"/uploads/{name}", headers={"If-None-Match": f'"{name}"'}).status_code == 304
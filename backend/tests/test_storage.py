@@ -0,0 +1,37 @@
+# backend/tests/test_storage.py
+import pytest
+
+from app.storage import LocalStorage, StorageBackend, shard_key
+
+
+def test_backend_must_implement_every_operation():
+    class Partial(StorageBackend):
+        def put(self, src_path, name):
+            pass
+
+    with pytest.raises(TypeError, match="exists"):
+        Partial()
+
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path / "store"))
+    name = "ab" * 32 + ".png"
+    src = tmp_path / "upload.part"
+    src.write_bytes(b"png bytes")
+
+    storage.put(str(src), name)
+    assert not src.exists()
+    assert storage.exists(name)
+    assert (tmp_path / "store" / shard_key(name)).is_file()
+    with storage.fetch(name) as path:
+        assert open(path, "rb").read() == b"png bytes"
+    assert [f.name for f in storage.iter_files()] == [name]
+
+    # Identical content already stored: the new copy is dropped, the stored one kept
+    src.write_bytes(b"png bytes")
+    storage.put(str(src), name)
+    assert not src.exists() and storage.exists(name)
+
+    storage.delete(name)
+    storage.delete(name)  # missing is fine
+    assert not storage.exists(name)
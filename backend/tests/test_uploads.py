@@ -0,0 +1,142 @@
+# backend/tests/test_uploads.py
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import models
+from app.config import UPLOAD_DIR
+from app.database import SessionLocal
+from app.media import UploadSizeLimit
+from app.media_gc import drain_deletions
+from app.routes import products
+from app.storage import get_storage
+
+
+@pytest.fixture(autouse=True)
+def no_derivatives(monkeypatch):
+    monkeypatch.setattr(products, "schedule_derivatives", lambda rels: None)
+
+
+def png(rgb) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), rgb).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def part_files() -> list:
+    return [name for name in os.listdir(UPLOAD_DIR) if name.endswith(".part")]
+
+
+# ============================================================
+# RAW STREAM LIMIT
+# ============================================================
+@pytest.fixture
+def limited():
+    app = FastAPI()
+    received = []
+
+    @app.post("/up")
+    async def up(f: UploadFile = File(...)):
+        received.append(f.filename)
+        return {}
+
+    app.add_middleware(UploadSizeLimit, limit=1024)
+    return TestClient(app), received
+
+
+def multipart(size: int):
+    boundary = "b0undary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"f\"; filename=\"x.bin\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + b"x" * size + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def test_declared_length_over_limit_is_refused_unread(limited):
+    client, received = limited
+    body, headers = multipart(4096)
+    r = client.post("/up", content=body, headers=headers)
+    assert r.status_code == 413
+    assert received == []
+
+
+def test_chunked_body_is_cut_off_at_limit(limited):
+    client, received = limited
+    body, headers = multipart(4096)
+    r = client.post("/up", content=iter([body[i:i + 512] for i in range(0, len(body), 512)]), headers=headers)
+    assert r.status_code == 413
+    assert received == []
+
+
+def test_body_within_limit_passes(limited):
+    client, received = limited
+    body, headers = multipart(100)
+    assert client.post("/up", content=body, headers=headers).status_code == 200
+    assert received == ["x.bin"]
+
+
+# ============================================================
+# CLEANUP OF PARTIAL MULTI-FILE UPLOADS
+# ============================================================
+def test_rejected_later_file_removes_staged_files(client, login):
+    _, headers, _ = login()
+    r = client.post("/products/", headers=headers, data={"name": "lamp", "price": "1"},
+                    files=[("image_files", ("a.png", png((1, 2, 3)))), ("image_files", ("b.txt", b"not an image"))])
+    assert r.status_code == 415
+    assert part_files() == []
+
+
+def test_failed_placement_queues_placed_files(client, db, login, monkeypatch):
+    _, headers, _ = login()
+    first = png((4, 5, 6))
+    real_place_staged = products.place_staged
+    placed = []
+
+    async def place_staged(staged):
+        if placed:
+            raise HTTPException(status_code=507, detail="disk full")
+        placed.append(await real_place_staged(staged))
+        return placed[-1]
+
+    monkeypatch.setattr(products, "place_staged", place_staged)
+    r = client.post("/products/", headers=headers, data={"name": "lamp", "price": "1"},
+                    files=[("image_files", ("a.png", first)), ("image_files", ("b.png", png((7, 8, 9))))])
+    assert r.status_code == 507
+    assert part_files() == []
+
+    drain_deletions()
+    name = placed[0].split("/uploads/")[-1]
+    assert not get_storage().exists(name)
+    assert db.query(models.MediaBlob).filter(models.MediaBlob.path == placed[0]).count() == 0
+
+
+def test_update_of_deleted_product_drops_its_upload(client, db, login, monkeypatch):
+    _, headers, _ = login()
+    r = client.post("/products/", headers=headers, data={"name": "lamp", "price": "1"})
+    product_id = r.json()["id"]
+    real_stage_upload = products.stage_upload
+
+    async def stage_upload(*args, **kwargs):
+        staged = await real_stage_upload(*args, **kwargs)
+        session = SessionLocal()
+        try:
+            session.query(models.Product).filter(models.Product.id == product_id).delete()
+            session.commit()
+        finally:
+            session.close()
+        return staged
+
+    monkeypatch.setattr(products, "stage_upload", stage_upload)
+    image = png((10, 11, 12))
+    r = client.put(f"/products/{product_id}", headers=headers, files=[("images", ("a.png", image))])
+    assert r.status_code == 404
+
+    drain_deletions()
+    rows = db.query(models.MediaBlob).filter(models.MediaBlob.size == len(image)).all()
+    assert rows == []
+    assert [f for f in get_storage().iter_files() if f.name.endswith(".png") and f.size == len(image)] == []
@@ -0,0 +1,55 @@
+# backend/tests/test_user_cache.py
+from app import auth, models
+from app.cache import TTLCache
+
+
+def me(client, headers) -> dict:
+    r = client.get("/users/me", headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_profile_updates_are_seen_by_the_next_request(client, login):
+    user_id, headers, _ = login()
+    assert me(client, headers)["full_name"] is None
+    assert auth.user_cache.get(user_id) is not None  # cached now
+
+    r = client.put("/users/me", headers=headers, json={"full_name": "Ada Lovelace", "phone": "555-0100"})
+    assert r.status_code == 200, r.text
+    assert auth.user_cache.get(user_id) is None
+    assert me(client, headers)["full_name"] == "Ada Lovelace"
+    assert auth.user_cache.get(user_id).phone == "555-0100"
+    # The auth router serves the same snapshot
+    assert client.get("/auth/me", headers=headers).json()["full_name"] == "Ada Lovelace"
+
+
+def test_a_snapshot_loaded_before_an_update_commits_is_not_cached(client, db, login, monkeypatch):
+    user_id, headers, _ = login()
+    auth.invalidate_user(user_id)
+    from_user = auth.UserSnapshot.from_user
+
+    def update_meanwhile(user):
+        # Another request updates the account after this one read the row
+        snapshot = from_user(user)
+        monkeypatch.setattr(auth.UserSnapshot, "from_user", from_user)
+        db.get(models.User, user_id).address = "12 New Street"
+        db.commit()
+        auth.invalidate_user(user_id)
+        return snapshot
+
+    monkeypatch.setattr(auth.UserSnapshot, "from_user", update_meanwhile)
+    assert me(client, headers)["address"] is None  # this request still answers with what it read
+    assert auth.user_cache.get(user_id) is None
+    assert me(client, headers)["address"] == "12 New Street"
+
+
+def test_set_with_a_version_is_dropped_after_an_invalidation():
+    cache = TTLCache("test-versions", maxsize=10, ttl=60)
+    version = cache.version()
+    cache.invalidate("other")  # any key: invalidations are rare, so one counter covers all
+    cache.set("a", 1, version=version)
+    assert cache.get("a") is None
+
+    cache.set("a", 2, version=cache.version())
+    cache.set("b", 3)
+    assert (cache.get("a"), cache.get("b")) == (2, 3)
@@ -0,0 +1,100 @@
+# backend/tests/test_video_meta.py
+import os
+import subprocess
+import uuid
+
+import pytest
+
+from app import models, video_meta
+from app.config import UPLOAD_DIR
+from app.storage import get_storage
+
+META = {"duration": 12.5, "width": 1280, "height": 720, "codec": "h264"}
+
+
+@pytest.fixture(autouse=True)
+def fake_tools(monkeypatch):
+    """ffprobe/ffmpeg stand-ins: a fixed probe result, and a poster made of the offset used."""
+    calls = []
+
+    def extract_poster(path, out_path, at):
+        calls.append(at)
+        with open(out_path, "wb") as fh:
+            fh.write(f"frame at {at}".encode())
+
+    monkeypatch.setattr(video_meta, "probe_video", lambda path: dict(META))
+    monkeypatch.setattr(video_meta, "extract_poster", extract_poster)
+    return calls
+
+
+def stored_video() -> str:
+    name = f"{uuid.uuid4().hex}.mp4"
+    tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+    with open(tmp_path, "wb") as fh:
+        fh.write(b"\x00\x00\x00\x18ftypmp42")
+    get_storage().put(tmp_path, name)
+    return f"/uploads/{name}"
+
+
+def poster_bytes(rel: str) -> bytes:
+    with open(get_storage().path(video_meta.poster_filename(rel.split("/uploads/")[-1])), "rb") as fh:
+        return fh.read()
+
+
+def part_files() -> list:
+    return [name for name in os.listdir(UPLOAD_DIR) if name.endswith(".part")]
+
+
+def test_poster_and_metadata_are_recorded(db):
+    rel = stored_video()
+    video_meta.generate_video_metadata(rel)
+
+    row = db.get(models.VideoMetadata, rel)
+    assert (row.duration, row.width, row.height, row.codec) == (12.5, 1280, 720, "h264")
+    assert row.poster_path == f"/uploads/{video_meta.poster_filename(rel.split('/uploads/')[-1])}"
+    assert poster_bytes(rel) == b"frame at 1.0"
+    assert part_files() == []
+
+
+def test_an_existing_poster_is_kept_not_rewritten(db, fake_tools):
+    rel = stored_video()
+    video_meta.generate_video_metadata(rel)
+    path = get_storage().path(video_meta.poster_filename(rel.split("/uploads/")[-1]))
+    before = os.stat(path)
+
+    video_meta.generate_video_metadata(rel)
+    after = os.stat(path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert len(fake_tools) == 1
+    assert db.get(models.VideoMetadata, rel) is not None
+
+
+def test_failed_extraction_leaves_no_scratch_file(db, monkeypatch):
+    rel = stored_video()
+
+    def broken(path, out_path, at):
+        with open(out_path, "wb") as fh:
+            fh.write(b"half a frame")
+        raise subprocess.CalledProcessError(1, "ffmpeg")
+
+    monkeypatch.setattr(video_meta, "extract_poster", broken)
+    with pytest.raises(subprocess.CalledProcessError):
+        video_meta.generate_video_metadata(rel)
+    assert part_files() == []
+    assert db.get(models.VideoMetadata, rel) is None
+
+
+def test_a_short_clip_falls_back_to_the_first_frame(db, monkeypatch, fake_tools):
+    rel = stored_video()
+    monkeypatch.setattr(video_meta, "probe_video", lambda path: {**META, "duration": 0.5})
+    real = video_meta.extract_poster
+
+    def first_frame_only(path, out_path, at):
+        if at:
+            raise subprocess.CalledProcessError(1, "ffmpeg")
+        real(path, out_path, at)
+
+    monkeypatch.setattr(video_meta, "extract_poster", first_frame_only)
+    video_meta.generate_video_metadata(rel)
+    assert poster_bytes(rel) == b"frame at 0"
+    assert part_files() == []
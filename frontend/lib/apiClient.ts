@@ -75,8 +75,11 @@ api.interceptors.response.use(
         );
 
         const newAccessToken = (res.data as any).access_token;
+        const newRefreshToken = (res.data as any).refresh_token;
         if (newAccessToken) {
           localStorage.setItem("access_token", newAccessToken);
+          // Refresh tokens are single-use: keep the rotated one
+          if (newRefreshToken) localStorage.setItem("refresh_token", newRefreshToken);
           api.defaults.headers.common["Authorization"] = `Bearer ${newAccessToken}`;
           processQueue(null, newAccessToken);
           return api(originalRequest);